@@ -0,0 +1,165 @@
+import time
+import shutil
+from pathlib import Path
+
+import numpy as np
+from ultralytics import YOLO
+
+from config import MODEL_BACKENDS, EXPORT_DIR, MODEL_WARMUP_SIZE
+
+# ultralytics export format per backend, and the artifact it produces
+# next to the copied weights (stem = weights file name without .pt)
+EXPORT_FORMATS = {
+    "onnx": ("onnx", "{stem}.onnx"),
+    "openvino": ("openvino", "{stem}_openvino_model"),
+}
+
+
+def backend_config(name):
+    cfg = MODEL_BACKENDS.get(name, {})
+    backend = cfg.get("backend", "pytorch")
+    if backend != "pytorch" and backend not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown inference backend '{backend}' for {name}")
+    # INT8 calibration is only available through OpenVINO (NNCF)
+    int8 = bool(cfg.get("int8")) and backend == "openvino"
+    return backend, int8
+
+
+def _tag(backend, int8):
+    """Suffix added to a model version when it is served from an export."""
+    if backend == "pytorch":
+        return ""
+    return f"+{backend}" + ("-int8" if int8 else "")
+
+
+def artifact_path(name, weights, version, int8=None):
+    """Where the export of `weights` (at `version`) lives for this model's backend."""
+    backend, configured_int8 = backend_config(name)
+    if backend == "pytorch":
+        return Path(weights)
+    int8 = configured_int8 if int8 is None else int8
+    flavour = f"{backend}-int8" if int8 else backend
+    _, pattern = EXPORT_FORMATS[backend]
+    return Path(EXPORT_DIR) / name / f"{version}_{flavour}" / pattern.format(stem=Path(weights).stem)
+
+
+def export(name, weights, version, data_yaml=None):
+    """
+    Export `weights` for the configured backend unless already done.
+    Returns (path to load, version tag). INT8 needs `data_yaml` for
+    calibration; without it an earlier INT8 export is reused if present,
+    otherwise the export falls back to FP32.
+    """
+    backend, int8 = backend_config(name)
+    if backend == "pytorch":
+        return Path(weights), ""
+
+    if int8 and not data_yaml:
+        if artifact_path(name, weights, version, int8=True).exists():
+            return artifact_path(name, weights, version, int8=True), _tag(backend, True)
+        print(f"⚠️ No calibration data for {name}, exporting {backend} without INT8")
+        int8 = False
+
+    target = artifact_path(name, weights, version, int8)
+    if target.exists():
+        return target, _tag(backend, int8)
+
+    # export from a private copy so artifacts of different versions never mix
+    work_dir = target.parent
+    work_dir.mkdir(parents=True, exist_ok=True)
+    local_weights = work_dir / Path(weights).name
+    shutil.copy2(weights, local_weights)
+
+    fmt, _ = EXPORT_FORMATS[backend]
+    options = {"format": fmt, "dynamic": True}
+    if int8:
+        options.update(int8=True, data=data_yaml)
+
+    started = time.perf_counter()
+    exported = Path(YOLO(local_weights).export(**options))
+    if exported != target:
+        shutil.move(str(exported), str(target))
+    local_weights.unlink(missing_ok=True)
+    print(
+        f"📦 Exported {name} {version} to {backend}{' INT8' if int8 else ''} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    return target, _tag(backend, int8)
+
+
+def open_model(path):
+    """YOLO model for .pt weights or an exported artifact."""
+    path = str(path)
+    return YOLO(path) if path.endswith(".pt") else YOLO(path, task="detect")
+
+
+def resolve(name, weights, version):
+    """
+    (path to load, version tag) for `weights` on the configured backend,
+    exporting first if needed; falls back to the .pt weights on failure.
+    """
+    backend, _ = backend_config(name)
+    if backend == "pytorch":
+        return Path(weights), ""
+    try:
+        return export(name, weights, version)
+    except Exception as e:
+        print(f"⚠️ {backend} backend for {name} unavailable, using PyTorch: {e}")
+        return Path(weights), ""
+
+
+def load(name, weights, version):
+    """
+    YOLO model for `weights`, served from the configured backend.
+    Returns (model, version tag); falls back to the .pt weights if the
+    export cannot be built or loaded.
+    """
+    path, tag = resolve(name, weights, version)
+    if not tag:
+        return open_model(path), tag
+    try:
+        return open_model(path), tag
+    except Exception as e:
+        print(f"⚠️ Exported {name} model failed to load, using PyTorch: {e}")
+        return YOLO(weights), ""
+
+
+def _latency_ms(model, runs):
+    dummy = np.zeros((MODEL_WARMUP_SIZE, MODEL_WARMUP_SIZE, 3), dtype=np.uint8)
+    model(dummy, verbose=False)  # warmup
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        model(dummy, verbose=False)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "p50_ms": round(timings[len(timings) // 2], 2),
+        "mean_ms": round(sum(timings) / len(timings), 2)
+    }
+
+
+def benchmark(name, weights, version, runs=20, data_yaml=None):
+    """
+    Compare the configured backend against the .pt baseline: latency on a
+    synthetic image and, when `data_yaml` is given, mAP50.
+    """
+    backend, int8 = backend_config(name)
+    report = {"model": name, "version": version, "backend": backend, "int8": int8}
+
+    candidates = {"pytorch": lambda: YOLO(weights)}
+    if backend != "pytorch":
+        candidates[backend] = lambda: YOLO(str(export(name, weights, version, data_yaml)[0]), task="detect")
+
+    for label, build in candidates.items():
+        model = build()
+        entry = _latency_ms(model, runs)
+        if data_yaml:
+            entry["map50"] = round(float(model.val(data=data_yaml, verbose=False).box.map50), 4)
+        report[label] = entry
+
+    if backend != "pytorch":
+        base, alt = report["pytorch"], report[backend]
+        report["speedup"] = round(base["p50_ms"] / alt["p50_ms"], 2) if alt["p50_ms"] else None
+    print(f"⏱️ Backend benchmark: {report}")
+    return report
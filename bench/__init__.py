@@ -0,0 +1,108 @@
+"""
+Benchmarks and load tests for the API.
+
+    python -m bench.synthetic --images 20000 --objects 5   # build a scratch DB
+    python -m bench.load --mode inprocess --concurrency 8 --requests 500
+    python -m bench.load --mode http --url http://localhost:5000
+    python -m bench.micro
+
+Everything runs inside a scratch working directory (`--workdir`, default
+bench/work) so the database, uploads and training data of the real
+server are never touched; the schema files and model weights are linked
+in from the repository. Results are written as JSON (`--out`) so two runs
+can be compared.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_WORKDIR = ROOT / "bench" / "work"
+
+# read-only inputs the app expects relative to its working directory
+_SHARED = ("create.sql", "migrations", "model")
+
+
+def use_workdir(path=DEFAULT_WORKDIR):
+    """
+    Make `path` the working directory of this process, with the schema and
+    models linked in. Call before importing any app module: config paths
+    are relative and resolved on import.
+    """
+    path = Path(path).resolve()
+    path.mkdir(parents=True, exist_ok=True)
+    for name in _SHARED:
+        link, target = path / name, ROOT / name
+        if target.exists() and not os.path.lexists(link):
+            link.symlink_to(target, target_is_directory=target.is_dir())
+    os.chdir(path)
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    return path
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def summarize(latencies, elapsed=None, errors=0):
+    """Throughput and latency percentiles (ms) of a list of durations in seconds."""
+    ordered = sorted(latencies)
+    count = len(ordered)
+    summary = {
+        "count": count,
+        "errors": errors,
+        "mean_ms": round(sum(ordered) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if count else 0.0,
+    }
+    if elapsed:
+        summary["throughput_rps"] = round(count / elapsed, 2)
+    return summary
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def write_report(path, kind, params, results):
+    """Write one run as JSON together with what is needed to compare runs."""
+    report = {
+        "kind": kind,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": params,
+        "results": results,
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2))
+    print(f"📝 Wrote {kind} report to {path}")
+    return report
+
+
+def print_table(results):
+    print(f"{'name':<28}{'count':>8}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, r in results.items():
+        print(
+            f"{name:<28}{r['count']:>8}{r.get('throughput_rps', ''):>10}"
+            f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+        )
@@ -0,0 +1,267 @@
+"""
+Load test: drive the API at a fixed concurrency and report throughput and
+p50/p95/p99 latency per endpoint.
+
+    python -m bench.load --mode inprocess --endpoints detect,data --concurrency 8 --requests 400
+    python -m bench.load --mode http --url http://localhost:5000 --endpoints data --duration 30
+
+`inprocess` runs the Flask app in this process through its test client
+(no network, same code path below the WSGI layer) inside the scratch
+workdir; populate it first with `python -m bench.synthetic`. `http` hits
+a running server, whose database and uploads are real: endpoints that
+write (every detect and POST /data, which relabels images for training)
+only run there with --allow-writes, and POST /data is never a default.
+"""
+import io
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from bench import use_workdir, summarize, write_report, print_table, DEFAULT_WORKDIR, ROOT
+from bench.synthetic import make_image, make_detections
+
+ENDPOINTS = ("detect", "detect-money", "detect-text", "data", "data-post")
+WRITE_ENDPOINTS = ("detect", "detect-money", "detect-text", "data-post")
+HTTP_DEFAULT_ENDPOINTS = ("detect", "detect-money", "detect-text", "data")
+
+
+# ─── clients ────────────────────────────────────────────────────────────────
+
+class InProcessClient:
+    """The app's test client; one per thread, since it keeps per-client state."""
+
+    def __init__(self):
+        from main import app
+        self.app = app
+        self._local = threading.local()
+
+    def _client(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        return client
+
+    def get(self, path):
+        response = self._client().get(path)
+        return response.status_code, response.get_data()
+
+    def post_image(self, path, data):
+        response = self._client().post(
+            path, data={"image": (io.BytesIO(data), "bench.jpg")}, content_type="multipart/form-data"
+        )
+        return response.status_code, response.get_data()
+
+    def post_json(self, path, body):
+        response = self._client().post(path, json=body)
+        return response.status_code, response.get_data()
+
+
+class HttpClient:
+    """Plain urllib, so the benchmark needs nothing beyond the app's own dependencies."""
+
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _send(self, request):
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def get(self, path):
+        return self._send(urllib.request.Request(self.base_url + path))
+
+    def post_image(self, path, data):
+        boundary = uuid.uuid4().hex
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"bench.jpg\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n"
+        ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+        return self._send(urllib.request.Request(
+            self.base_url + path, data=body, method="POST",
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        ))
+
+    def post_json(self, path, body):
+        return self._send(urllib.request.Request(
+            self.base_url + path, data=json.dumps(body).encode(), method="POST",
+            headers={"Content-Type": "application/json"}
+        ))
+
+
+# ─── workload ───────────────────────────────────────────────────────────────
+
+class Workload:
+    """
+    Builds one request per call. Uploads get a unique suffix after the
+    JPEG end marker (still decodes the same) unless `cache_hits`, so the
+    result cache does not turn the run into a cache benchmark.
+    """
+
+    def __init__(self, client, distinct_images=16, cache_hits=False, seed=0):
+        self.client = client
+        self.cache_hits = cache_hits
+        self.images = [make_image(seed + i) for i in range(distinct_images)]
+        self._counter = iter(range(1 << 62))
+        self._lock = threading.Lock()
+        self.image_ids = []
+
+    def _upload(self):
+        with self._lock:
+            n = next(self._counter)
+        data = self.images[n % len(self.images)]
+        return data if self.cache_hits else data + n.to_bytes(8, "little")
+
+    def load_image_ids(self, pages=4):
+        """IDs for POST /data, taken from the first pages of GET /data."""
+        path = "/data?limit=500"
+        for _ in range(pages):
+            status, body = self.client.get(path)
+            if status != 200:
+                break
+            page = json.loads(body)
+            self.image_ids.extend(item["image_id"] for item in page["items"] if item["type"] != "Text")
+            if not page.get("next_cursor"):
+                break
+            path = f"/data?limit=500&cursor={page['next_cursor']}"
+
+    def call(self, endpoint, rng):
+        if endpoint == "detect":
+            return self.client.post_image("/detect", self._upload())
+        if endpoint == "detect-money":
+            return self.client.post_image("/detect-money", self._upload())
+        if endpoint == "detect-text":
+            return self.client.post_image("/detect-text", self._upload())
+        if endpoint == "data":
+            kind = rng.choice(("", "&type=Object", "&type=Money", "&status=Good"))
+            return self.client.get(f"/data?limit=50{kind}")
+        if endpoint == "data-post":
+            image_id = rng.choice(self.image_ids)
+            return self.client.post_json("/data", [{
+                "image_id": image_id,
+                "objects": make_detections(rng, rng.randrange(1, 6))
+            }])
+        raise ValueError(f"Unknown endpoint {endpoint}")
+
+
+def run_endpoint(workload, endpoint, concurrency, requests=None, duration=None, warmup=5, seed=0):
+    """Hammer one endpoint; returns its summary (latencies in ms, status counts)."""
+    warm_rng = random.Random(seed)
+    for _ in range(warmup):
+        workload.call(endpoint, warm_rng)
+
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    remaining = iter(range(requests)) if requests else None
+    deadline = time.perf_counter() + duration if duration else None
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        while True:
+            if remaining is not None:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+            elif time.perf_counter() >= deadline:
+                return
+            started = time.perf_counter()
+            try:
+                status, _ = workload.call(endpoint, rng)
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                if status == 200:
+                    latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    errors = sum(n for status, n in statuses.items() if status != "200")
+    summary = summarize(latencies, elapsed, errors)
+    summary["statuses"] = statuses
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the API.")
+    parser.add_argument("--mode", choices=("inprocess", "http"), default="inprocess")
+    parser.add_argument("--url", default="http://localhost:5000", help="server for --mode http")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR, help="scratch dir for --mode inprocess")
+    parser.add_argument(
+        "--endpoints",
+        help=f"comma-separated (default {','.join(ENDPOINTS)}; with --mode http {','.join(HTTP_DEFAULT_ENDPOINTS)})"
+    )
+    parser.add_argument(
+        "--allow-writes", action="store_true",
+        help="let --mode http run endpoints that add or relabel images on the server"
+    )
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200, help="per endpoint (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="seconds per endpoint")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--distinct-images", type=int, default=16)
+    parser.add_argument("--cache-hits", action="store_true", help="re-send identical uploads")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="JSON report (default bench/results/load-<mode>-<time>.json)")
+    args = parser.parse_args(argv)
+
+    if args.endpoints is None:
+        endpoints = list(HTTP_DEFAULT_ENDPOINTS if args.mode == "http" else ENDPOINTS)
+    else:
+        endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+    writes = [e for e in endpoints if e in WRITE_ENDPOINTS]
+    if args.mode == "http" and writes and not args.allow_writes:
+        parser.error(
+            f"{', '.join(writes)} would write to the server's database; "
+            f"pass --allow-writes, or e.g. --endpoints data"
+        )
+    out = args.out or ROOT / "bench" / "results" / f"load-{args.mode}-{time.strftime('%Y%m%d_%H%M%S')}.json"
+
+    if args.mode == "inprocess":
+        use_workdir(args.workdir)
+        client = InProcessClient()
+        from model_manager import model_manager
+        for endpoint, kind in (("detect", "Object"), ("detect-money", "Money")):
+            if endpoint in endpoints:
+                model_manager[kind].load()
+    else:
+        client = HttpClient(args.url)
+
+    workload = Workload(client, args.distinct_images, args.cache_hits, args.seed)
+    if "data-post" in endpoints:
+        workload.load_image_ids()
+        if not workload.image_ids:
+            print("⚠️ No images to update; skipping data-post (run bench.synthetic first)")
+            endpoints.remove("data-post")
+
+    results = {}
+    for endpoint in endpoints:
+        print(f"🏁 {endpoint}: concurrency {args.concurrency}")
+        results[endpoint] = run_endpoint(
+            workload, endpoint, args.concurrency,
+            requests=None if args.duration else args.requests,
+            duration=args.duration, warmup=args.warmup, seed=args.seed
+        )
+
+    print_table(results)
+    params = {k: (str(v) if k == "workdir" else v) for k, v in vars(args).items() if k != "out"}
+    write_report(out, "load", params, results)
+
+
+if __name__ == "__main__":
+    main()
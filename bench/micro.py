@@ -0,0 +1,165 @@
+"""
+Micro-benchmarks of the hot functions, against the scratch database.
+
+    python -m bench.micro [--only get_detections,save_to_db] [--repeat 200]
+
+Covers get_detections, save_to_db (single and grouped), GET /data's
+get_data and the label generation of routes/train.py. Populate the
+workdir first (`python -m bench.synthetic`) for get_data and labels.
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+from bench import use_workdir, summarize, write_report, print_table, DEFAULT_WORKDIR, ROOT
+from bench.synthetic import make_detections
+
+
+def timed(fn, repeat, warmup=3):
+    """Per-call durations of `repeat` calls to `fn`, after `warmup` untimed ones."""
+    for _ in range(warmup):
+        fn()
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+# ─── cases ──────────────────────────────────────────────────────────────────
+
+def bench_get_detections(repeat, boxes=(10, 100, 300)):
+    from functions import get_detections
+    from workers import LiteBoxes, LiteResults
+
+    rng = np.random.default_rng(0)
+    names = {i: f"class_{i}" for i in range(80)}
+    results = {}
+    for n in boxes:
+        xy = rng.uniform(0, 600, (n, 2)).astype(np.float32)
+        res = LiteResults(names, LiteBoxes(
+            rng.uniform(0, 1, n).astype(np.float32),
+            rng.integers(0, 80, n).astype(np.float32),
+            np.hstack([xy, xy + 40]),
+        ), (640, 640))
+        results[f"get_detections[{n}]"] = summarize(timed(lambda: get_detections(res), repeat))
+    return results
+
+
+def bench_save_to_db(repeat, group=32):
+    from functions import save_to_db, save_many_to_db
+
+    rng = random.Random(0)
+
+    def record():
+        return {
+            "image_path": "uploads/object_images/bench.jpg",
+            "type_title": "Object",
+            "status_title": "Good",
+            "detections": make_detections(rng, 5),
+            "model_version": "bench",
+            "width": 640,
+            "height": 480
+        }
+
+    return {
+        "save_to_db": summarize(timed(lambda: save_to_db(**record(), wait=True), repeat)),
+        f"save_many_to_db[{group}]": summarize(timed(
+            lambda: save_many_to_db([record() for _ in range(group)], wait=True), max(1, repeat // 4)
+        )),
+    }
+
+
+def bench_get_data(repeat):
+    from main import app
+    from db import release_conn
+    from routes.data import get_data
+
+    results = {}
+    for name, query in (("get_data", "limit=50"), ("get_data[type=Money]", "limit=50&type=Money"),
+                        ("get_data[limit=500]", "limit=500")):
+        def call():
+            with app.test_request_context(f"/data?{query}"):
+                get_data()
+            release_conn()
+        results[name] = summarize(timed(call, repeat))
+    return results
+
+
+def bench_labels(repeat, model_type="Object"):
+    """Label files for every ready image: the first pass writes them, later passes find them unchanged."""
+    from db import get_conn, dimensions
+    from datasets import DatasetStore
+    from routes.train import _create_labels_for_images
+
+    cursor = get_conn().cursor()
+    cursor.execute(
+        "SELECT ID, Path FROM Image WHERE ReadyForTraining = 1 AND Type = ?",
+        (dimensions.get("Type", model_type, cursor.connection),)
+    )
+    rows = cursor.fetchall()
+    if not rows:
+        print(f"⚠️ No ready {model_type} images; skipping labels (run bench.synthetic first)")
+        return {}
+
+    with tempfile.TemporaryDirectory(dir=".") as root:
+        store = DatasetStore(model_type, root=root)
+        image_info = [(img_id, store.add_image(img_id, os.path.abspath(path))) for img_id, path in rows]
+
+        started = time.perf_counter()
+        _create_labels_for_images(cursor, store, image_info)
+        first = time.perf_counter() - started
+
+        unchanged = timed(lambda: _create_labels_for_images(cursor, store, image_info), repeat, warmup=0)
+
+    return {
+        f"labels_first[{len(rows)}]": summarize([first]),
+        f"labels_unchanged[{len(rows)}]": summarize(unchanged),
+    }
+
+
+CASES = {
+    "get_detections": bench_get_detections,
+    "save_to_db": bench_save_to_db,
+    "get_data": bench_get_data,
+    "labels": bench_labels,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the hot functions.")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR)
+    parser.add_argument("--only", default=",".join(CASES))
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--label-repeat", type=int, default=5)
+    parser.add_argument("--out", help="JSON report (default bench/results/micro-<time>.json)")
+    args = parser.parse_args(argv)
+
+    cases = [c.strip() for c in args.only.split(",") if c.strip()]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+    out = args.out or ROOT / "bench" / "results" / f"micro-{time.strftime('%Y%m%d_%H%M%S')}.json"
+
+    use_workdir(args.workdir)
+    from functions import initiate_db
+    initiate_db()
+
+    results = {}
+    for case in cases:
+        print(f"⏱️ {case}")
+        repeat = args.label_repeat if case == "labels" else args.repeat
+        results.update(CASES[case](repeat))
+
+    print_table(results)
+    params = {"only": cases, "repeat": args.repeat, "label_repeat": args.label_repeat}
+    write_report(out, "micro", params, results)
+
+
+if __name__ == "__main__":
+    main()
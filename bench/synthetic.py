@@ -0,0 +1,137 @@
+"""
+Synthetic inputs: JPEG uploads and a populated database.
+
+    python -m bench.synthetic --images 20000 --objects 5 [--workdir DIR]
+"""
+import random
+import argparse
+import datetime
+
+import cv2
+import numpy as np
+
+from bench import use_workdir, DEFAULT_WORKDIR
+
+CLASSES = {
+    "Object": ("person", "car", "bicycle", "dog", "chair", "bottle", "cup", "door"),
+    "Money": ("1", "2", "5", "10", "20", "50", "100", "200"),
+}
+
+
+def make_image(seed=0, width=640, height=480, shapes=6):
+    """JPEG bytes of a noisy image with a few filled rectangles; same seed, same bytes."""
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 64, (height, width, 3), dtype=np.uint8)
+    for _ in range(shapes):
+        x1, y1 = int(rng.integers(0, width - 40)), int(rng.integers(0, height - 40))
+        x2, y2 = x1 + int(rng.integers(20, width // 3)), y1 + int(rng.integers(20, height // 3))
+        cv2.rectangle(img, (x1, y1), (x2, y2), tuple(int(c) for c in rng.integers(64, 256, 3)), -1)
+    ok, buf = cv2.imencode(".jpg", img)
+    return buf.tobytes()
+
+
+def make_detections(rng, count, width=640, height=480, classes=CLASSES["Object"]):
+    """`count` random detections in the shape get_detections returns."""
+    detections = []
+    for _ in range(count):
+        x1, y1 = rng.randrange(0, width - 20), rng.randrange(0, height - 20)
+        conf = round(rng.random(), 4)
+        detections.append({
+            "class": rng.choice(classes),
+            "confidence": conf,
+            "bbox": [x1, y1, min(width, x1 + rng.randrange(10, 200)), min(height, y1 + rng.randrange(10, 200))],
+            "status": "Faulty" if conf <= 0.5 else "Middle" if conf <= 0.8 else "Good"
+        })
+    return detections
+
+
+def _sample_file(upload_type, seed):
+    """One real JPEG per type that every synthetic row points at."""
+    from functions import build_image_path
+    path = build_image_path(f"synthetic_{upload_type.lower()}.jpg", upload_type)
+    with open(path, "wb") as fp:
+        fp.write(make_image(seed))
+    return path
+
+
+def populate(images, objects_per_image, ready_fraction=0.3, seed=0, chunk=5000):
+    """
+    Append `images` Image rows (Object/Money/Text mixed) with
+    `objects_per_image` objects each to the database in the working
+    directory. Returns the number of rows written.
+    """
+    from db import connect, dimensions
+    from schema import migrate
+
+    rng = random.Random(seed)
+    conn = connect()
+    migrate(conn)
+    dimensions.load(conn)
+    cursor = conn.cursor()
+
+    paths = {kind: _sample_file(kind, seed) for kind in ("Object", "Money", "Text")}
+    type_ids = {kind: dimensions.get("Type", kind, conn) for kind in paths}
+    status_ids = {s: dimensions.get("Status", s, conn) for s in ("Good", "Middle", "Faulty")}
+    ext_id = dimensions.get_or_create(cursor, "Extension", "jpg")
+    conn.commit()
+    dimensions.committed(conn)
+
+    image_id = (cursor.execute("SELECT MAX(ID) FROM Image").fetchone()[0] or 0) + 1
+    object_id = (cursor.execute("SELECT MAX(ID) FROM Object").fetchone()[0] or 0) + 1
+    start = datetime.datetime(2024, 1, 1)
+
+    written = 0
+    while written < images:
+        image_rows, object_rows, link_rows = [], [], []
+        for _ in range(min(chunk, images - written)):
+            kind = rng.choice(("Object", "Object", "Money", "Text"))
+            dt = (start + datetime.timedelta(seconds=image_id * 17)).isoformat(sep=" ")
+            detections = [] if kind == "Text" else make_detections(rng, objects_per_image, classes=CLASSES[kind])
+            status = "Good"
+            for det in detections:
+                if det["status"] == "Faulty" or (det["status"] == "Middle" and status == "Good"):
+                    status = det["status"]
+            image_rows.append((
+                image_id, f"synthetic_{image_id}", ext_id, type_ids[kind],
+                int(rng.random() < ready_fraction), dt, paths[kind], status_ids[status],
+                "synthetic text" if kind == "Text" else None, "synthetic", 640, 480
+            ))
+            for det in detections:
+                object_rows.append((object_id, det["class"], det["confidence"], *det["bbox"], status_ids[det["status"]]))
+                link_rows.append((image_id, object_id))
+                object_id += 1
+            image_id += 1
+
+        cursor.executemany("""
+            INSERT INTO Image (ID, Title, Extension, Type, ReadyForTraining, DateTime, Path, Status, Text, ModelVersion, Width, Height)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, image_rows)
+        cursor.executemany("""
+            INSERT INTO Object (ID, Name, Detection, x1, y1, x2, y2, Status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, object_rows)
+        cursor.executemany("INSERT INTO ImageObjectLink (Image, Object) VALUES (?, ?)", link_rows)
+        conn.commit()
+        written += len(image_rows)
+        print(f"🧪 {written}/{images} synthetic images written")
+
+    conn.execute("ANALYZE")
+    conn.close()
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Populate a scratch database with synthetic images.")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR)
+    parser.add_argument("--images", type=int, default=10000)
+    parser.add_argument("--objects", type=int, default=5, help="objects per Object/Money image")
+    parser.add_argument("--ready", type=float, default=0.3, help="share marked ReadyForTraining")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    use_workdir(args.workdir)
+    populate(args.images, args.objects, args.ready, args.seed)
+
+
+if __name__ == "__main__":
+    main()
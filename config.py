@@ -1,8 +1,22 @@
-from ultralytics import YOLO
-import easyocr
-
 DATABASE = "database.db"
 SCHEMA_FILE = "create.sql"
+MIGRATIONS_DIR = "migrations"
+
+# Print query plans of the hot queries at startup
+CHECK_QUERY_PLANS = True
+
+# PRAGMAs applied to every SQLite connection
+DB_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 268435456,  # 256 MiB
+    "cache_size": -65536,  # 64 MiB (negative = KiB)
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000
+}
+
+# Idle connections kept for reuse across requests
+DB_POOL_SIZE = 16
 
 allowed_statuses = ("Good", "Middle")
 detection_statuses = ("Good", "Middle", "Faulty")
@@ -13,7 +27,15 @@ languages = [
     'ro', 'tr', 'cs', 'sk', 'sl', 'hu'
 ]
 
-ocr_reader = easyocr.Reader(languages, gpu=False)
+# OCR readers are built lazily per language set (see ocr_pool.py).
+# /detect-text?languages=en,de picks a set; without it the default is used.
+OCR_DEFAULT_LANGUAGES = languages
+
+# Estimated reader footprint; least recently used readers are dropped
+# once the estimate exceeds the budget
+OCR_MEMORY_BUDGET_MB = 2048
+OCR_READER_BASE_MB = 350
+OCR_LANGUAGE_MB = 20
 
 upload_folders = {
     "Object": "uploads/object_images",
@@ -21,6 +43,55 @@ upload_folders = {
     "Text": "uploads/text_images"
 }
 
+# Background DB writer: max queued jobs, max records per transaction and
+# whether requests wait for their rows to be committed (override: ?wait=1)
+DB_WRITE_QUEUE = 1024
+DB_WRITE_GROUP = 256
+PERSIST_WAIT_FOR_COMMIT = False
+
+# Re-uploads of identical bytes reuse the stored result instead of running
+# inference again; key = (SHA-256 of the upload, model, model version).
+# RESULT_CACHE_SIZE entries stay in memory, all of them in the DB.
+# On a hit, "link" answers with the original image_id; "duplicate" records a
+# new Image row sharing the original file and results.
+RESULT_CACHE = True
+RESULT_CACHE_SIZE = 10000
+RESULT_CACHE_ON_HIT = "link"
+
+# GET /data page size (default and upper bound for ?limit=)
+DATA_PAGE_SIZE = 50
+DATA_MAX_PAGE_SIZE = 500
+
+# Rows fetched per round-trip while streaming /data/export
+EXPORT_FETCH_SIZE = 1000
+
+# /data/image/<id>: thumbnail sizes (?size=N), on-disk thumbnail budget,
+# ID→path cache entries and Cache-Control max-age in seconds
+THUMBNAIL_DIR = "cache/thumbnails"
+THUMBNAIL_SIZES = (128, 256, 512)
+THUMBNAIL_CACHE_BYTES = 512 * 1024 * 1024
+IMAGE_PATH_CACHE_SIZE = 10000
+IMAGE_CACHE_MAX_AGE = 3600
+
+# Max uploads waiting for the background archive writer, and how often a
+# failed write is retried before the upload is dropped (it is then not
+# recorded in the DB either)
+IMAGE_WRITE_QUEUE = 256
+IMAGE_WRITE_RETRIES = 3
+
+# Opt-in cProfile captures (see profiling.py): a PROFILE_SAMPLE_RATE share of
+# detection requests, any detection request sent with the PROFILE_HEADER
+# header (when PROFILE_ALLOW_HEADER) and, with PROFILE_TRAINING, every
+# training job. The newest PROFILE_MAX_FILES profiles, at most
+# PROFILE_MAX_BYTES in total, are kept in PROFILE_DIR.
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_HEADER = "X-Profile"
+PROFILE_ALLOW_HEADER = True
+PROFILE_TRAINING = False
+PROFILE_DIR = "cache/profiles"
+PROFILE_MAX_FILES = 100
+PROFILE_MAX_BYTES = 256 * 1024 * 1024
+
 model_paths = {
     "Object": "model/object/yolo11x.pt",
     "Money": "model/money/yolo11md.pt"
@@ -30,31 +101,101 @@ BACKUP_DIR = "models_backup"
 TRAINING_DATA_DIR = "training_data"
 RUNS_DIR = "runs"
 
-object_model = YOLO(model_paths["Object"])
-money_model = YOLO(model_paths["Money"])
+# Share of each class held out for validation. Images get their split the
+# first time they are labelled and keep it across retrains.
+VAL_FRACTION = 0.2
 
+# Training jobs (POST /train-object, /train-money) are queued in the DB; one
+# per model type at a time, at most TRAINING_MAX_CONCURRENT running overall
+TRAINING_EPOCHS = 50
+TRAINING_MAX_CONCURRENT = 1
 
-def update_object_model():
-    global object_model
-    object_model = YOLO(model_paths["Object"])
+# Train in a separate process (see train_worker.py) so inference keeps its
+# cores: pinned to TRAINING_CPUS (None = all), with TRAINING_TORCH_THREADS
+# torch threads, TRAINING_WORKERS dataloader workers and niceness TRAINING_NICE
+TRAINING_SUBPROCESS = True
+TRAINING_CPUS = None  # e.g. [4, 5, 6, 7]
+TRAINING_TORCH_THREADS = 2
+TRAINING_WORKERS = 2
+TRAINING_NICE = 10
 
+# Adaptive mode: pause the training process while a detect queue is deeper
+# than TRAINING_THROTTLE_QUEUE_DEPTH or p95 latency over the last
+# INFERENCE_LATENCY_WINDOW seconds exceeds TRAINING_THROTTLE_P95_MS;
+# resume once both are below half of that
+TRAINING_THROTTLE = True
+TRAINING_THROTTLE_QUEUE_DEPTH = 16
+TRAINING_THROTTLE_P95_MS = 2000
+INFERENCE_LATENCY_WINDOW = 30
 
-def update_money_model():
-    global money_model
-    money_model = YOLO(model_paths["Money"])
+# Micro-batching of /detect and /detect-money requests, per model
+BATCH_CONFIG = {
+    "Object": {"max_batch_size": 8, "max_wait_ms": 20, "max_queue": 64},
+    "Money": {"max_batch_size": 8, "max_wait_ms": 20, "max_queue": 64}
+}
 
+# Seconds a request waits for its batched inference result
+INFERENCE_TIMEOUT = 120
+
+# Max images accepted by one /detect*/batch request
+MAX_BATCH_IMAGES = 50
+
+# Async detection (POST /detect*/async, polled at /detect/jobs/<id>): jobs
+# are kept in the DetectionJob table and run by ASYNC_WORKERS threads,
+# highest ASYNC_PRIORITIES first. A new job is refused with 503 once the
+# queued jobs of all kinds reach the ASYNC_QUEUE_LIMITS of its kind, so
+# text is shed first and money last. Jobs interrupted by a restart are
+# retried up to ASYNC_MAX_ATTEMPTS times; finished jobs are deleted after
+# ASYNC_RESULT_TTL seconds. Long-polls wait at most ASYNC_MAX_WAIT seconds.
+ASYNC_WORKERS = 4
+ASYNC_PRIORITIES = {"Money": 3, "Object": 2, "Text": 1}
+ASYNC_QUEUE_LIMITS = {"Money": 1000, "Object": 500, "Text": 200}
+ASYNC_MAX_ATTEMPTS = 3
+ASYNC_RESULT_TTL = 24 * 3600
+ASYNC_MAX_WAIT = 30
+
+# Run inference (YOLO and OCR) in this many worker processes, each with its
+# own copy of the models and INFERENCE_WORKER_THREADS torch threads; images
+# are handed over through shared memory. 0 = run in the server process.
+# Size it so workers × threads ≈ physical cores.
+INFERENCE_WORKERS = 0
+INFERENCE_WORKER_THREADS = 2
+
+# Models are loaded by model_manager.py: on first use, or in the background
+# right after the server starts when MODEL_PRELOAD is set
+MODEL_PRELOAD = True
+
+# Side of the blank image used for the warmup inference
+MODEL_WARMUP_SIZE = 640
+
+# Unload models unused for this many seconds (None = keep loaded)
+MODEL_IDLE_UNLOAD_SECONDS = None
+
+# Inference backend per model: "pytorch" (the .pt weights as-is), "onnx" or
+# "openvino". Exports are built per weights version under EXPORT_DIR when
+# weights are promoted (or on first load). INT8 is OpenVINO-only and is
+# calibrated on the model's training images at promotion time.
+MODEL_BACKENDS = {
+    "Object": {"backend": "pytorch", "int8": False},
+    "Money": {"backend": "pytorch", "int8": False}
+}
+EXPORT_DIR = "model/exports"
+
+# Compare each backend with the .pt baseline after preloading: latency on a
+# synthetic image, and mAP50 when a dataset YAML is given for the model
+BACKEND_BENCHMARK = False
+BACKEND_BENCHMARK_RUNS = 20
+BACKEND_BENCHMARK_DATA = {"Object": None, "Money": None}
 
 MODEL_CONFIG = {
     "Money": {
-        "path": model_paths["Object"],
+        "path": model_paths["Money"],
         "upload_folder": upload_folders["Money"],
-        "runs": "train_money",
-        "reload": update_money_model
+        "runs": "train_money"
     },
     "Object": {
-        "path": model_paths["Money"],
+        "path": model_paths["Object"],
         "upload_folder": upload_folders["Object"],
-        "runs": "train_object",
-        "reload": update_object_model
+        "runs": "train_object"
     }
 }
\ No newline at end of file
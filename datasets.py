@@ -0,0 +1,202 @@
+import os
+import json
+import shutil
+import hashlib
+import datetime
+from pathlib import Path
+from collections import Counter, defaultdict
+
+from config import TRAINING_DATA_DIR
+
+
+def _link_or_copy(src, dest):
+    """Hardlink `src` to `dest` (no bytes copied); copy only across file systems."""
+    tmp = dest.with_name(dest.name + ".part")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dest)
+
+
+def _write_atomic(path, text):
+    tmp = path.with_name(path.name + ".part")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+def label_version(text):
+    """Short content hash of a label file."""
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+def _split_rank(img_id):
+    """Fixed pseudo-random order of images for split assignment."""
+    return hashlib.sha1(f"split:{img_id}".encode()).hexdigest()
+
+
+class DatasetStore:
+    """
+    Append-only training set of one model type under TRAINING_DATA_DIR/<type>:
+    images/<ID><ext>, labels/<ID>.txt and manifest.json.
+
+    The manifest records, per image ID, its file, the version (content
+    hash) of its current label, its classes and whether it is in the train
+    or val split, so a retrain only links new images and rewrites labels
+    that actually changed. Images are hardlinked from the upload archive,
+    never moved or copied within one file system.
+    """
+
+    def __init__(self, model_type, root=TRAINING_DATA_DIR):
+        self.model_type = model_type
+        self.base = Path(root) / model_type
+        self.images_dir = self.base / "images"
+        self.labels_dir = self.base / "labels"
+        self.manifest_path = self.base / "manifest.json"
+        self.images_dir.mkdir(parents=True, exist_ok=True)
+        self.labels_dir.mkdir(parents=True, exist_ok=True)
+
+        self.manifest = self._load()
+        self.added = 0
+        self.relabeled = 0
+        self.assigned = 0
+
+    def _load(self):
+        if self.manifest_path.exists():
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        return {"revision": 0, "updated": None, "images": {}}
+
+    def __len__(self):
+        return len(self.manifest["images"])
+
+    def __contains__(self, img_id):
+        entry = self.manifest["images"].get(str(img_id))
+        return entry is not None and (self.images_dir / entry["file"]).exists()
+
+    def image_path(self, img_id):
+        return self.images_dir / self.manifest["images"][str(img_id)]["file"]
+
+    def add_image(self, img_id, src_path):
+        """Link an upload into the store (no-op if already there); returns its store path."""
+        if img_id in self:
+            return self.image_path(img_id)
+
+        src_path = Path(src_path)
+        dest = self.images_dir / f"{img_id}{src_path.suffix or '.jpg'}"
+        _link_or_copy(src_path, dest)
+        self.manifest["images"][str(img_id)] = {
+            "file": dest.name,
+            "label": None,
+            "classes": [],
+            "split": None,
+            "added": datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
+        }
+        self.added += 1
+        return dest
+
+    def set_label(self, img_id, text):
+        """Write the label of `img_id` unless this version is already stored."""
+        entry = self.manifest["images"][str(img_id)]
+        version = label_version(text)
+        label_file = self.labels_dir / f"{img_id}.txt"
+        if entry["label"] == version and label_file.exists():
+            return False
+        _write_atomic(label_file, text)
+        entry["label"] = version
+        entry["classes"] = sorted({int(line.split()[0]) for line in text.splitlines() if line.strip()})
+        self.relabeled += 1
+        return True
+
+    def assign_splits(self, val_fraction):
+        """
+        Put every labelled image that has no split yet into train or val,
+        once and for good. Images are stratified by their rarest class and
+        taken in a fixed hash order, so the same data always gives the same
+        split and about `val_fraction` of each class is held out, but at
+        least one image once a class has two.
+        """
+        images = self.manifest["images"]
+        freq = Counter(c for entry in images.values() for c in entry.get("classes") or [])
+
+        def stratum(entry):
+            classes = entry.get("classes") or []
+            return min(classes, key=lambda c: (freq[c], c)) if classes else -1
+
+        counts, new = defaultdict(Counter), defaultdict(list)
+        for img_id, entry in images.items():
+            if entry.get("split"):
+                counts[stratum(entry)][entry["split"]] += 1
+            elif entry["label"] is not None:
+                new[stratum(entry)].append(img_id)
+
+        for key, ids in new.items():
+            seen = counts[key]
+            for img_id in sorted(ids, key=_split_rank):
+                # the first image trains, the second is held out, later ones
+                # keep val at about val_fraction
+                total = seen["train"] + seen["val"] + 1
+                if seen["val"] == 0:
+                    split = "val" if total >= 2 else "train"
+                else:
+                    split = "val" if seen["val"] + 1 <= val_fraction * total else "train"
+                images[img_id]["split"] = split
+                seen[split] += 1
+                self.assigned += 1
+
+    def write_split_lists(self):
+        """
+        Write train.txt / val.txt (image paths) for the YOLO dataset YAML.
+        Returns (train_list, val_list, val_hash); `val_hash` changes whenever
+        a validation image or its label does. Without any val images yet the
+        train set doubles as val (YOLO needs one) and `val_hash` is None:
+        there is nothing held out to compare models on.
+        """
+        splits = defaultdict(list)
+        for img_id, entry in sorted(self.manifest["images"].items(), key=lambda kv: int(kv[0])):
+            if entry.get("split"):
+                splits[entry["split"]].append((img_id, entry))
+
+        held_out = bool(splits["val"])
+        if not held_out:
+            print(f"⚠️ {self.model_type} dataset has no validation images yet, validating on train")
+            splits["val"] = splits["train"]
+
+        paths = {}
+        for split in ("train", "val"):
+            paths[split] = self.base / f"{split}.txt"
+            _write_atomic(paths[split], "".join(
+                f"{(self.images_dir / entry['file']).resolve().as_posix()}\n"
+                for _, entry in splits[split]
+            ))
+
+        if not held_out:
+            return paths["train"], paths["val"], None
+        val_hash = hashlib.sha1("".join(
+            f"{img_id}:{entry['label']}\n" for img_id, entry in splits["val"]
+        ).encode()).hexdigest()[:12]
+        return paths["train"], paths["val"], val_hash
+
+    def save(self):
+        """Persist the manifest if anything changed; bumps its revision."""
+        if not (self.added or self.relabeled or self.assigned):
+            return
+        self.manifest["revision"] += 1
+        self.manifest["updated"] = datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
+        _write_atomic(self.manifest_path, json.dumps(self.manifest, indent=1))
+        print(
+            f"🗃️ {self.model_type} dataset r{self.manifest['revision']}: {len(self)} images "
+            f"(+{self.added} new, {self.relabeled} relabeled)"
+        )
+        self.added = self.relabeled = self.assigned = 0
+
+    def stats(self):
+        splits = Counter(entry.get("split") for entry in self.manifest["images"].values())
+        return {
+            "images": len(self),
+            "train": splits["train"],
+            "val": splits["val"],
+            "revision": self.manifest["revision"],
+            "updated": self.manifest["updated"]
+        }
@@ -0,0 +1,137 @@
+import queue
+import sqlite3
+import threading
+
+from config import DATABASE, DB_PRAGMAS, DB_POOL_SIZE
+
+
+def connect(database=DATABASE, **kwargs):
+    """Open a new connection with the standard PRAGMAs applied."""
+    kwargs.setdefault("check_same_thread", False)
+    conn = sqlite3.connect(database, **kwargs)
+    for name, value in DB_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+# ─── per-thread pooled connections ──────────────────────────────────────────
+
+_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+_local = threading.local()
+
+
+def get_conn():
+    """
+    Connection bound to the calling thread until `release_conn()`.
+
+    Connections are reused from a small pool instead of being opened per
+    call. Do not close them; release them instead (Flask does this at the
+    end of every request, see main.py).
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            conn = connect()
+        _local.conn = conn
+    return conn
+
+
+def release_conn(*_):
+    """Return the calling thread's connection to the pool."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        return
+    _local.conn = None
+    dimensions.rolled_back(conn)
+    try:
+        # never hand out a connection with a half-finished transaction
+        conn.rollback()
+        _pool.put_nowait(conn)
+    except (queue.Full, sqlite3.Error):
+        conn.close()
+
+
+# ─── cached dimension lookups ───────────────────────────────────────────────
+
+class DimensionCache:
+    """
+    In-process Title → ID cache for the small lookup tables
+    (Status, Type, Extension). Loaded at startup by `initiate_db` and
+    updated whenever a row inserted through `get_or_create` is committed.
+
+    Rows inserted by `get_or_create` stay private to their connection
+    until the caller reports the outcome of the transaction with
+    `committed(conn)` or `rolled_back(conn)`, so a rolled-back ID never
+    reaches the shared cache.
+    """
+
+    TABLES = ("Status", "Type", "Extension")
+
+    def __init__(self):
+        self._ids = {table: {} for table in self.TABLES}
+        self._pending = {}  # id(conn) → {(table, title): ID} not committed yet
+        self._lock = threading.Lock()
+
+    def load(self, conn):
+        for table in self.TABLES:
+            rows = conn.execute(f"SELECT Title, ID FROM {table}").fetchall()
+            with self._lock:
+                self._ids[table] = dict(rows)
+
+    def get(self, table, title, conn=None):
+        """ID of `title` in `table`, or None. Falls back to the DB on a miss."""
+        if title is None:
+            return None
+        cached = self._ids[table].get(title)
+        if cached is not None:
+            return cached
+
+        conn = conn or get_conn()
+        with self._lock:
+            pending = self._pending.get(id(conn), {}).get((table, title))
+        if pending is not None:
+            return pending
+        row = conn.execute(f"SELECT ID FROM {table} WHERE Title = ?", (title,)).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._ids[table][title] = row[0]
+        return row[0]
+
+    def get_or_create(self, cursor, table, title):
+        """ID of `title`, inserting it (on `cursor`'s transaction) if missing."""
+        conn = cursor.connection
+        found = self.get(table, title, conn)
+        if found is not None:
+            return found
+
+        cursor.execute(f"INSERT INTO {table} (Title) VALUES (?)", (title,))
+        new_id = cursor.lastrowid
+        with self._lock:
+            self._pending.setdefault(id(conn), {})[(table, title)] = new_id
+        return new_id
+
+    def committed(self, conn):
+        """Publish the rows `conn` inserted, now that its transaction is committed."""
+        with self._lock:
+            for (table, title), row_id in self._pending.pop(id(conn), {}).items():
+                self._ids[table][title] = row_id
+
+    def rolled_back(self, conn):
+        """Drop the rows `conn` inserted; its transaction was rolled back."""
+        with self._lock:
+            self._pending.pop(id(conn), None)
+
+    def forget(self, table, title):
+        """Drop a cached entry, e.g. after the row was deleted."""
+        with self._lock:
+            self._ids[table].pop(title, None)
+
+    def ids(self, table):
+        with self._lock:
+            return dict(self._ids[table])
+
+
+dimensions = DimensionCache()
@@ -0,0 +1,246 @@
+import json
+import time
+import uuid
+import queue
+import datetime
+import threading
+
+from db import connect
+
+JOB_COLUMNS = ("ID", "Kind", "State", "Created", "Started", "Finished", "Result", "Error", "Attempts")
+FINAL_STATES = ("done", "failed")
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the backlog is too long for the job's kind."""
+
+
+def _now():
+    return datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
+
+
+def _job_dict(row):
+    job = dict(zip(
+        ("job_id", "kind", "state", "created", "started", "finished", "result", "error", "attempts"),
+        row
+    ))
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+class DetectionQueue:
+    """
+    Durable queue of async detection jobs in the DetectionJob table.
+
+    `workers` threads claim jobs highest priority first, then oldest
+    first, call `runner(kind, path, options)` and store the response it
+    returns (or the error). A runner raising `queue.Full` puts the job back.
+
+    `submit` sheds load: once the number of queued jobs reaches the limit
+    of the new job's kind, it raises QueueFull, so kinds with lower limits
+    are refused first. Queued jobs survive a restart; running ones are
+    queued again, up to `max_attempts` runs. Finished jobs are deleted
+    `retention` seconds after they finish.
+    """
+
+    def __init__(self, runner, workers, priorities, limits, max_attempts=3, retention=86400):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.priorities = priorities
+        self.limits = limits
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self._conn = None
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._queued = {kind: 0 for kind in priorities}
+        self._running = 0
+        self._threads = []
+        self._last_sweep = 0.0
+
+        self.done_total = 0
+        self.failed_total = 0
+        self.rejected_total = 0
+
+    # ─── DB ─────────────────────────────────────────────────────────────────
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = connect(isolation_level=None)
+        return self._conn
+
+    def _select(self, job_id):
+        row = self._db().execute(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM DetectionJob WHERE ID = ?", (job_id,)
+        ).fetchone()
+        return _job_dict(row) if row else None
+
+    def _position(self, job):
+        """Jobs ahead of a queued one."""
+        return self._db().execute("""
+            SELECT COUNT(*) FROM DetectionJob
+             WHERE State = 'queued'
+               AND (Priority > ?1 OR (Priority = ?1 AND rowid < (SELECT rowid FROM DetectionJob WHERE ID = ?2)))
+        """, (self.priorities[job["kind"]], job["job_id"])).fetchone()[0]
+
+    # ─── public API ─────────────────────────────────────────────────────────
+
+    def start(self):
+        """Start the workers (idempotent); re-queues jobs a restart interrupted."""
+        with self._lock:
+            if self._threads:
+                return
+            db = self._db()
+            db.execute(
+                "UPDATE DetectionJob SET State = 'failed', Finished = ?, Error = 'Interrupted too often' "
+                "WHERE State = 'running' AND Attempts >= ?",
+                (_now(), self.max_attempts)
+            )
+            db.execute("UPDATE DetectionJob SET State = 'queued' WHERE State = 'running'")
+            for kind, count in db.execute(
+                "SELECT Kind, COUNT(*) FROM DetectionJob WHERE State = 'queued' GROUP BY Kind"
+            ):
+                self._queued[kind] = count
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._loop, name=f"detection-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def accepts(self, kind):
+        """Whether a job of `kind` would be taken right now."""
+        with self._lock:
+            return sum(self._queued.values()) < self.limits[kind]
+
+    def submit(self, kind, path, options=None):
+        """Queue a job on the stored upload at `path`; returns the job. Raises QueueFull."""
+        self.start()
+        with self._lock:
+            depth = sum(self._queued.values())
+            if depth >= self.limits[kind]:
+                self.rejected_total += 1
+                raise QueueFull(f"{depth} jobs waiting; {kind} jobs are refused beyond {self.limits[kind]}")
+            job_id = uuid.uuid4().hex
+            self._db().execute(
+                "INSERT INTO DetectionJob (ID, Kind, Priority, State, Created, Path, Options) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, self.priorities[kind], _now(), path, json.dumps(options or {}))
+            )
+            self._queued[kind] += 1
+            self._changed.notify_all()
+            job = self._select(job_id)
+            job["position"] = self._position(job)
+            return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._select(job_id)
+            if job is not None and job["state"] == "queued":
+                job["position"] = self._position(job)
+            return job
+
+    def wait(self, job_id, timeout):
+        """The job once it is done or failed, or as it is after `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self._select(job_id)
+                remaining = deadline - time.monotonic()
+                if job is None or job["state"] in FINAL_STATES or remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            if job is not None and job["state"] == "queued":
+                job["position"] = self._position(job)
+            return job
+
+    def queue_depth(self, kind=None):
+        with self._lock:
+            return self._queued.get(kind, 0) if kind else sum(self._queued.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": dict(self._queued),
+                "running": self._running,
+                "limits": dict(self.limits),
+                "done": self.done_total,
+                "failed": self.failed_total,
+                "rejected": self.rejected_total
+            }
+
+    # ─── workers ────────────────────────────────────────────────────────────
+
+    def _claim(self):
+        # caller holds the lock
+        row = self._db().execute(
+            "SELECT ID, Kind, Path, Options FROM DetectionJob WHERE State = 'queued' "
+            "ORDER BY Priority DESC, rowid LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        self._db().execute(
+            "UPDATE DetectionJob SET State = 'running', Started = ?, Attempts = Attempts + 1 WHERE ID = ?",
+            (_now(), row[0])
+        )
+        self._queued[row[1]] -= 1
+        self._running += 1
+        return row
+
+    def _finish(self, job_id, **fields):
+        with self._changed:
+            self._running -= 1
+            self._db().execute(
+                f"UPDATE DetectionJob SET {', '.join(f'{k} = ?' for k in fields)} WHERE ID = ?",
+                (*fields.values(), job_id)
+            )
+            self._sweep()  # also under constant load, when workers are never idle
+            self._changed.notify_all()
+
+    def _requeue(self, job_id, kind):
+        with self._changed:
+            self._queued[kind] += 1
+            self._running -= 1
+            self._db().execute(
+                "UPDATE DetectionJob SET State = 'queued', Started = NULL, Attempts = Attempts - 1 WHERE ID = ?",
+                (job_id,)
+            )
+            self._changed.notify_all()
+
+    def _sweep(self):
+        # caller holds the lock; drop finished jobs past their retention,
+        # at most once a minute
+        if time.monotonic() - self._last_sweep < 60:
+            return
+        self._last_sweep = time.monotonic()
+        cutoff = (datetime.datetime.now() - datetime.timedelta(seconds=self.retention)).isoformat(
+            sep=' ', timespec='seconds'
+        )
+        self._db().execute("DELETE FROM DetectionJob WHERE Finished IS NOT NULL AND Finished < ?", (cutoff,))
+
+    def _loop(self):
+        while True:
+            with self._changed:
+                claimed = self._claim()
+                while claimed is None:
+                    self._sweep()
+                    self._changed.wait(timeout=60)
+                    claimed = self._claim()
+
+            job_id, kind, path, options = claimed
+            try:
+                result = self.runner(kind, path, json.loads(options or "{}"))
+            except queue.Full:
+                # inference is saturated: back in line, without counting the attempt
+                self._requeue(job_id, kind)
+                time.sleep(0.2)
+                continue
+            except Exception as e:
+                self._finish(job_id, State="failed", Finished=_now(), Error=str(e))
+                with self._lock:
+                    self.failed_total += 1
+                print(f"❌ Detection job {job_id} ({kind}) failed: {e}")
+                continue
+
+            self._finish(job_id, State="done", Finished=_now(), Result=json.dumps(result))
+            with self._lock:
+                self.done_total += 1
@@ -1,54 +1,99 @@
 import cv2
-from flask import jsonify
-import sqlite3
+import queue
+import numpy as np
+from flask import jsonify, Response
 import os
+import time
 import datetime
 from pathlib import Path
 from werkzeug.utils import secure_filename
 from config import (
     upload_folders,
-    DATABASE, allowed_statuses, detection_statuses, ocr_reader, SCHEMA_FILE
+    allowed_statuses, detection_statuses, CHECK_QUERY_PLANS,
+    INFERENCE_TIMEOUT, MAX_BATCH_IMAGES, PERSIST_WAIT_FOR_COMMIT,
+    RESULT_CACHE_ON_HIT
 )
-
-
-def _get_conn():
-    return sqlite3.connect(DATABASE, check_same_thread=False)
+from db import get_conn, dimensions
+from schema import migrate, check_query_plans
+from storage import image_writer
+from ocr_pool import ocr_readers
+from workers import inference_pool
+from persistence import db_writer, build_record
+from result_cache import result_cache, content_hash
+from model_manager import model_manager
+import metrics
+from profiling import profile_request
+from detection_jobs import QueueFull
 
 
 def initiate_db():
-    with open(SCHEMA_FILE, "r") as f:
-        schema = f.read()
+    conn = get_conn()
 
-    conn = _get_conn()
-    cursor = conn.cursor()
-    cursor.executescript(schema)
-    conn.commit()
-    conn.close()
+    # create or upgrade the schema (create.sql + migrations/)
+    migrate(conn)
+    if CHECK_QUERY_PLANS:
+        check_query_plans(conn)
 
+    # warm the Status/Type/Extension ID cache
+    dimensions.load(conn)
 
-def save_image(file, upload_type):
+
+def build_image_path(filename, upload_type):
     # Ensure folders exists
     for folder in upload_folders.values():
         Path(folder).mkdir(parents=True, exist_ok=True)
 
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    filename = f"{timestamp}_{secure_filename(file.filename)}"
+    filename = f"{timestamp}_{secure_filename(filename or 'upload')}"
 
     # Build path using pathlib
-    filepath = (Path(upload_folders[upload_type]) / filename).as_posix()
+    return (Path(upload_folders[upload_type]) / filename).as_posix()
+
+
+def save_image(file, upload_type):
+    filepath = build_image_path(file.filename, upload_type)
     file.save(filepath)
 
     return filepath
 
 
+def decode_image(data):
+    """Decode raw upload bytes into a BGR ndarray (same layout as cv2.imread)."""
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Unsupported or corrupt image")
+    return img
+
+
+def archive_upload(data, filename, upload_type):
+    """
+    Hand the archival write of an upload to the background writer; returns
+    its final path. Called only once the upload's result is about to be
+    saved, so rejected or failed uploads leave no file behind.
+    """
+    filepath = build_image_path(filename, upload_type)
+    image_writer.submit(filepath, data)
+    return filepath
+
+
+# confidence ≤ 0.5 → Faulty, ≤ 0.8 → Middle, above → Good
+CONFIDENCE_BOUNDS = np.array([0.5, 0.8])
+CONFIDENCE_STATUSES = np.array(["Faulty", "Middle", "Good"], dtype=object)
+
+
 def classify_confidence(conf):
     return (
-        "Faulty" if conf <= 0.5 else
-        "Middle" if conf <= 0.8 else
+        "Faulty" if conf <= CONFIDENCE_BOUNDS[0] else
+        "Middle" if conf <= CONFIDENCE_BOUNDS[1] else
         "Good"
     )
 
 
+def classify_confidences(conf):
+    """`classify_confidence` over a whole array at once."""
+    return CONFIDENCE_STATUSES[np.searchsorted(CONFIDENCE_BOUNDS, conf, side="left")]
+
+
 def assign_status_to_detections(detections):
     image_statuses = [classify_confidence(d["confidence"]) for d in detections]
     for detection_status in reversed(detection_statuses):  # check from worst to best
@@ -61,23 +106,36 @@ def filter_detections(detections):
     return [det for det in detections if det.get("status") in allowed_statuses]
 
 
-def get_detections(results, model):
-    detections = []
+def _as_array(values):
+    """ndarray of a torch tensor (moved to the CPU) or of anything array-like."""
+    if hasattr(values, "cpu"):
+        values = values.cpu().numpy()
+    return np.asarray(values)
+
+
+def get_detections(results):
+    """
+    Detections of one image as plain Python dicts, ready for the response
+    and `save_to_db`. conf/cls/xyxy are converted once as whole arrays
+    instead of box by box.
+    """
+    boxes = results.boxes
+    if boxes is None or len(boxes) == 0:
+        return []
 
-    for box in results.boxes:
-        conf = float(box.conf)
-        status = classify_confidence(conf)
-        cls_index = int(box.cls)
+    conf = _as_array(boxes.conf).astype(np.float64).reshape(-1)
+    cls = _as_array(boxes.cls).astype(np.int64).reshape(-1)
+    xyxy = _as_array(boxes.xyxy).reshape(-1, 4).astype(np.int64)  # truncates like int()
+    statuses = classify_confidences(conf)
 
-        class_name = model.names.get(int(box.cls), f"unknown_{cls_index}")
-        detections.append({
-            "class": class_name,
-            "confidence": conf,
-            "bbox": list(map(int, box.xyxy[0].tolist())),
-            "status": status
-        })
+    # class names of the model that produced these results
+    names = results.names
+    class_names = {i: names.get(i, f"unknown_{i}") for i in np.unique(cls).tolist()}
 
-    return detections
+    return [
+        {"class": class_names[c], "confidence": p, "bbox": bbox, "status": status}
+        for c, p, bbox, status in zip(cls.tolist(), conf.tolist(), xyxy.tolist(), statuses.tolist())
+    ]
 
 
 def save_to_db(
@@ -86,7 +144,12 @@ def save_to_db(
         extension_title: str = None,
         status_title: str = None,
         detections: list = None,
-        text: str = None
+        text: str = None,
+        model_version: str = None,
+        content_hash: str = None,
+        width: int = None,
+        height: int = None,
+        wait: bool = None
 ):
     """
     Save detection or text data to the database.
@@ -98,166 +161,586 @@ def save_to_db(
     - status_title: image status ('Good', etc.)
     - detections: list of detection dictionaries (or None)
     - text: recognized text (or None)
+    - model_version: version of the model that produced the result
+    - content_hash: hash of the upload, to cache the result under
+    - width, height: pixel size of the image
+    - wait: block until committed (defaults to PERSIST_WAIT_FOR_COMMIT)
+
+    The row is written by the background DB writer. Returns the image ID
+    when waiting for the commit, otherwise None.
+    """
+    image_ids = save_many_to_db([{
+        "image_path": image_path,
+        "type_title": type_title,
+        "extension_title": extension_title,
+        "status_title": status_title,
+        "detections": detections,
+        "text": text,
+        "model_version": model_version,
+        "content_hash": content_hash,
+        "width": width,
+        "height": height
+    }], wait=wait)
+    return image_ids[0] if image_ids else None
+
+
+def save_many_to_db(records, wait: bool = None):
+    """
+    Save several images in one transaction.
+
+    `records` is a list of dicts holding the keyword arguments of
+    `save_to_db`. Returns the new image IDs in the same order when
+    waiting for the commit, otherwise None.
+    """
+    if not records:
+        return []
+
+    future = db_writer.submit([build_record(**record) for record in records])
+
+    if wait is None:
+        wait = PERSIST_WAIT_FOR_COMMIT
+    if not wait:
+        return None
+
+    return future.result()
+
+
+def wants_commit(request):
+    """Per-request override of PERSIST_WAIT_FOR_COMMIT via `?wait=1`."""
+    value = request.values.get("wait")
+    if value is None:
+        return PERSIST_WAIT_FOR_COMMIT
+    return value.lower() in ("1", "true", "yes")
+
+
+RESPONSE_FORMATS = ("json", "boxes", "msgpack")
+
+
+def response_format(request):
+    """
+    Requested detection response format: `?format=`, else msgpack when the
+    Accept header asks for it, else "json". "json" lists the class names
+    of the kept detections (the default); "boxes" adds every box; "msgpack"
+    sends the same as "boxes" with the boxes as packed arrays.
+    Raises ValueError for anything else.
+    """
+    fmt = request.values.get("format")
+    if fmt is None:
+        fmt = "msgpack" if "msgpack" in request.headers.get("Accept", "") else "json"
+    if fmt not in RESPONSE_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(RESPONSE_FORMATS)}")
+    if fmt == "msgpack":
+        try:
+            import msgpack  # noqa: F401
+        except ImportError:
+            raise ValueError("msgpack responses need the msgpack package on the server")
+    return fmt
+
+
+def pack_boxes(detections):
+    """
+    Boxes as little-endian arrays: `cls` (uint16 indexes into `names`),
+    `status` (uint8 indexes into `statuses`), `conf` (float32) and `xyxy`
+    (int32, count × 4).
     """
+    names = sorted({d["class"] for d in detections})
+    name_index = {name: i for i, name in enumerate(names)}
+    status_index = {status: i for i, status in enumerate(detection_statuses)}
+    return {
+        "count": len(detections),
+        "names": names,
+        "statuses": list(detection_statuses),
+        "cls": np.array([name_index[d["class"]] for d in detections], "<u2").tobytes(),
+        "status": np.array(
+            [status_index[d.get("status") or classify_confidence(d["confidence"])] for d in detections], "u1"
+        ).tobytes(),
+        "conf": np.array([d["confidence"] for d in detections], "<f4").tobytes(),
+        "xyxy": np.array([d["bbox"] for d in detections], "<i4").reshape(-1, 4).tobytes(),
+    }
+
+
+def detection_response(payload, fmt):
+    """Send a detection response, single or `{"results": [...]}`, in `fmt`."""
+    if fmt != "msgpack":
+        return jsonify(payload)
+
+    import msgpack
+    for item in payload.get("results", [payload]):
+        if "boxes" in item:
+            item["boxes"] = pack_boxes(item["boxes"])
+    return Response(msgpack.packb(payload), mimetype="application/x-msgpack")
 
-    conn = _get_conn()
-    cursor = conn.cursor()
 
-    # Derive filename/title/extension
-    filename = os.path.basename(image_path)
-    title = os.path.splitext(filename)[0]
-    extension = extension_title or os.path.splitext(filename)[1].lstrip(".")
+def _uploaded_files(request):
+    """All files of a multi-image upload (`images`, falling back to `image`)."""
+    return request.files.getlist("images") or request.files.getlist("image")
 
-    # === Extension: lookup or insert
-    cursor.execute("SELECT ID FROM Extension WHERE Title = ?", (extension,))
-    ext_row = cursor.fetchone()
-    if ext_row:
-        extension_id = ext_row[0]
+
+def _summarize_detections(detections):
+    image_status = assign_status_to_detections(detections)
+    filtered_detections = filter_detections(detections)
+    return image_status, [d["class"] for d in filtered_detections]
+
+
+def _current_version(upload_type, langs=None):
+    """Version the next result of `upload_type` would come from (None if not loaded)."""
+    if upload_type == "Text":
+        return ocr_readers.version(langs)
+    return model_manager[upload_type].version
+
+
+def _cached_response(upload_type, digest, model_version, wait, boxes=False):
+    """
+    Response for an upload this model version has already processed, or
+    None. Depending on RESULT_CACHE_ON_HIT the response points at the
+    original Image row ("link") or at a new row sharing its file and
+    results ("duplicate"); either way no inference or file write happens.
+    With `boxes`, detection responses include every box.
+    """
+    entry = result_cache.get(digest, upload_type, model_version)
+    if entry is None:
+        return None
+
+    result = entry.result
+    if upload_type == "Text":
+        response = {"text": result["text"]}
     else:
-        cursor.execute("INSERT INTO Extension (Title) VALUES (?)", (extension,))
-        extension_id = cursor.lastrowid
-
-    # === Type lookup
-    cursor.execute("SELECT ID FROM Type WHERE Title = ?", (type_title,))
-    type_row = cursor.fetchone()
-    type_id = type_row[0] if type_row else None
-
-    # === Status lookup (for the image as a whole)
-    status_id = None
-    if status_title:
-        cursor.execute("SELECT ID FROM Status WHERE Title = ?", (status_title,))
-        s = cursor.fetchone()
-        status_id = s[0] if s else None
-
-    # === Insert into Image, converting timestamp to a string
-    timestamp_str = datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
-    cursor.execute("""
-        INSERT INTO Image (Title, Extension, Type, ReadyForTraining, DateTime, Path, Status, Text)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        title,
-        extension_id,
-        type_id,
-        False,
-        timestamp_str,
-        image_path,
-        status_id,
-        text
-    ))
-    image_id = cursor.lastrowid
-
-    # === Insert detections if provided
-    if detections:
-        for det in detections:
-            name = det["class"]
-            conf = float(det["confidence"])
-            x1, y1, x2, y2 = map(int, det["bbox"])
-            obj_status = det.get("status")
-
-            # Lookup status ID for this object
-            obj_status_id = None
-            if obj_status:
-                cursor.execute("SELECT ID FROM Status WHERE Title = ?", (obj_status,))
-                srow = cursor.fetchone()
-                obj_status_id = srow[0] if srow else None
-
-            # Insert into Object
-            cursor.execute("""
-                INSERT INTO Object (Name, Detection, x1, y1, x2, y2, Status)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (name, conf, x1, y1, x2, y2, obj_status_id))
-            object_id = cursor.lastrowid
-
-            # Link Image ↔ Object
-            cursor.execute("""
-                INSERT INTO ImageObjectLink (Image, Object)
-                VALUES (?, ?)
-            """, (image_id, object_id))
-
-    conn.commit()
-    conn.close()
-    print(f"✅ Saved to DB (Type: {type_title}, Image ID: {image_id})")
-
-
-def object_detection(request, upload_type, model):
+        image_status, classes = _summarize_detections(result["detections"])
+        response = {"status": image_status, "detections": classes}
+        if boxes:
+            response["boxes"] = result["detections"]
+    response.update({"model_version": model_version, "cached": True})
+
+    image_id = entry.image_id
+    if RESULT_CACHE_ON_HIT == "duplicate":
+        image_id = save_to_db(
+            image_path=entry.path,
+            type_title=upload_type,
+            status_title=result.get("status"),
+            detections=result.get("detections"),
+            text=result.get("text"),
+            model_version=model_version,
+            wait=wait
+        )
+    if image_id is not None:
+        response["image_id"] = image_id
+    return response
+
+
+@profile_request("object_detection")
+def object_detection(request, upload_type, scheduler):
     try:
         if "image" not in request.files:
             return jsonify({"error": "No image uploaded"}), 400
 
-        file = request.files["image"]
-
-        # Save image and get filepath
-        filepath = save_image(file, upload_type)
+        stages = metrics.stages_for(request.endpoint)
+        t = time.perf_counter()
 
-        # Money detection
-        results = model(filepath)[0]
+        try:
+            fmt = response_format(request)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        detections = get_detections(results, model)
-
-        # Assign overall status
-        image_status = assign_status_to_detections(detections)
-
-        # Filter out faulty detections if needed
-        filtered_detections = filter_detections(detections)
+        file = request.files["image"]
+        data = file.read()
+        digest = content_hash(data)
+        wait = wants_commit(request)
+        t = stages.lap("read", t)
+
+        # Same bytes already processed by the live model version?
+        cached = _cached_response(upload_type, digest, _current_version(upload_type), wait, fmt != "json")
+        t = stages.lap("cache", t)
+        if cached is not None:
+            return detection_response(cached, fmt)
+
+        # Decode in memory; the archive copy is written once inference succeeded
+        try:
+            img = decode_image(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        t = stages.lap("decode", t)
+
+        # Queue for batched inference and wait for this image's result
+        try:
+            results, model_version = scheduler.predict(img, timeout=INFERENCE_TIMEOUT)
+        except queue.Full:
+            return jsonify({"error": "Server busy, try again later"}), 503
+        t = stages.lap("inference", t)
+
+        detections = get_detections(results)
+
+        # Assign overall status and filter out faulty detections
+        image_status, classes = _summarize_detections(detections)
+        t = stages.lap("postprocess", t)
 
         # Save to database
-        save_to_db(
-            image_path=filepath,
+        image_id = save_to_db(
+            image_path=archive_upload(data, file.filename, upload_type),
             type_title=upload_type,
             status_title=image_status,
-            detections=detections
+            detections=detections,
+            model_version=model_version,
+            content_hash=digest,
+            height=img.shape[0],
+            width=img.shape[1],
+            wait=wait
         )
+        stages.lap("persist", t)
 
-        return jsonify({
+        response = {
             "status": image_status,
-            "detections": [d["class"] for d in filtered_detections]
-        })
+            "detections": classes,
+            "model_version": model_version
+        }
+        if fmt != "json":
+            response["boxes"] = detections
+        if image_id is not None:
+            response["image_id"] = image_id
+        return detection_response(response, fmt)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+@profile_request("object_detection_batch")
+def object_detection_batch(request, upload_type, scheduler):
+    """
+    Detect objects in every image of a multipart upload.
+
+    All images are queued on the scheduler at once so they share forward
+    passes, and all rows are handed to the DB writer as one job so they
+    land in the same transaction. Results come back
+    in upload order; a failing image gets an `error` entry instead of
+    failing the whole request.
+    """
+    try:
+        files = _uploaded_files(request)
+        if not files:
+            return jsonify({"error": "No images uploaded"}), 400
+        if len(files) > MAX_BATCH_IMAGES:
+            return jsonify({"error": f"At most {MAX_BATCH_IMAGES} images per batch"}), 400
+
+        try:
+            fmt = response_format(request)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        stages = metrics.stages_for(request.endpoint)
+        results = [{"index": i, "filename": f.filename} for i, f in enumerate(files)]
+        wait = wants_commit(request)
+        version = _current_version(upload_type)
+
+        # 1) answer repeats from the cache, decode and queue the rest
+        #    before waiting on anything
+        pending = []
+        for i, file in enumerate(files):
+            try:
+                t = time.perf_counter()
+                data = file.read()
+                digest = content_hash(data)
+                t = stages.lap("read", t)
+                cached = _cached_response(upload_type, digest, version, wait, fmt != "json")
+                t = stages.lap("cache", t)
+                if cached is not None:
+                    results[i].update(cached)
+                    continue
+                img = decode_image(data)
+                stages.lap("decode", t)
+                pending.append((i, file.filename, data, digest, img.shape, scheduler.submit(img)))
+            except ValueError as e:
+                results[i]["error"] = str(e)
+            except queue.Full:
+                results[i]["error"] = "Server busy, try again later"
+
+        # 2) collect per-image detections
+        records, record_index = [], []
+        t = time.perf_counter()
+        for i, filename, data, digest, shape, future in pending:
+            try:
+                prediction = future.result(timeout=INFERENCE_TIMEOUT)
+                t = stages.lap("inference", t)
+                detections = get_detections(prediction.results)
+            except Exception as e:
+                future.cancel()  # not yet in a batch: skip it
+                results[i]["error"] = str(e)
+                continue
+
+            image_status, classes = _summarize_detections(detections)
+            t = stages.lap("postprocess", t)
+            results[i].update({
+                "status": image_status,
+                "detections": classes,
+                "model_version": prediction.model_version
+            })
+            if fmt != "json":
+                results[i]["boxes"] = detections
+            records.append({
+                "image_path": archive_upload(data, filename, upload_type),
+                "type_title": upload_type,
+                "status_title": image_status,
+                "detections": detections,
+                "model_version": prediction.model_version,
+                "content_hash": digest,
+                "height": shape[0],
+                "width": shape[1]
+            })
+            record_index.append(i)
+
+        # 3) one transaction for the whole batch
+        t = time.perf_counter()
+        image_ids = save_many_to_db(records, wait=wait)
+        stages.lap("persist", t)
+        for i, image_id in zip(record_index, image_ids or []):
+            results[i]["image_id"] = image_id
+
+        return detection_response({"results": results}, fmt)
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
 
+def run_ocr(img, langs=None):
+    """Run OCR on a decoded image; returns the recognised lines joined by newlines."""
+    if inference_pool.enabled:
+        lines = inference_pool.ocr(langs, img)
+    else:
+        lines = [text for _, text, _ in ocr_readers.get(langs).readtext(img)]
+
+    full_texts = []
+    for text in lines:
+        cleaned = text.strip()
+        if cleaned:
+            full_texts.append(cleaned)
+
+    return "\n".join(full_texts)
+
+
+@profile_request("text_detection")
 def text_detection(request):
     try:
         if "image" not in request.files:
             return jsonify({"error": "No image uploaded"}), 400
 
+        stages = metrics.stages_for(request.endpoint)
+        t = time.perf_counter()
+
         file = request.files["image"]
+        data = file.read()
+        digest = content_hash(data)
+        wait = wants_commit(request)
+        t = stages.lap("read", t)
+
+        try:
+            langs = ocr_readers.parse(request.values.get("languages"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        model_version = _current_version("Text", langs)
+
+        cached = _cached_response("Text", digest, model_version, wait)
+        t = stages.lap("cache", t)
+        if cached is not None:
+            return jsonify(cached)
+
+        try:
+            # Decode in memory; the archive copy is written once OCR succeeded
+            img = decode_image(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        t = stages.lap("decode", t)
+
+        # Apply OCR
+        joined_text = run_ocr(img, langs)
+        t = stages.lap("inference", t)
 
-        # Save image and get filepath
-        filepath = save_image(file, "Text")
+        # Save to database (type='Text', no detections, only OCR text)
+        image_id = save_to_db(
+            image_path=archive_upload(data, file.filename, "Text"),
+            type_title="Text",
+            text=joined_text,
+            model_version=model_version,
+            content_hash=digest,
+            height=img.shape[0],
+            width=img.shape[1],
+            wait=wait
+        )
+        stages.lap("persist", t)
 
-        # Read image and apply OCR
-        img = cv2.imread(filepath)
-        ocr_results = ocr_reader.readtext(img)
+        response = {
+            "text": joined_text,
+            "model_version": model_version
+        }
+        if image_id is not None:
+            response["image_id"] = image_id
+        return jsonify(response)
 
-        regions = []
-        full_texts = []
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
 
-        for bbox, text, _ in ocr_results:
-            cleaned = text.strip()
-            if cleaned:
-                full_texts.append(cleaned)
-                regions.append({
-                    "text": cleaned,
-                    "bbox": [int(bbox[0][0]), int(bbox[0][1]), int(bbox[2][0]), int(bbox[2][1])]
-                })
 
-        joined_text = "\n".join(full_texts)
+@profile_request("text_detection_batch")
+def text_detection_batch(request):
+    """OCR every image of a multipart upload; same result layout as object_detection_batch."""
+    try:
+        files = _uploaded_files(request)
+        if not files:
+            return jsonify({"error": "No images uploaded"}), 400
+        if len(files) > MAX_BATCH_IMAGES:
+            return jsonify({"error": f"At most {MAX_BATCH_IMAGES} images per batch"}), 400
+
+        try:
+            langs = ocr_readers.parse(request.values.get("languages"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        stages = metrics.stages_for(request.endpoint)
+        model_version = _current_version("Text", langs)
+        wait = wants_commit(request)
+        results = [{"index": i, "filename": f.filename} for i, f in enumerate(files)]
+        records, record_index = [], []
+
+        for i, file in enumerate(files):
+            try:
+                t = time.perf_counter()
+                data = file.read()
+                digest = content_hash(data)
+                t = stages.lap("read", t)
+                cached = _cached_response("Text", digest, model_version, wait)
+                t = stages.lap("cache", t)
+                if cached is not None:
+                    results[i].update(cached)
+                    continue
+                img = decode_image(data)
+                t = stages.lap("decode", t)
+                joined_text = run_ocr(img, langs)
+                stages.lap("inference", t)
+            except Exception as e:
+                results[i]["error"] = str(e)
+                continue
+
+            results[i].update({"text": joined_text, "model_version": model_version})
+            records.append({
+                "image_path": archive_upload(data, file.filename, "Text"),
+                "type_title": "Text",
+                "text": joined_text,
+                "model_version": model_version,
+                "content_hash": digest,
+                "height": img.shape[0],
+                "width": img.shape[1]
+            })
+            record_index.append(i)
+
+        t = time.perf_counter()
+        image_ids = save_many_to_db(records, wait=wait)
+        stages.lap("persist", t)
+        for i, image_id in zip(record_index, image_ids or []):
+            results[i]["image_id"] = image_id
+
+        return jsonify({"results": results})
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
 
-        # Save to database (type='Text', no detections, only OCR text)
-        save_to_db(
-            image_path=filepath,
-            type_title="Text",
-            text=joined_text
-        )
 
-        return jsonify({
-            "text": joined_text
-        })
+# ─── async jobs ─────────────────────────────────────────────────────────────
+
+def submit_detection_job(request, upload_type, jobs):
+    """
+    Store the upload and queue it on `jobs` (a DetectionQueue); answers 202
+    with the job at once, or 503 when the queue sheds this kind.
+    """
+    try:
+        if "image" not in request.files:
+            return jsonify({"error": "No image uploaded"}), 400
 
+        options = {}
+        if upload_type == "Text":
+            try:
+                ocr_readers.parse(request.values.get("languages"))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            options["languages"] = request.values.get("languages")
+
+        if not jobs.accepts(upload_type):
+            return jsonify({"error": "Server busy, try again later"}), 503, {"Retry-After": "5"}
+
+        # written before the job exists, so a queued job always has its file
+        file = request.files["image"]
+        filepath = build_image_path(file.filename, upload_type)
+        file.save(filepath)
+
+        try:
+            job = jobs.submit(upload_type, filepath, options)
+        except QueueFull:
+            os.remove(filepath)
+            return jsonify({"error": "Server busy, try again later"}), 503, {"Retry-After": "5"}
+        job.pop("result")
+        return jsonify(job), 202
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
+
+
+def run_detection_job(upload_type, filepath, options, scheduler=None):
+    """
+    Process one async job from its stored upload, like `object_detection`
+    / `text_detection` would; returns the response body, always with
+    every box. Raises queue.Full when `scheduler` is saturated.
+
+    The upload is deleted unless its image row now points at it or the job
+    goes back in line (queue.Full): on a cache hit (the cached result points
+    at its own copy) and when the job fails.
+    """
+    keep = False
+    try:
+        with open(filepath, "rb") as fp:
+            data = fp.read()
+        digest = content_hash(data)
+        langs = ocr_readers.parse(options.get("languages")) if upload_type == "Text" else None
+
+        cached = _cached_response(upload_type, digest, _current_version(upload_type, langs), True, boxes=True)
+        if cached is not None:
+            return cached
+
+        img = decode_image(data)
+        if upload_type == "Text":
+            joined_text = run_ocr(img, langs)
+            model_version = _current_version("Text", langs)
+            response = {"text": joined_text, "model_version": model_version}
+            detections, image_status = None, None
+        else:
+            results, model_version = scheduler.predict(img, timeout=INFERENCE_TIMEOUT)
+            detections = get_detections(results)
+            image_status, classes = _summarize_detections(detections)
+            response = {
+                "status": image_status,
+                "detections": classes,
+                "model_version": model_version,
+                "boxes": detections
+            }
+
+        response["image_id"] = save_to_db(
+            image_path=filepath,
+            type_title=upload_type,
+            status_title=image_status,
+            detections=detections,
+            text=response.get("text"),
+            model_version=model_version,
+            content_hash=digest,
+            height=img.shape[0],
+            width=img.shape[1],
+            wait=True
+        )
+        keep = True
+        return response
+    except queue.Full:
+        keep = True  # retried later on the same upload
+        raise
+    finally:
+        if not keep and os.path.exists(filepath):
+            os.remove(filepath)
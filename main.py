@@ -1,16 +1,42 @@
 from flask import Flask
-from routes.detect import detect_bp
+from routes.detect import detect_bp, detection_jobs
 from routes.data import data_bp
-from routes.train import training_bp
+from routes.train import training_bp, training_queue
+from routes.health import health_bp
+from routes.metrics import metrics_bp
+from routes.profiles import profiles_bp
 from functions import initiate_db
+from db import release_conn
+from model_manager import model_manager
+from workers import inference_pool
+from config import MODEL_PRELOAD
+import metrics
 
 app = Flask(__name__)
 
 initiate_db()
+release_conn()
+
+# hand each request's pooled DB connection back when the request ends
+app.teardown_appcontext(release_conn)
 
 app.register_blueprint(detect_bp)
 app.register_blueprint(data_bp)
 app.register_blueprint(training_bp)
+app.register_blueprint(health_bp)
+app.register_blueprint(metrics_bp)
+app.register_blueprint(profiles_bp)
+
+# request latency and in-flight counts per route for /metrics
+metrics.init_app(app)
 
 if __name__ == "__main__":
+    # fork inference workers first, while this is still the only thread
+    inference_pool.start()
+    # models load in the background while the server starts accepting requests
+    model_manager.start(preload=MODEL_PRELOAD)
+    # pick up training jobs queued before a restart
+    training_queue.start()
+    # resume async detection jobs accepted before a restart
+    detection_jobs.start()
     app.run(host="0.0.0.0", port=5000)
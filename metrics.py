@@ -0,0 +1,260 @@
+"""
+Minimal Prometheus metrics (text exposition format 0.0.4).
+
+Every labelled series is created once, on first lookup, and callers on hot
+paths keep a reference to it, so observing a value is a bisect plus two
+additions under a lock: no per-request label objects or dict building.
+"""
+import time
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for n, v in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _fmt(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ─── series ─────────────────────────────────────────────────────────────────
+
+class Histogram:
+    __slots__ = ("labels", "buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, labels, buckets):
+        self.labels = labels
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def since(self, started):
+        """Observe the seconds since `started` (a perf_counter value); returns now."""
+        now = time.perf_counter()
+        self.observe(now - started)
+        return now
+
+    def render(self, name):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines, cumulative = [], 0
+        base = self.labels[1:-1]
+        sep = "," if base else ""
+        for bound, n in zip((*self.buckets, float("inf")), counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{base}{sep}le="{_fmt(bound)}"}} {cumulative}')
+        lines.append(f"{name}_sum{self.labels} {total!r}")
+        lines.append(f"{name}_count{self.labels} {count}")
+        return lines
+
+
+class Counter:
+    __slots__ = ("labels", "value", "_lock")
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self, name):
+        return [f"{name}{self.labels} {_fmt(self.value)}"]
+
+
+class Gauge(Counter):
+    __slots__ = ()
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+# ─── families + registry ────────────────────────────────────────────────────
+
+class Family:
+    def __init__(self, kind, name, help_text, label_names=(), buckets=None):
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """The series for these label values; created once, then reused."""
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.get(values)
+                if series is None:
+                    label_str = _label_str(self.label_names, values)
+                    if self.kind == "histogram":
+                        series = Histogram(label_str, self.buckets)
+                    elif self.kind == "counter":
+                        series = Counter(label_str)
+                    else:
+                        series = Gauge(label_str)
+                    self._series[values] = series
+        return series
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for series in list(self._series.values()):
+            lines.extend(series.render(self.name))
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.families = []
+        self.collectors = []  # called before every scrape to refresh gauges
+
+    def histogram(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        return self._add(Family("histogram", name, help_text, label_names, tuple(buckets)))
+
+    def counter(self, name, help_text, label_names=()):
+        return self._add(Family("counter", name, help_text, label_names))
+
+    def gauge(self, name, help_text, label_names=()):
+        return self._add(Family("gauge", name, help_text, label_names))
+
+    def _add(self, family):
+        self.families.append(family)
+        return family
+
+    def collector(self, fn):
+        self.collectors.append(fn)
+        return fn
+
+    def render(self):
+        for collect in self.collectors:
+            try:
+                collect()
+            except Exception as e:
+                print(f"⚠️ Metrics collector {collect.__name__} failed: {e}")
+        lines = []
+        for family in self.families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ─── HTTP ───────────────────────────────────────────────────────────────────
+request_seconds = registry.histogram(
+    "bbd_request_seconds", "Request latency by route.", ("route",))
+requests_total = registry.counter(
+    "bbd_requests_total", "Requests by route and status class.", ("route", "status"))
+requests_in_flight = registry.gauge(
+    "bbd_requests_in_flight", "Requests being handled by route.", ("route",))
+
+# ─── detection pipeline ─────────────────────────────────────────────────────
+stage_seconds = registry.histogram(
+    "bbd_stage_seconds", "Time per pipeline stage by route and model.", ("route", "model", "stage"))
+queue_wait_seconds = registry.histogram(
+    "bbd_queue_wait_seconds", "Time a request waits in the batch scheduler.", ("model",))
+inference_seconds = registry.histogram(
+    "bbd_inference_seconds", "Forward pass time per batch (preprocess + inference + NMS).", ("model",))
+batch_size = registry.histogram(
+    "bbd_batch_size", "Images per forward pass.", ("model",), BATCH_BUCKETS)
+queue_depth = registry.gauge(
+    "bbd_queue_depth", "Items waiting, by queue.", ("queue",))
+
+# ─── persistence ────────────────────────────────────────────────────────────
+db_write_seconds = registry.histogram(
+    "bbd_db_write_seconds", "Duration of one grouped DB write transaction.")
+db_write_records = registry.counter(
+    "bbd_db_write_records_total", "Image rows written by the DB writer.")
+
+# ─── models ─────────────────────────────────────────────────────────────────
+model_load_seconds = registry.gauge(
+    "bbd_model_load_seconds", "Load time of the served model version.", ("model",))
+model_warmup_seconds = registry.gauge(
+    "bbd_model_warmup_seconds", "Warmup time of the served model version.", ("model",))
+model_ready = registry.gauge(
+    "bbd_model_ready", "1 when the model is loaded and warmed.", ("model",))
+
+
+class Stages:
+    """
+    Per-stage histograms of one pipeline route, resolved once:
+    `t = stages.lap("decode", t)` records the time since `t` and restarts it.
+    """
+
+    def __init__(self, route, model, names):
+        self._hist = {name: stage_seconds.labels(route, model, name) for name in names}
+
+    def lap(self, stage, started):
+        return self._hist[stage].since(started)
+
+
+PIPELINE_STAGES = ("read", "cache", "decode", "inference", "postprocess", "persist")
+_pipelines = {}
+
+
+def pipeline(route, model):
+    """Stages of `route` (a Flask endpoint); create them at import time."""
+    if route not in _pipelines:
+        _pipelines[route] = Stages(route, model, PIPELINE_STAGES)
+    return _pipelines[route]
+
+
+def stages_for(route):
+    return _pipelines.get(route) or pipeline("other", "unknown")
+
+
+def init_app(app):
+    """Time every request and count in-flight requests per endpoint."""
+    from flask import request, g
+
+    @app.before_request
+    def _start_timer():
+        route = request.endpoint or "other"
+        g._metrics_route = route
+        g._metrics_started = time.perf_counter()
+        requests_in_flight.labels(route).inc()
+
+    @app.after_request
+    def _count_status(response):
+        route = getattr(g, "_metrics_route", None)
+        if route is not None:
+            requests_total.labels(route, f"{response.status_code // 100}xx").inc()
+        return response
+
+    @app.teardown_request
+    def _stop_timer(_exc):
+        route = getattr(g, "_metrics_route", None)
+        if route is None:
+            return
+        request_seconds.labels(route).since(g._metrics_started)
+        requests_in_flight.labels(route).dec()
@@ -0,0 +1,13 @@
+-- Indexes for the hot access paths
+
+-- Objects of an image (get_data, update_data, label creation, cleanup)
+CREATE INDEX IF NOT EXISTS idx_link_image_object ON ImageObjectLink (Image, Object);
+
+-- Ready-for-training images of a type (_move_ready_images)
+CREATE INDEX IF NOT EXISTS idx_image_ready_type ON Image (ReadyForTraining, Type, ID, Path);
+
+-- Newest-first listing and keyset pagination (GET /data)
+CREATE INDEX IF NOT EXISTS idx_image_datetime ON Image (DateTime, ID);
+
+-- Type-filtered listing (GET /data?type=...)
+CREATE INDEX IF NOT EXISTS idx_image_type_datetime ON Image (Type, DateTime, ID);
@@ -0,0 +1,2 @@
+-- Which model version produced an image's detections / text
+ALTER TABLE Image ADD COLUMN ModelVersion TEXT;
@@ -0,0 +1,13 @@
+-- Inference results by upload content, model and model version (result_cache.py)
+CREATE TABLE IF NOT EXISTS ResultCache (
+    ContentHash TEXT NOT NULL,
+    Model TEXT NOT NULL,
+    ModelVersion TEXT NOT NULL,
+    ImageID INTEGER,
+    Path TEXT,
+    Result TEXT NOT NULL,
+    Created TEXT NOT NULL,
+    PRIMARY KEY (ContentHash, Model, ModelVersion)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_result_cache_image ON ResultCache (ImageID);
@@ -0,0 +1,3 @@
+-- Pixel size of the uploaded image, recorded at ingest (used for YOLO labels)
+ALTER TABLE Image ADD COLUMN Width INTEGER;
+ALTER TABLE Image ADD COLUMN Height INTEGER;
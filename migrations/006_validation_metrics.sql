@@ -0,0 +1,9 @@
+-- Validation results per (weights, validation set), see validation.py
+CREATE TABLE IF NOT EXISTS ValidationMetrics (
+    WeightsHash TEXT NOT NULL,
+    ValSetHash TEXT NOT NULL,
+    Map50 REAL NOT NULL,
+    Map50_95 REAL,
+    Evaluated TEXT NOT NULL,
+    PRIMARY KEY (WeightsHash, ValSetHash)
+) WITHOUT ROWID;
@@ -0,0 +1,21 @@
+-- Training job queue (training_jobs.py)
+CREATE TABLE IF NOT EXISTS TrainingJob (
+    ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    ModelType TEXT NOT NULL,
+    State TEXT NOT NULL,
+    Created TEXT NOT NULL,
+    Started TEXT,
+    Finished TEXT,
+    Epoch INTEGER,
+    Epochs INTEGER,
+    Metrics TEXT,
+    Message TEXT,
+    Promoted INTEGER,
+    CancelRequested INTEGER NOT NULL DEFAULT 0
+);
+
+-- single-flight: at most one queued or running job per model type
+CREATE UNIQUE INDEX IF NOT EXISTS idx_training_job_active
+    ON TrainingJob (ModelType) WHERE State IN ('queued', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_training_job_state ON TrainingJob (State, ID);
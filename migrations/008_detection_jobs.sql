@@ -0,0 +1,20 @@
+-- Async detection jobs (detection_jobs.py)
+CREATE TABLE IF NOT EXISTS DetectionJob (
+    ID TEXT PRIMARY KEY,
+    Kind TEXT NOT NULL,
+    Priority INTEGER NOT NULL,
+    State TEXT NOT NULL,
+    Created TEXT NOT NULL,
+    Started TEXT,
+    Finished TEXT,
+    Path TEXT NOT NULL,
+    Options TEXT,
+    Result TEXT,
+    Error TEXT,
+    Attempts INTEGER NOT NULL DEFAULT 0
+);
+
+-- next job to run: highest priority, then oldest (rowid)
+CREATE INDEX IF NOT EXISTS idx_detection_job_queue ON DetectionJob (State, Priority DESC);
+
+CREATE INDEX IF NOT EXISTS idx_detection_job_finished ON DetectionJob (Finished) WHERE Finished IS NOT NULL;
@@ -0,0 +1,278 @@
+import time
+import hashlib
+import datetime
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+import backends
+from workers import inference_pool, PoolModel
+from result_cache import result_cache
+from config import (
+    model_paths, MODEL_WARMUP_SIZE, MODEL_IDLE_UNLOAD_SECONDS,
+    BACKEND_BENCHMARK, BACKEND_BENCHMARK_RUNS, BACKEND_BENCHMARK_DATA
+)
+
+
+# A loaded model together with the version of the weights it was built from
+# and that version's class index → name map.
+# Handles are immutable: a swap replaces the handle, it never mutates one, so
+# a request holding a handle finishes on the version it started with.
+ModelHandle = namedtuple("ModelHandle", ["model", "version", "path", "loaded_at", "names"])
+
+
+def weights_version(path):
+    """Short content hash of a weights file; identical weights → same version."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class ManagedModel:
+    """
+    One YOLO model that is loaded on first use (or by `load()` in the
+    background), warmed up with a synthetic inference, and can be unloaded
+    again when idle.
+
+    `swap()` loads and warms the current weights next to the live version
+    and then replaces the handle atomically, so traffic never waits on a
+    reload and in-flight requests finish on the old version.
+
+    state: unloaded → loading → warming → ready (or failed)
+    """
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.state = "unloaded"
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.last_used = None
+        self.history = []  # versions served so far, oldest first
+        self.benchmark = None
+        self._names = None  # class map of the last loaded version
+
+        self._handle = None
+        self._lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+
+    @property
+    def version(self):
+        handle = self._handle
+        return handle.version if handle else None
+
+    def get(self):
+        """The live ModelHandle, loading it first if needed."""
+        handle = self._handle
+        if handle is None:
+            handle = self.load()
+        self.last_used = time.monotonic()
+        return handle
+
+    def _build(self):
+        """Load + warm the weights at `path` (via the configured backend) into a new handle."""
+        started = time.perf_counter()
+        weights_hash = weights_version(self.path)
+        if inference_pool.enabled:
+            # the workers load the model; this process only keeps a proxy
+            path, tag = backends.resolve(self.name, self.path, weights_hash)
+            model = inference_pool.model(self.name, str(path), weights_hash + tag)
+        else:
+            model, tag = backends.load(self.name, self.path, weights_hash)
+        version = weights_hash + tag
+        load_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        names = warmup(model)
+        warmup_seconds = time.perf_counter() - started
+
+        handle = ModelHandle(
+            model, version, self.path,
+            datetime.datetime.now().isoformat(sep=' ', timespec='seconds'),
+            dict(names)
+        )
+        return handle, load_seconds, warmup_seconds
+
+    def _install(self, handle, load_seconds, warmup_seconds):
+        self._handle = handle
+        self._names = handle.names
+        self.load_seconds = load_seconds
+        self.warmup_seconds = warmup_seconds
+        self.last_used = time.monotonic()
+        self.state, self.error = "ready", None
+        if not self.history or self.history[-1]["version"] != handle.version:
+            self.history.append({"version": handle.version, "loaded_at": handle.loaded_at})
+            # results of other versions must not be served any more
+            try:
+                result_cache.invalidate(self.name, handle.version)
+            except Exception as e:
+                print(f"⚠️ Could not invalidate cached {self.name} results: {e}")
+        print(
+            f"✅ {self.name} model {handle.version} ready "
+            f"(load {load_seconds:.1f}s, warmup {warmup_seconds:.1f}s)"
+        )
+
+    def load(self):
+        with self._lock:
+            if self._handle is not None:
+                return self._handle
+
+            self.state, self.error = "loading", None
+            try:
+                built = self._build()
+            except Exception as e:
+                self.state, self.error = "failed", str(e)
+                print(f"❌ Failed to load {self.name} model: {e}")
+                raise
+
+            self._install(*built)
+            return self._handle
+
+    def unload(self):
+        with self._lock:
+            if self._handle is None:
+                return
+            self._handle = None
+            self.state = "unloaded"
+            inference_pool.unload(self.name)
+            print(f"💤 Unloaded idle {self.name} model")
+
+    def swap(self):
+        """
+        Hot-swap to the weights now at `path` (e.g. after promotion).
+
+        The new version is built and warmed while the old one keeps serving;
+        only the final handle assignment happens under the lock. Returns the
+        new handle; on failure the old version stays live.
+        """
+        with self._swap_lock:
+            try:
+                built = self._build()
+            except Exception as e:
+                self.error = f"swap failed: {e}"
+                print(f"❌ Failed to swap {self.name} model, keeping {self.version}: {e}")
+                raise
+
+            with self._lock:
+                old = self.version
+                self._install(*built)
+            print(f"🔁 {self.name} model swapped {old} → {self.version}")
+            return self._handle
+
+    def class_names(self):
+        """
+        Class index → name map of the served weights. Kept across idle
+        unloads, so the weights are only loaded if they never were.
+        """
+        handle = self._handle
+        if handle is not None:
+            return handle.names
+        if self._names is not None:
+            return self._names
+        return self.load().names
+
+    @property
+    def ready(self):
+        # an idle-unloaded model has loaded fine before and reloads on demand
+        return self.state == "ready" or (self.state == "unloaded" and self.load_seconds is not None)
+
+    def idle_seconds(self):
+        if self._handle is None or self.last_used is None:
+            return 0.0
+        return time.monotonic() - self.last_used
+
+    def status(self):
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "version": self.version,
+            "history": list(self.history),
+            "path": self.path,
+            "error": self.error,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "idle_seconds": round(self.idle_seconds(), 1),
+            "benchmark": self.benchmark
+        }
+
+
+def warmup(model):
+    """
+    One synthetic forward pass so the first real request skips setup costs.
+    Returns the model's class names.
+    """
+    if isinstance(model, PoolModel):
+        return model.warmup()  # on every worker
+    dummy = np.zeros((MODEL_WARMUP_SIZE, MODEL_WARMUP_SIZE, 3), dtype=np.uint8)
+    model(dummy, verbose=False)
+    return model.names
+
+
+class ModelManager:
+    def __init__(self, paths, idle_unload_seconds=None):
+        self.models = {name: ManagedModel(name, path) for name, path in paths.items()}
+        self.idle_unload_seconds = idle_unload_seconds
+        self._reaper = None
+
+    def __getitem__(self, name):
+        return self.models[name]
+
+    def get(self, name):
+        return self.models[name].get()
+
+    def swap(self, name):
+        return self.models[name].swap()
+
+    def start(self, preload=True):
+        """
+        Start the idle reaper and, with `preload`, load and warm every model
+        in a background thread. Returns immediately.
+        """
+        if preload:
+            threading.Thread(target=self._preload, name="model-preload", daemon=True).start()
+        self._start_reaper()
+
+    def _preload(self):
+        for model in self.models.values():
+            try:
+                model.load()
+            except Exception:
+                pass  # state/error already recorded on the model
+
+        if BACKEND_BENCHMARK:
+            for name, model in self.models.items():
+                try:
+                    model.benchmark = backends.benchmark(
+                        name, model.path, weights_version(model.path),
+                        runs=BACKEND_BENCHMARK_RUNS,
+                        data_yaml=BACKEND_BENCHMARK_DATA.get(name)
+                    )
+                except Exception as e:
+                    print(f"⚠️ Backend benchmark for {name} failed: {e}")
+
+    def _start_reaper(self):
+        if not self.idle_unload_seconds or self._reaper is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(min(60, self.idle_unload_seconds))
+                for model in self.models.values():
+                    if model.idle_seconds() > self.idle_unload_seconds:
+                        model.unload()
+
+        self._reaper = threading.Thread(target=run, name="model-reaper", daemon=True)
+        self._reaper.start()
+
+    def ready(self):
+        return all(m.ready for m in self.models.values())
+
+    def status(self):
+        return {name: m.status() for name, m in self.models.items()}
+
+
+model_manager = ModelManager(model_paths, MODEL_IDLE_UNLOAD_SECONDS)
@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+
+from config import (
+    languages, OCR_DEFAULT_LANGUAGES,
+    OCR_MEMORY_BUDGET_MB, OCR_READER_BASE_MB, OCR_LANGUAGE_MB
+)
+
+
+class ReaderPool:
+    """
+    EasyOCR readers keyed by language set, built on first use.
+
+    Each reader is charged an estimated cost (base + per language); when the
+    total goes over the budget, the least recently used readers are dropped.
+    A reader still running in another thread stays alive until it finishes.
+    """
+
+    def __init__(self, supported, default, budget_mb, base_mb, language_mb):
+        self.supported = list(supported)
+        self.default = list(default)
+        self.budget_mb = budget_mb
+        self.base_mb = base_mb
+        self.language_mb = language_mb
+
+        self._readers = OrderedDict()  # key -> (reader, cost_mb)
+        self._building = {}  # key -> Lock, so a set is only built once
+        self._lock = threading.Lock()
+
+    def parse(self, value):
+        """'en,de' (or a list) → validated language list; None/empty → None."""
+        if not value:
+            return None
+        langs = value.split(",") if isinstance(value, str) else list(value)
+        langs = [lang.strip().lower() for lang in langs if lang.strip()]
+        unknown = [lang for lang in langs if lang not in self.supported]
+        if unknown:
+            raise ValueError(f"Unsupported OCR language(s): {', '.join(unknown)}")
+        return langs or None
+
+    def _key(self, langs):
+        return tuple(sorted(set(langs or self.default)))
+
+    def version(self, langs=None):
+        """Version label recorded for OCR output of `langs`."""
+        import easyocr
+        return f"easyocr-{easyocr.__version__}:{'+'.join(self._key(langs))}"
+
+    def _cost(self, key):
+        return self.base_mb + self.language_mb * len(key)
+
+    def get(self, langs=None):
+        """Reader for `langs` (defaults to OCR_DEFAULT_LANGUAGES)."""
+        key = self._key(langs)
+        with self._lock:
+            if key in self._readers:
+                self._readers.move_to_end(key)
+                return self._readers[key][0]
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                if key in self._readers:
+                    self._readers.move_to_end(key)
+                    return self._readers[key][0]
+
+            # imported here so the torch-backed reader only loads when needed
+            import easyocr
+            print(f"🔤 Loading OCR reader for {', '.join(key)}")
+            reader = easyocr.Reader(list(key), gpu=False)
+
+            with self._lock:
+                self._readers[key] = (reader, self._cost(key))
+                self._building.pop(key, None)
+                self._evict(keep=key)
+            return reader
+
+    def _evict(self, keep):
+        while self._used_mb() > self.budget_mb and len(self._readers) > 1:
+            oldest = next(iter(self._readers))
+            if oldest == keep:
+                break
+            self._readers.pop(oldest)
+            print(f"🔤 Evicted OCR reader for {', '.join(oldest)}")
+
+    def _used_mb(self):
+        return sum(cost for _, cost in self._readers.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "readers": [list(key) for key in self._readers],
+                "estimated_mb": self._used_mb(),
+                "budget_mb": self.budget_mb
+            }
+
+
+ocr_readers = ReaderPool(
+    languages, OCR_DEFAULT_LANGUAGES,
+    OCR_MEMORY_BUDGET_MB, OCR_READER_BASE_MB, OCR_LANGUAGE_MB
+)
@@ -0,0 +1,253 @@
+import os
+import time
+import queue
+import datetime
+import threading
+from concurrent.futures import Future
+
+from config import DATABASE, DB_WRITE_QUEUE, DB_WRITE_GROUP
+from db import connect, dimensions
+from result_cache import result_cache, result_payload
+from storage import image_writer
+import metrics
+
+# Seconds the writer waits for an upload's archive write before recording it
+ARCHIVE_WAIT = 10
+
+
+def _next_id(cursor, table):
+    """Next AUTOINCREMENT ID of `table`; only valid inside a write transaction."""
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+    row = cursor.fetchone()
+    seq = row[0] if row else 0
+    cursor.execute(f"SELECT MAX(ID) FROM {table}")
+    max_id = cursor.fetchone()[0] or 0
+    return max(seq, max_id) + 1
+
+
+def build_record(image_path, type_title, extension_title=None, status_title=None,
+                 detections=None, text=None, model_version=None, content_hash=None,
+                 width=None, height=None):
+    """
+    Normalise the arguments of `save_to_db` into one writer record. With a
+    `content_hash` the result is also stored in the result cache.
+    """
+    filename = os.path.basename(image_path)
+    title, ext = os.path.splitext(filename)
+    return {
+        "title": title,
+        "extension": extension_title or ext.lstrip("."),
+        "type": type_title,
+        "status": status_title,
+        "datetime": datetime.datetime.now().isoformat(sep=' ', timespec='seconds'),
+        "path": image_path,
+        "text": text,
+        "model_version": model_version,
+        "width": width,
+        "height": height,
+        "content_hash": content_hash,
+        "result": result_payload(status_title, detections, text) if content_hash else None,
+        "detections": [
+            (
+                det["class"],
+                float(det["confidence"]),
+                *map(int, det["bbox"]),
+                det.get("status")
+            )
+            for det in (detections or [])
+        ]
+    }
+
+
+class DBWriter:
+    """
+    Single writer thread for Image/Object/ImageObjectLink inserts.
+
+    Jobs (lists of records from `build_record`) wait in a bounded queue.
+    The writer drains up to `max_group` records at a time, resolves the
+    dimension IDs from the shared cache, and writes everything in one transaction with
+    `executemany`. Each job's Future resolves to its new image IDs once
+    the transaction is committed.
+
+    Records whose upload could not be archived (see storage.py) are left
+    out, with None in place of their ID, so no row points at a missing file.
+    """
+
+    def __init__(self, database, max_queue=1024, max_group=256):
+        self.database = database
+        self.max_group = max_group
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._conn = None
+
+        self.transactions_total = 0
+        self.records_total = 0
+        self._write_hist = metrics.db_write_seconds.labels()
+        self._records_counter = metrics.db_write_records.labels()
+
+    # ─── public API ─────────────────────────────────────────────────────────
+
+    def submit(self, records, timeout=None):
+        """
+        Queue `records` for writing; returns a Future of their image IDs.
+        Blocks (up to `timeout`) while the queue is full.
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((list(records), future), timeout=timeout)
+        return future
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is committed."""
+        self.submit([]).result(timeout=timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    # ─── worker ─────────────────────────────────────────────────────────────
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="db-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _connect(self):
+        # autocommit mode: transactions are managed explicitly in `_write`
+        return connect(self.database, isolation_level=None)
+
+    def _collect(self):
+        jobs = [self._queue.get()]
+        count = len(jobs[0][0])
+        while count < self.max_group:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            jobs.append(job)
+            count += len(job[0])
+        return jobs
+
+    def _loop(self):
+        self._conn = self._connect()
+        while True:
+            jobs = self._collect()
+            try:
+                ids = self._write(jobs)
+            except Exception as e:
+                print(f"❌ Grouped DB write failed, retrying jobs one by one: {e}")
+                for job in jobs:
+                    try:
+                        job[1].set_result(self._write([job])[0])
+                    except Exception as job_err:
+                        job[1].set_exception(job_err)
+                continue
+
+            for (_, future), image_ids in zip(jobs, ids):
+                future.set_result(image_ids)
+
+    def _unarchived(self, jobs):
+        """Paths of records in `jobs` whose archive write failed."""
+        missing = set()
+        for records, _ in jobs:
+            for rec in records:
+                path = rec["path"]
+                if not image_writer.wait(path, timeout=ARCHIVE_WAIT) and image_writer.failed(path):
+                    missing.add(path)
+        return missing
+
+    def _write(self, jobs):
+        """Write all records of `jobs` in one transaction; returns IDs per job."""
+        missing = self._unarchived(jobs)
+        started = time.perf_counter()
+        conn = self._conn
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            image_id = _next_id(cursor, "Image")
+            object_id = _next_id(cursor, "Object")
+
+            image_rows, object_rows, link_rows = [], [], []
+            cached_records, cached_ids = [], []
+            ids_per_job = []
+            for records, _ in jobs:
+                job_ids = []
+                for rec in records:
+                    if rec["path"] in missing:
+                        print(f"⚠️ Not recording {rec['path']}: the upload could not be stored")
+                        job_ids.append(None)
+                        continue
+                    ext_id = dimensions.get_or_create(cursor, "Extension", rec["extension"])
+
+                    image_rows.append((
+                        image_id,
+                        rec["title"],
+                        ext_id,
+                        dimensions.get("Type", rec["type"], conn),
+                        False,
+                        rec["datetime"],
+                        rec["path"],
+                        dimensions.get("Status", rec["status"], conn),
+                        rec["text"],
+                        rec["model_version"],
+                        rec["width"],
+                        rec["height"]
+                    ))
+                    for name, conf, x1, y1, x2, y2, obj_status in rec["detections"]:
+                        object_rows.append((
+                            object_id, name, conf, x1, y1, x2, y2,
+                            dimensions.get("Status", obj_status, conn)
+                        ))
+                        link_rows.append((image_id, object_id))
+                        object_id += 1
+
+                    if rec.get("content_hash"):
+                        cached_records.append(rec)
+                        cached_ids.append(image_id)
+                    job_ids.append(image_id)
+                    image_id += 1
+                ids_per_job.append(job_ids)
+
+            cursor.executemany("""
+                INSERT INTO Image (ID, Title, Extension, Type, ReadyForTraining, DateTime, Path, Status, Text, ModelVersion, Width, Height)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, image_rows)
+            cursor.executemany("""
+                INSERT INTO Object (ID, Name, Detection, x1, y1, x2, y2, Status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, object_rows)
+            cursor.executemany(
+                "INSERT INTO ImageObjectLink (Image, Object) VALUES (?, ?)",
+                link_rows
+            )
+            cache_rows = result_cache.rows(cached_records, cached_ids)
+            cursor.executemany("""
+                INSERT OR REPLACE INTO ResultCache
+                    (ContentHash, Model, ModelVersion, ImageID, Path, Result, Created)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, cache_rows)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            dimensions.rolled_back(conn)
+            raise
+
+        dimensions.committed(conn)
+
+        self._write_hist.since(started)
+        self._records_counter.inc(len(image_rows))
+        result_cache.committed(cache_rows)
+        with self._lock:
+            self.transactions_total += 1
+            self.records_total += len(image_rows)
+        if image_rows:
+            print(f"✅ Saved {len(image_rows)} image(s) to DB in one transaction")
+        return ids_per_job
+
+
+db_writer = DBWriter(DATABASE, DB_WRITE_QUEUE, DB_WRITE_GROUP)
@@ -0,0 +1,168 @@
+import json
+import time
+import uuid
+import random
+import cProfile
+import datetime
+import functools
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from flask import after_this_request
+
+from config import (
+    PROFILE_DIR, PROFILE_MAX_FILES, PROFILE_MAX_BYTES,
+    PROFILE_SAMPLE_RATE, PROFILE_HEADER, PROFILE_ALLOW_HEADER
+)
+
+PROFILE_SUFFIX = ".prof"
+
+
+class ProfileRing:
+    """
+    Bounded on-disk ring of cProfile captures.
+
+    Each capture is a standard pstats dump `<id>.prof` (open it with
+    `python -m pstats`, snakeviz, …) next to `<id>.json` describing what
+    was profiled. Beyond `max_files` profiles or `max_bytes` in total,
+    the oldest are deleted.
+
+    cProfile only sees the thread it runs in: work handed to another
+    thread or process (batched inference, the DB writer, the training
+    subprocess) shows up as time spent waiting.
+    """
+
+    def __init__(self, directory, max_files, max_bytes, sample_rate=0.0, header=None):
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.sample_rate = sample_rate
+        self.header = header
+        self._lock = threading.Lock()
+        self.captured_total = 0
+
+    def sampled(self, request=None):
+        """Whether to profile this request: asked for by header, or picked at random."""
+        if request is not None and self.header:
+            if request.headers.get(self.header, "").lower() in ("1", "true", "yes"):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    # ─── files ──────────────────────────────────────────────────────────────
+
+    def new_id(self, kind):
+        return f"{datetime.datetime.now():%Y%m%d_%H%M%S}_{kind}_{uuid.uuid4().hex[:8]}"
+
+    def file(self, profile_id):
+        """Where the profile `profile_id` is (to be) stored; None for a malformed ID."""
+        if not profile_id or not all(c.isalnum() or c in "_-" for c in profile_id):
+            return None
+        return self.directory / f"{profile_id}{PROFILE_SUFFIX}"
+
+    def record(self, profile_id, info):
+        """Describe a profile written to `file(profile_id)` and trim the ring."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        info = {"id": profile_id, "created": datetime.datetime.now().isoformat(sep=' ', timespec='seconds'), **info}
+        self.file(profile_id).with_suffix(".json").write_text(json.dumps(info))
+        with self._lock:
+            self.captured_total += 1
+            self._prune()
+
+    def _prune(self):
+        profiles = sorted(self.directory.glob(f"*{PROFILE_SUFFIX}"), key=lambda f: f.stat().st_mtime, reverse=True)
+        total = 0
+        for i, f in enumerate(profiles):
+            total += f.stat().st_size
+            if i >= self.max_files or total > self.max_bytes:
+                f.unlink(missing_ok=True)
+                f.with_suffix(".json").unlink(missing_ok=True)
+
+    def list(self, kind=None):
+        """Descriptions of the stored profiles, newest first."""
+        if not self.directory.exists():
+            return []
+        items = []
+        for meta in self.directory.glob("*.json"):
+            prof = meta.with_suffix(PROFILE_SUFFIX)
+            if not prof.exists():
+                continue
+            try:
+                info = json.loads(meta.read_text())
+            except (OSError, ValueError):
+                continue
+            if kind and info.get("kind") != kind:
+                continue
+            info["bytes"] = prof.stat().st_size
+            items.append(info)
+        return sorted(items, key=lambda i: i["id"], reverse=True)
+
+    # ─── capture ────────────────────────────────────────────────────────────
+
+    @contextmanager
+    def capture(self, kind, **info):
+        """
+        Profile the block and store it. Yields the description dict (add
+        fields to it inside the block; its "id" names the profile), or
+        None when another profiler already runs in this thread.
+        """
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            yield None
+            return
+
+        info = {"id": self.new_id(kind), "kind": kind, **info}
+        started = time.perf_counter()
+        try:
+            yield info
+        finally:
+            profiler.disable()
+            info["seconds"] = round(time.perf_counter() - started, 4)
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(self.file(info["id"]))
+                self.record(info["id"], info)
+            except Exception as e:
+                print(f"⚠️ Could not store {kind} profile: {e}")
+
+
+profiler = ProfileRing(
+    PROFILE_DIR, PROFILE_MAX_FILES, PROFILE_MAX_BYTES,
+    PROFILE_SAMPLE_RATE, PROFILE_HEADER if PROFILE_ALLOW_HEADER else None
+)
+
+
+def profile_request(kind):
+    """
+    Profile the wrapped handler `fn(request, ...)` when `profiler` samples
+    the request; the response then carries the profile ID in an
+    `X-Profile-Id` header.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(request, *args, **kwargs):
+            if not profiler.sampled(request):
+                return fn(request, *args, **kwargs)
+
+            with profiler.capture(
+                kind, route=request.path, args=[a for a in args if isinstance(a, str)],
+                content_length=request.content_length
+            ) as info:
+                response = fn(request, *args, **kwargs)
+                if info is not None:
+                    info["status"] = response[1] if isinstance(response, tuple) else response.status_code
+                    profile_id = info["id"]
+
+            if info is not None:
+                @after_this_request
+                def _tag(resp):
+                    resp.headers["X-Profile-Id"] = profile_id
+                    return resp
+            return response
+
+        return wrapper
+
+    return decorator
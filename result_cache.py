@@ -0,0 +1,125 @@
+import json
+import hashlib
+import datetime
+import threading
+from contextlib import closing
+from collections import OrderedDict, namedtuple
+
+from config import RESULT_CACHE, RESULT_CACHE_SIZE
+from db import connect, get_conn
+
+# What a cache hit needs: the stored result (status + detections, or text),
+# the Image row it was first saved as and that row's file
+CachedResult = namedtuple("CachedResult", ["result", "image_id", "path"])
+
+
+def content_hash(data):
+    """SHA-256 of the raw upload bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def result_payload(status, detections, text):
+    """The part of a saved record that is cached, by upload type."""
+    if text is not None:
+        return {"text": text}
+    return {"status": status, "detections": detections or []}
+
+
+class ResultCache:
+    """
+    Inference results keyed by (content hash, model, model version).
+
+    Recent entries live in an in-memory LRU; every entry is also stored in
+    the ResultCache table (written by the DB writer in the same transaction
+    as its Image row), so hits survive restarts and LRU eviction.
+
+    Entries of a model are dropped as soon as it serves a new version.
+    """
+
+    def __init__(self, enabled, max_entries):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest, model, version):
+        if not self.enabled or version is None:
+            return None
+        key = (digest, model, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        row = get_conn().execute("""
+            SELECT Result, ImageID, Path FROM ResultCache
+            WHERE ContentHash = ? AND Model = ? AND ModelVersion = ?
+        """, key).fetchone()
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        entry = CachedResult(json.loads(row[0]), row[1], row[2])
+        self._remember(key, entry)
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def rows(self, records, image_ids):
+        """ResultCache rows for the cacheable records of a DB write."""
+        now = datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
+        return [
+            (
+                rec["content_hash"], rec["type"], rec["model_version"], image_id,
+                rec["path"], json.dumps(rec["result"]), now
+            )
+            for rec, image_id in zip(records, image_ids)
+            if self.enabled and rec.get("content_hash") and rec["model_version"]
+        ]
+
+    def committed(self, rows):
+        """Called by the DB writer once `rows` are committed."""
+        for digest, model, version, image_id, path, result, _ in rows:
+            self._remember((digest, model, version), CachedResult(json.loads(result), image_id, path))
+
+    def invalidate(self, model, keep_version):
+        """Drop every entry of `model` not produced by `keep_version`."""
+        with self._lock:
+            stale = [key for key in self._entries if key[1] == model and key[2] != keep_version]
+            for key in stale:
+                del self._entries[key]
+
+        with closing(connect()) as conn:
+            deleted = conn.execute(
+                "DELETE FROM ResultCache WHERE Model = ? AND ModelVersion != ?",
+                (model, keep_version)
+            ).rowcount
+            conn.commit()
+        if stale or deleted:
+            print(f"🧹 Invalidated {deleted} cached {model} result(s) of older versions")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+result_cache = ResultCache(RESULT_CACHE, RESULT_CACHE_SIZE)
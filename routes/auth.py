@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 import sqlite3
-from config import DATABASE
+from db import get_conn
 from auth_utils import (
     hash_password, verify_password, generate_token,
     token_required, admin_required
@@ -17,7 +17,7 @@ def register():
         return jsonify({"error":"Username and password required"}),400
 
     hashed = hash_password(password)
-    conn = sqlite3.connect(DATABASE)
+    conn = get_conn()
     cur = conn.cursor()
     try:
         cur.execute(
@@ -26,9 +26,8 @@ def register():
         )
         conn.commit()
     except sqlite3.IntegrityError:
-        conn.close()
+        conn.rollback()
         return jsonify({"error":"Username already exists"}),409
-    conn.close()
     return jsonify({"message":"Registered as user"}),201
 
 @auth_bp.route("/login", methods=["POST"])
@@ -39,14 +38,13 @@ def login():
     if not username or not password:
         return jsonify({"error":"Username and password required"}),400
 
-    conn = sqlite3.connect(DATABASE)
+    conn = get_conn()
     cur = conn.cursor()
     cur.execute(
         "SELECT ID, Password, Role FROM User WHERE Username=?",
         (username,)
     )
     row = cur.fetchone()
-    conn.close()
 
     if not row or not verify_password(password, row[1]):
         return jsonify({"error":"Invalid credentials"}),401
@@ -66,7 +64,7 @@ def register_admin():
         return jsonify({"error":"Username and password required"}),400
 
     hashed = hash_password(password)
-    conn = sqlite3.connect(DATABASE)
+    conn = get_conn()
     cur = conn.cursor()
     try:
         cur.execute(
@@ -75,7 +73,6 @@ def register_admin():
         )
         conn.commit()
     except sqlite3.IntegrityError:
-        conn.close()
+        conn.rollback()
         return jsonify({"error":"Username already exists"}),409
-    conn.close()
     return jsonify({"message":"Registered as admin"}),201
@@ -1,22 +1,30 @@
-from flask import Blueprint, request, jsonify, url_for, send_file
+from flask import Blueprint, Response, request, jsonify, url_for, send_file
+import io
 import os
+import csv
+import json
+import zlib
+import base64
+import datetime
+import threading
+from collections import OrderedDict
 
 from auth_utils import token_required
+from config import (
+    DATA_PAGE_SIZE, DATA_MAX_PAGE_SIZE, EXPORT_FETCH_SIZE,
+    THUMBNAIL_SIZES, IMAGE_PATH_CACHE_SIZE, IMAGE_CACHE_MAX_AGE
+)
+from db import connect, get_conn, dimensions
+from storage import image_writer
+from thumbnails import thumbnail_cache
 from functions import (
-    _get_conn,
     classify_confidence, assign_status_to_detections
 )
 
 data_bp = Blueprint("data", __name__)
 
 
-@data_bp.route("/data", methods=["GET"])
-# @token_required
-def get_data():
-    conn = _get_conn()
-    cursor = conn.cursor()
-
-    cursor.execute("""
+IMAGE_COLUMNS = """
         SELECT
             i.ID,
             i.Title,
@@ -26,43 +34,147 @@ def get_data():
             t.Title   AS Type,
             i.Text    AS Text,
             i.ReadyForTraining,
-            i.Path
+            i.Path,
+            i.ModelVersion
         FROM Image i
         LEFT JOIN Status    s ON i.Status    = s.ID
         LEFT JOIN Extension e ON i.Extension = e.ID
         LEFT JOIN Type      t ON i.Type      = t.ID
-        ORDER BY i.DateTime DESC
-    """)
-    rows = cursor.fetchall()
+"""
 
-    data = []
-    for img_id, title, dt, status, ext, typ, text, ready, path in rows:
-        image_url = url_for("data.download_image", image_id=img_id, _external=True)
 
-        # Get associated objects
-        cursor.execute("""
-            SELECT
-                o.ID,
-                o.Name,
-                o.Detection,
-                o.x1, o.y1, o.x2, o.y2,
-                s.Title AS ObjStatus
-            FROM Object o
-            JOIN ImageObjectLink l ON l.Object = o.ID
-            LEFT JOIN Status s ON o.Status = s.ID
-            WHERE l.Image = ?
-        """, (img_id,))
-        objs = [
-            {
-                "id": oid,
-                "class": name,
-                "confidence": conf,
-                "bbox": [x1, y1, x2, y2],
-                "status": obj_st
-            }
-            for (oid, name, conf, x1, y1, x2, y2, obj_st) in cursor.fetchall()
-        ]
+def _encode_cursor(dt, img_id):
+    raw = f"{dt or ''}|{img_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(value):
+    try:
+        padded = value + "=" * (-len(value) % 4)
+        dt, img_id = base64.urlsafe_b64decode(padded).decode().rsplit("|", 1)
+        return dt, int(img_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def _normalize_datetime(value):
+    # DateTime is stored as 'YYYY-MM-DD HH:MM:SS'; accept ISO 'T' too
+    return value.strip().replace("T", " ")
+
+
+def _data_filters(args):
+    """
+    WHERE clauses + params for the image listing filters:
+    type, status, ready_for_training, date_from, date_to, class.
+    Raises ValueError on malformed values.
+    """
+    where, params = [], []
+
+    if args.get("type"):
+        where.append("i.Type = ?")
+        params.append(dimensions.get("Type", args["type"]) or -1)
+
+    if args.get("status"):
+        where.append("i.Status = ?")
+        params.append(dimensions.get("Status", args["status"]) or -1)
 
+    ready = args.get("ready_for_training")
+    if ready is not None and ready != "":
+        if ready.lower() not in ("0", "1", "true", "false"):
+            raise ValueError("ready_for_training must be true/false")
+        where.append("i.ReadyForTraining = ?")
+        params.append(1 if ready.lower() in ("1", "true") else 0)
+
+    if args.get("date_from"):
+        where.append("i.DateTime >= ?")
+        params.append(_normalize_datetime(args["date_from"]))
+
+    if args.get("date_to"):
+        where.append("i.DateTime <= ?")
+        params.append(_normalize_datetime(args["date_to"]))
+
+    if args.get("class"):
+        where.append("""EXISTS (
+            SELECT 1 FROM ImageObjectLink l
+            JOIN Object o ON o.ID = l.Object
+            WHERE l.Image = i.ID AND o.Name = ?
+        )""")
+        params.append(args["class"])
+
+    return where, params
+
+
+def _fetch_objects(cursor, image_ids):
+    """All objects of `image_ids` in one query, grouped by image ID."""
+    objects = {img_id: [] for img_id in image_ids}
+    if not image_ids:
+        return objects
+
+    ph = ",".join("?" * len(image_ids))
+    cursor.execute(f"""
+        SELECT
+            l.Image,
+            o.ID,
+            o.Name,
+            o.Detection,
+            o.x1, o.y1, o.x2, o.y2,
+            s.Title AS ObjStatus
+        FROM ImageObjectLink l
+        JOIN Object o ON l.Object = o.ID
+        LEFT JOIN Status s ON o.Status = s.ID
+        WHERE l.Image IN ({ph})
+        ORDER BY l.Image, o.ID
+    """, image_ids)
+    for img_id, oid, name, conf, x1, y1, x2, y2, obj_st in cursor.fetchall():
+        objects[img_id].append({
+            "id": oid,
+            "class": name,
+            "confidence": conf,
+            "bbox": [x1, y1, x2, y2],
+            "status": obj_st
+        })
+    return objects
+
+
+@data_bp.route("/data", methods=["GET"])
+# @token_required
+def get_data():
+    """
+    One page of images (newest first) with their objects.
+
+    Query params: limit, cursor (from the previous page's `next_cursor`),
+    and the filters of `_data_filters`.
+    """
+    try:
+        limit = int(request.args.get("limit", DATA_PAGE_SIZE))
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        limit = min(limit, DATA_MAX_PAGE_SIZE)
+
+        where, params = _data_filters(request.args)
+        if request.args.get("cursor"):
+            dt, img_id = _decode_cursor(request.args["cursor"])
+            where.append("(i.DateTime < ? OR (i.DateTime = ? AND i.ID < ?))")
+            params.extend([dt, dt, img_id])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    conn = get_conn()
+    cursor = conn.cursor()
+
+    sql = IMAGE_COLUMNS
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY i.DateTime DESC, i.ID DESC LIMIT ?"
+    cursor.execute(sql, params + [limit + 1])
+    rows = cursor.fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    objects = _fetch_objects(cursor, [row[0] for row in rows])
+
+    data = []
+    for img_id, title, dt, status, ext, typ, text, ready, path, model_version in rows:
         data.append({
             "image_id": img_id,
             "title": title,
@@ -73,12 +185,188 @@ def get_data():
             "text": text,
             "ready_for_training": bool(ready),
             "image_path": path,
-            "image_url": image_url,
-            "objects": objs
+            "model_version": model_version,
+            "image_url": url_for("data.download_image", image_id=img_id, _external=True),
+            "objects": objects[img_id]
         })
 
-    conn.close()
-    return jsonify(data)
+    next_cursor = _encode_cursor(rows[-1][2], rows[-1][0]) if has_more else None
+    return jsonify({"items": data, "next_cursor": next_cursor})
+
+
+EXPORT_COLUMNS = [
+    "image_id", "title", "datetime", "status", "extension", "type", "text",
+    "ready_for_training", "image_path", "model_version",
+    "object_id", "class", "confidence", "x1", "y1", "x2", "y2", "object_status"
+]
+
+
+def _export_rows(where, params):
+    """
+    Yield (image_row, object_row) pairs over a streaming cursor, ordered by
+    image ID. object_row is None for images without objects.
+    """
+    # own connection: the pooled one is released before the stream finishes
+    conn = connect()
+    try:
+        sql = """
+            SELECT
+                i.ID, i.Title, i.DateTime, s.Title, e.Title, t.Title,
+                i.Text, i.ReadyForTraining, i.Path, i.ModelVersion,
+                o.ID, o.Name, o.Detection, o.x1, o.y1, o.x2, o.y2, os.Title
+            FROM Image i
+            LEFT JOIN Status    s ON i.Status    = s.ID
+            LEFT JOIN Extension e ON i.Extension = e.ID
+            LEFT JOIN Type      t ON i.Type      = t.ID
+            LEFT JOIN ImageObjectLink l ON l.Image = i.ID
+            LEFT JOIN Object    o ON l.Object    = o.ID
+            LEFT JOIN Status   os ON o.Status    = os.ID
+        """
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY i.ID, o.ID"
+
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield row[:10], (row[10:] if row[10] is not None else None)
+    finally:
+        conn.close()
+
+
+def _export_ndjson(rows):
+    """One JSON line per image, objects nested."""
+    current, objects = None, []
+    for image, obj in rows:
+        if current is not None and image[0] != current[0]:
+            yield _ndjson_line(current, objects)
+            objects = []
+        current = image
+        if obj is not None:
+            objects.append(obj)
+    if current is not None:
+        yield _ndjson_line(current, objects)
+
+
+def _ndjson_line(image, objects):
+    img_id, title, dt, status, ext, typ, text, ready, path, model_version = image
+    return json.dumps({
+        "image_id": img_id,
+        "title": title,
+        "datetime": dt,
+        "status": status,
+        "extension": ext,
+        "type": typ,
+        "text": text,
+        "ready_for_training": bool(ready),
+        "image_path": path,
+        "model_version": model_version,
+        "objects": [
+            {
+                "id": oid,
+                "class": name,
+                "confidence": conf,
+                "bbox": [x1, y1, x2, y2],
+                "status": obj_st
+            }
+            for (oid, name, conf, x1, y1, x2, y2, obj_st) in objects
+        ]
+    }, ensure_ascii=False) + "\n"
+
+
+def _export_csv(rows):
+    """One CSV row per object; images without objects get one row with empty object columns."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def flush():
+        chunk = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return chunk
+
+    writer.writerow(EXPORT_COLUMNS)
+    for n, (image, obj) in enumerate(rows, 1):
+        image = list(image)
+        image[7] = int(bool(image[7]))
+        writer.writerow(image + list(obj or [None] * 8))
+        if n % EXPORT_FETCH_SIZE == 0:
+            yield flush()
+    yield flush()
+
+
+def _gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@data_bp.route("/data/export", methods=["GET"])
+# @token_required
+def export_data():
+    """
+    Stream the whole (filtered) dataset as NDJSON or CSV in constant memory.
+
+    Query params: format=ndjson|csv, gzip=1, plus the GET /data filters.
+    """
+    fmt = request.args.get("format", "ndjson").lower()
+    if fmt not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+
+    try:
+        where, params = _data_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    rows = _export_rows(where, params)
+    body = _export_ndjson(rows) if fmt == "ndjson" else _export_csv(rows)
+    mimetype = "application/x-ndjson" if fmt == "ndjson" else "text/csv"
+    filename = f"export_{datetime.datetime.now():%Y%m%d_%H%M%S}.{fmt}"
+
+    if request.args.get("gzip", "").lower() in ("1", "true", "yes"):
+        body = _gzip_stream(body)
+        mimetype = "application/gzip"
+        filename += ".gz"
+
+    return Response(
+        body,
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+_image_paths = OrderedDict()
+_image_paths_lock = threading.Lock()
+
+
+def _image_path(image_id):
+    """Image ID → path, served from an in-memory LRU before touching SQLite."""
+    with _image_paths_lock:
+        path = _image_paths.get(image_id)
+        if path is not None:
+            _image_paths.move_to_end(image_id)
+            return path
+
+    row = get_conn().execute("SELECT Path FROM Image WHERE ID = ?", (image_id,)).fetchone()
+    if not row:
+        return None
+
+    with _image_paths_lock:
+        _image_paths[image_id] = row[0]
+        while len(_image_paths) > IMAGE_PATH_CACHE_SIZE:
+            _image_paths.popitem(last=False)
+    return row[0]
+
+
+def _forget_image_path(image_id):
+    with _image_paths_lock:
+        _image_paths.pop(image_id, None)
 
 
 @data_bp.route("/data/image/<int:image_id>", methods=["GET"])
@@ -86,22 +374,37 @@ def get_data():
 def download_image(image_id):
     """
     Lookup the image path by ID and send it back as a file.
+
+    `?size=N` returns a cached thumbnail (N from THUMBNAIL_SIZES). Responses
+    carry ETag/Last-Modified (answering 304 on a match) and support Range.
     """
-    conn = _get_conn()
-    cursor = conn.cursor()
-    cursor.execute("SELECT Path FROM Image WHERE ID = ?", (image_id,))
-    row = cursor.fetchone()
-    conn.close()
+    size = request.args.get("size", type=int)
+    if size is not None and size not in THUMBNAIL_SIZES:
+        return jsonify({"error": f"size must be one of {list(THUMBNAIL_SIZES)}"}), 400
 
-    if not row:
+    path = _image_path(image_id)
+    if path is None:
         return jsonify({"error": "Image not found"}), 404
 
-    path = row[0]
-    if not os.path.isfile(path):
-        return jsonify({"error": "File missing on disk"}), 404
+    # the upload may still be on its way to disk
+    image_writer.wait(path, timeout=10)
 
-    # send_file will guess the mimetype; as_attachment=False streams inline
-    return send_file(path, as_attachment=False)
+    try:
+        if size is not None:
+            path = thumbnail_cache.get(path, size)
+        # conditional=True: ETag/Last-Modified → 304, and Range → 206.
+        # Relative paths are relative to the working directory, but
+        # send_file would resolve them against the app's root_path.
+        return send_file(
+            os.path.abspath(path),
+            as_attachment=False,
+            conditional=True,
+            etag=True,
+            max_age=IMAGE_CACHE_MAX_AGE
+        )
+    except FileNotFoundError:
+        _forget_image_path(image_id)
+        return jsonify({"error": "File missing on disk"}), 404
 
 
 @data_bp.route("/data", methods=["POST"])
@@ -111,7 +414,7 @@ def update_data():
     if not isinstance(updates, list):
         return jsonify({"error": "Expected a list of image updates"}), 400
 
-    conn = _get_conn()
+    conn = get_conn()
     cursor = conn.cursor()
 
     for img in updates:
@@ -140,14 +443,7 @@ def update_data():
             nm = det["class"]
             conf = float(det["confidence"])
             x1, y1, x2, y2 = map(int, det["bbox"])
-            stitle = classify_confidence(conf)
-
-            cursor.execute(
-                "SELECT ID FROM Status WHERE Title = ?",
-                (stitle,)
-            )
-            srow = cursor.fetchone()
-            sid = srow[0] if srow else None
+            sid = dimensions.get("Status", classify_confidence(conf), conn)
 
             cursor.execute("""
                 INSERT INTO Object (Name, Detection, x1, y1, x2, y2, Status)
@@ -162,9 +458,7 @@ def update_data():
 
         # 3) recompute & update image-level status
         img_st = assign_status_to_detections(new_objects)
-        cursor.execute("SELECT ID FROM Status WHERE Title = ?", (img_st,))
-        row = cursor.fetchone()
-        img_sid = row[0] if row else None
+        img_sid = dimensions.get("Status", img_st, conn)
 
         # 4) update Image row (Status, Text, Type, Extension) if provided
         fields, params = ["ReadyForTraining = 1"], []
@@ -175,22 +469,11 @@ def update_data():
             fields.append("Text = ?");
             params.append(new_text)
         if new_type is not None:
-            cursor.execute("SELECT ID FROM Type WHERE Title = ?", (new_type,))
-            r = cursor.fetchone()
-            tid = r[0] if r else None
+            tid = dimensions.get("Type", new_type, conn)
             fields.append("Type = ?");
             params.append(tid)
         if new_ext is not None:
-            cursor.execute("SELECT ID FROM Extension WHERE Title = ?", (new_ext,))
-            r = cursor.fetchone()
-            if r:
-                eid = r[0]
-            else:
-                cursor.execute(
-                    "INSERT INTO Extension (Title) VALUES (?)",
-                    (new_ext,)
-                )
-                eid = cursor.lastrowid
+            eid = dimensions.get_or_create(cursor, "Extension", new_ext)
             fields.append("Extension = ?");
             params.append(eid)
 
@@ -200,5 +483,5 @@ def update_data():
             cursor.execute(sql, params)
 
     conn.commit()
-    conn.close()
+    dimensions.committed(conn)
     return jsonify({"success": True})
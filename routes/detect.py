@@ -1,24 +1,140 @@
-from flask import Blueprint, request
-from functions import object_detection, text_detection
-from config import object_model, money_model
+from flask import Blueprint, request, jsonify
+from functions import (
+    object_detection, text_detection,
+    object_detection_batch, text_detection_batch,
+    submit_detection_job, run_detection_job,
+    response_format, detection_response
+)
+from config import (
+    BATCH_CONFIG, ASYNC_WORKERS, ASYNC_PRIORITIES, ASYNC_QUEUE_LIMITS,
+    ASYNC_MAX_ATTEMPTS, ASYNC_RESULT_TTL, ASYNC_MAX_WAIT
+)
+from scheduler import BatchScheduler
+from model_manager import model_manager
+from ocr_pool import ocr_readers
+from workers import inference_pool
+from result_cache import result_cache
+from detection_jobs import DetectionQueue
 from auth_utils import token_required
+import metrics
 
 detect_bp = Blueprint("detect", __name__)
 
+# with worker processes, keep one batch per worker in flight
+schedulers = {
+    kind: BatchScheduler(
+        kind, model_manager[kind].get, **BATCH_CONFIG[kind],
+        concurrency=max(1, inference_pool.size)
+    )
+    for kind in ("Object", "Money")
+}
+
+
+def _run_detection_job(kind, path, options):
+    return run_detection_job(kind, path, options, schedulers.get(kind))
+
+
+detection_jobs = DetectionQueue(
+    _run_detection_job, ASYNC_WORKERS, ASYNC_PRIORITIES, ASYNC_QUEUE_LIMITS, ASYNC_MAX_ATTEMPTS, ASYNC_RESULT_TTL
+)
+
+# per-stage histograms of every pipeline route, created before the first request
+for _endpoint, _model in (
+    ("detect", "Object"), ("detect_money", "Money"), ("detect_text", "Text"),
+    ("detect_batch", "Object"), ("detect_money_batch", "Money"), ("detect_text_batch", "Text"),
+):
+    metrics.pipeline(f"{detect_bp.name}.{_endpoint}", _model)
+
 
 @detect_bp.route("/detect", methods=["POST"])
 # @token_required
 def detect():
-    return object_detection(request, "Object", object_model)
+    return object_detection(request, "Object", schedulers["Object"])
 
 
 @detect_bp.route("/detect-money", methods=["POST"])
 # @token_required
 def detect_money():
-    return object_detection(request, "Money", money_model)
+    return object_detection(request, "Money", schedulers["Money"])
 
 
 @detect_bp.route("/detect-text", methods=["POST"])
 # @token_required
 def detect_text():
     return text_detection(request)
+
+
+@detect_bp.route("/detect/batch", methods=["POST"])
+# @token_required
+def detect_batch():
+    return object_detection_batch(request, "Object", schedulers["Object"])
+
+
+@detect_bp.route("/detect-money/batch", methods=["POST"])
+# @token_required
+def detect_money_batch():
+    return object_detection_batch(request, "Money", schedulers["Money"])
+
+
+@detect_bp.route("/detect-text/batch", methods=["POST"])
+# @token_required
+def detect_text_batch():
+    return text_detection_batch(request)
+
+
+@detect_bp.route("/detect/async", methods=["POST"])
+# @token_required
+def detect_async():
+    return submit_detection_job(request, "Object", detection_jobs)
+
+
+@detect_bp.route("/detect-money/async", methods=["POST"])
+# @token_required
+def detect_money_async():
+    return submit_detection_job(request, "Money", detection_jobs)
+
+
+@detect_bp.route("/detect-text/async", methods=["POST"])
+# @token_required
+def detect_text_async():
+    return submit_detection_job(request, "Text", detection_jobs)
+
+
+@detect_bp.route("/detect/jobs/<job_id>", methods=["GET"])
+# @token_required
+def detection_job(job_id):
+    """
+    State of an async job; `?wait=N` long-polls up to N seconds (at most
+    ASYNC_MAX_WAIT) for it to finish. A done job answers with its result
+    in the `?format=` of the synchronous routes.
+    """
+    try:
+        fmt = response_format(request)
+        wait = min(float(request.args.get("wait", 0)), ASYNC_MAX_WAIT)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    job = detection_jobs.wait(job_id, wait) if wait > 0 else detection_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["state"] != "done":
+        job.pop("result")
+        return jsonify(job), (200 if job["state"] == "failed" else 202)
+
+    result = job.pop("result")
+    if fmt == "json":
+        result.pop("boxes", None)
+    return detection_response({**result, **job}, fmt)
+
+
+@detect_bp.route("/detect/stats", methods=["GET"])
+# @token_required
+def detect_stats():
+    """Batch sizes the schedulers actually achieve, per model, plus OCR readers and result cache hits."""
+    stats = {kind: s.stats() for kind, s in schedulers.items()}
+    stats["Text"] = ocr_readers.stats()
+    stats["ResultCache"] = result_cache.stats()
+    stats["Async"] = detection_jobs.stats()
+    if inference_pool.enabled:
+        stats["Workers"] = inference_pool.stats()
+    return jsonify(stats)
@@ -0,0 +1,17 @@
+from flask import Blueprint, jsonify
+
+from model_manager import model_manager
+from ocr_pool import ocr_readers
+
+health_bp = Blueprint("health", __name__)
+
+
+@health_bp.route("/ready", methods=["GET"])
+def ready():
+    """Readiness probe: 200 once every model is loaded and warmed, else 503."""
+    is_ready = model_manager.ready()
+    return jsonify({
+        "ready": is_ready,
+        "models": model_manager.status(),
+        "ocr": ocr_readers.stats()
+    }), (200 if is_ready else 503)
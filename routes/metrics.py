@@ -0,0 +1,36 @@
+from flask import Blueprint, Response
+
+import metrics
+from model_manager import model_manager
+from persistence import db_writer
+from storage import image_writer
+from workers import inference_pool
+from routes.detect import schedulers, detection_jobs
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics.registry.collector
+def _collect_state():
+    """Queue depths and model timings are read at scrape time rather than tracked per request."""
+    for kind, scheduler in schedulers.items():
+        metrics.queue_depth.labels(f"batch_{kind}").set(scheduler.queue_depth())
+    for kind in detection_jobs.priorities:
+        metrics.queue_depth.labels(f"async_{kind}").set(detection_jobs.queue_depth(kind))
+    metrics.queue_depth.labels("db_writer").set(db_writer.queue_depth())
+    metrics.queue_depth.labels("image_writer").set(image_writer.pending())
+    if inference_pool.enabled:
+        metrics.queue_depth.labels("inference_workers").set(sum(inference_pool.stats()["inflight"]))
+
+    for name, model in model_manager.models.items():
+        metrics.model_ready.labels(name).set(int(model.ready))
+        if model.load_seconds is not None:
+            metrics.model_load_seconds.labels(name).set(model.load_seconds)
+        if model.warmup_seconds is not None:
+            metrics.model_warmup_seconds.labels(name).set(model.warmup_seconds)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format)."""
+    return Response(metrics.registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,52 @@
+import io
+import pstats
+
+from flask import Blueprint, Response, request, jsonify, send_file
+
+from auth_utils import admin_required
+from profiling import profiler, PROFILE_SUFFIX
+
+profiles_bp = Blueprint("profiles", __name__)
+
+SORT_KEYS = ("cumulative", "tottime", "calls", "ncalls", "time")
+
+
+@profiles_bp.route("/admin/profiles", methods=["GET"])
+# @admin_required
+def list_profiles():
+    """Stored profiles, newest first; filter with ?kind=."""
+    return jsonify({
+        "profiles": profiler.list(request.args.get("kind")),
+        "sample_rate": profiler.sample_rate,
+        "header": profiler.header
+    })
+
+
+@profiles_bp.route("/admin/profiles/<profile_id>", methods=["GET"])
+# @admin_required
+def download_profile(profile_id):
+    """
+    The pstats dump of one profile, or with ?format=text the top
+    ?limit= functions by ?sort= (cumulative by default) as plain text.
+    """
+    path = profiler.file(profile_id)
+    if path is None or not path.exists():
+        return jsonify({"error": "Profile not found"}), 404
+
+    if request.args.get("format") != "text":
+        return send_file(
+            path.resolve(), mimetype="application/octet-stream",
+            as_attachment=True, download_name=f"{profile_id}{PROFILE_SUFFIX}"
+        )
+
+    sort = request.args.get("sort", "cumulative")
+    if sort not in SORT_KEYS:
+        return jsonify({"error": f"sort must be one of {', '.join(SORT_KEYS)}"}), 400
+    try:
+        limit = int(request.args.get("limit", 50))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    out = io.StringIO()
+    pstats.Stats(str(path), stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+    return Response(out.getvalue(), mimetype="text/plain")
@@ -1,11 +1,13 @@
 import os
+import time
 import shutil
 import datetime
-import glob
+from contextlib import ExitStack
 from pathlib import Path
-from threading import Thread
+from itertools import groupby
+from operator import itemgetter
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from ultralytics import YOLO
 from PIL import Image
 import yaml
@@ -14,11 +16,32 @@ from auth_utils import token_required, admin_required
 from auth_utils import token_required
 from config import (
     BACKUP_DIR,
-    TRAINING_DATA_DIR,
     RUNS_DIR,
+    VAL_FRACTION,
+    TRAINING_EPOCHS,
+    TRAINING_MAX_CONCURRENT,
+    TRAINING_SUBPROCESS,
+    TRAINING_CPUS,
+    TRAINING_TORCH_THREADS,
+    TRAINING_WORKERS,
+    TRAINING_NICE,
+    TRAINING_THROTTLE,
+    TRAINING_THROTTLE_QUEUE_DEPTH,
+    TRAINING_THROTTLE_P95_MS,
+    INFERENCE_LATENCY_WINDOW,
+    PROFILE_TRAINING,
     MODEL_CONFIG
 )
-from functions import _get_conn
+from db import get_conn, release_conn, dimensions
+from storage import image_writer
+from model_manager import model_manager, weights_version
+from datasets import DatasetStore
+import validation
+from training_jobs import TrainingQueue
+import train_worker
+from train_worker import run_in_subprocess, Throttle
+from routes.detect import schedulers
+from profiling import profiler
 
 training_bp = Blueprint("training", __name__)
 
@@ -33,18 +56,17 @@ def _ensure_dir(path):
     Path(path).mkdir(parents=True, exist_ok=True)
 
 
-def _move_ready_images(cursor, model_type):
+def _ingest_ready_images(cursor, store):
     """
-    1) Move all ReadyForTraining images of this type into
-       training_data/[type]/images as <ID><ext>, return list of (ID, dest_path).
+    1) Link all ReadyForTraining images of this type into the dataset
+       store, return list of (ID, store_path). Images already in the store
+       are not touched again.
     """
     # ── (A) Lookup the numeric Type.ID ────────────────────────────────
-    cursor.execute("SELECT ID FROM Type WHERE Title = ?", (model_type,))
-    row = cursor.fetchone()
-    if not row:
-        print(f"⚠️ No Type entry for '{model_type}'")
+    type_id = dimensions.get("Type", store.model_type, cursor.connection)
+    if type_id is None:
+        print(f"⚠️ No Type entry for '{store.model_type}'")
         return []
-    type_id = row[0]
 
     # ── (B) Fetch all ReadyForTraining images of that type ────────────
     cursor.execute(
@@ -53,11 +75,15 @@ def _move_ready_images(cursor, model_type):
     )
     rows = cursor.fetchall()
 
-    dest_dir = Path(TRAINING_DATA_DIR) / model_type / "images"
-    dest_dir.mkdir(parents=True, exist_ok=True)
-
-    moved = []
+    ingested = []
     for img_id, db_path in rows:
+        if img_id in store:
+            ingested.append((img_id, store.image_path(img_id)))
+            continue
+
+        # finish any archive write still in flight for this upload
+        image_writer.wait(db_path)
+
         # ── (C) Normalize the DB path for Windows backslashes ────────
         normalized = os.path.normpath(db_path)
         src_path = Path(normalized)
@@ -69,50 +95,56 @@ def _move_ready_images(cursor, model_type):
             print(f"⚠️ Skipping image {img_id}: file not found at {src_path}")
             continue
 
-        # ── (D) Move by copy+unlink and rename to <ID><ext> ───────────
-        ext = src_path.suffix or ".jpg"
-        dest_path = dest_dir / f"{img_id}{ext}"
+        # ── (D) Hardlink into the store as <ID><ext> ─────────────────
         try:
-            shutil.copy2(src_path, dest_path)
-            src_path.unlink()
-            moved.append((img_id, dest_path))
+            ingested.append((img_id, store.add_image(img_id, src_path)))
         except Exception as e:
-            print(f"❌ Failed to move image {img_id}: {e}")
+            print(f"❌ Failed to add image {img_id} to the dataset: {e}")
+
+    return ingested
 
-    return moved
 
+# every ready image of a type with its objects, grouped by image
+_LABEL_ROWS = """
+    SELECT i.ID, i.Width, i.Height, o.Name, o.x1, o.y1, o.x2, o.y2
+      FROM Image i
+      LEFT JOIN ImageObjectLink l ON l.Image = i.ID
+      LEFT JOIN Object o ON o.ID = l.Object
+     WHERE i.ReadyForTraining = 1 AND i.Type = ?
+     ORDER BY i.ID
+"""
 
 
+def _create_labels_for_images(cursor, store, image_info):
+    """
+    2) For each (ID, image_path), store its YOLO .txt label; unchanged
+       labels are not rewritten.
 
-def _create_labels_for_images(cursor, model_type, image_info):
-    """2) For each (ID, image_path), write a YOLO .txt label next to it."""
-    labels_dir = Path(TRAINING_DATA_DIR) / model_type / "labels"
-    labels_dir.mkdir(parents=True, exist_ok=True)
+    The rows come from one joined query that is streamed and grouped by
+    image; sizes are read from the Image row, not from the file.
+    """
+    # names→index of the served weights, from the model registry
+    name2idx = {v: k for k, v in model_manager[store.model_type].class_names().items()}
 
-    # load names→index from the model
-    model = YOLO(MODEL_CONFIG[model_type]["path"])
-    name2idx = {v: k for k, v in model.names.items()}
+    paths = dict(image_info)
+    type_id = dimensions.get("Type", store.model_type, cursor.connection)
+    cursor.execute(_LABEL_ROWS, (type_id,))
 
-    for img_id, image_path in image_info:
-        # fetch dets
-        cursor.execute(
-            """
-            SELECT o.Name, o.x1, o.y1, o.x2, o.y2
-              FROM Object o
-              JOIN ImageObjectLink l ON l.Object = o.ID
-             WHERE l.Image = ?
-            """,
-            (img_id,),
-        )
-        dets = cursor.fetchall()
+    for img_id, rows in groupby(cursor, key=itemgetter(0)):
+        if img_id not in paths:
+            continue  # file was missing, not moved
+        rows = list(rows)
 
-        # get image size
-        from PIL import Image
-        with Image.open(image_path) as im:
-            w, h = im.size
+        _, w, h = rows[0][:3]
+        if not w or not h:
+            # saved before sizes were recorded: read the header only
+            with Image.open(paths[img_id]) as im:
+                w, h = im.size
 
         lines = []
-        for cls_name, x1, y1, x2, y2 in dets:
+        for *_, cls_name, x1, y1, x2, y2 in rows:
+            if cls_name is None:
+                continue  # image without objects
             idx = name2idx.get(cls_name, 0)
             xc = ((x1 + x2) / 2) / w
             yc = ((y1 + y2) / 2) / h
@@ -120,37 +152,30 @@ def _create_labels_for_images(cursor, model_type, image_info):
             bh = (y2 - y1) / h
             lines.append(f"{idx} {xc:.6f} {yc:.6f} {bw:.6f} {bh:.6f}")
 
-        # write label file alongside the image
-        label_file = labels_dir / f"{img_id}.txt"
-        label_file.write_text("\n".join(lines))
-
-
-def _make_dataset_yaml(model_type):
-    """3) Emit a dataset YAML under training_data/[type]/dataset.yaml."""
-    base = Path(TRAINING_DATA_DIR) / model_type
-    images = (base / "images").resolve().as_posix()
-    labels = (base / "labels").resolve().as_posix()
-    # count classes by scanning labels
-    class_ids = set()
-    for f in glob.glob(f"{labels}/*.txt"):
-        for line in open(f):
-            parts = line.strip().split()
-            if parts:
-                class_ids.add(int(parts[0]))
-    nc = max(class_ids) + 1 if class_ids else 0
-    names = {i: str(i) for i in range(nc)}
+        store.set_label(img_id, "\n".join(lines))
+
+
+def _make_dataset_yaml(store):
+    """
+    3) Emit a dataset YAML under training_data/[type]/dataset_auto.yaml
+       over the whole accumulated store, with its fixed train/val split.
+       Returns (yaml path, val-set hash or None when nothing is held out).
+    """
+    train_list, val_list, val_hash = store.write_split_lists()
+    # classes of the served model, so label indices and names line up
+    names = model_manager[store.model_type].class_names()
 
     cfg = {
-        "train": images,
-        "val": images,
-        "nc": nc,
-        "names": names,
+        "train": train_list.resolve().as_posix(),
+        "val": val_list.resolve().as_posix(),
+        "nc": len(names),
+        "names": dict(names),
     }
-    out = base / "dataset_auto.yaml"
+    out = store.base / "dataset_auto.yaml"
     _ensure_dir(out.parent)
     with open(out, "w") as fp:
         yaml.dump(cfg, fp)
-    return out.as_posix()
+    return out.as_posix(), val_hash
 
 
 def _backup_existing_model(model_type):
@@ -164,26 +189,27 @@ def _backup_existing_model(model_type):
     return dst
 
 
-def _evaluate_and_promote(model_type, run_name):
+def _evaluate_and_promote(model_type, run_name, data_yaml, val_hash):
     """
-    6) Compare new vs old. If worse, move this run into was_not_worth_it/[type].
-       If better, overwrite the old weights in-place.
+    6) Compare new vs old on the held-out val split. If worse, move this run
+       into was_not_worth_it/[type]. If better, overwrite the old weights
+       in-place. Returns True if promoted.
     """
     cfg     = MODEL_CONFIG[model_type]
     run_dir = Path(RUNS_DIR) / cfg["runs"] / run_name
     new_w   = run_dir / "weights" / "best.pt"
     old_w   = Path(cfg["path"])
 
-    # regenerate the dataset yaml (must match the training/val split)
-    data_yaml = _make_dataset_yaml(model_type)
-
-    # evaluate the old and new models
-    old_metrics = YOLO(old_w).val(data=data_yaml)
-    new_metrics = YOLO(new_w).val(data=data_yaml)
+    if val_hash is None:
+        # scores on the training images would favour the new weights
+        print(f"⚠️ No held-out {model_type} images to compare on; {run_name} not promoted.")
+        return False
 
-    # directly access box.map50
-    m_old = old_metrics.box.map50
-    m_new = new_metrics.box.map50
+    # the baseline usually comes from the metrics cache; misses are validated
+    # side by side, each in a subprocess pinned away from the inference cores
+    scores = validation.map50([old_w, new_w], data_yaml, val_hash, run_task=_run_task)
+    m_old = scores[str(old_w)]
+    m_new = scores[str(new_w)]
 
     if m_new <= m_old:
         # not worth it: archive the entire run folder
@@ -191,111 +217,174 @@ def _evaluate_and_promote(model_type, run_name):
         dest.mkdir(parents=True, exist_ok=True)
         shutil.move(str(run_dir), str(dest / run_name))
         print(f"📉 New model ({m_new:.4f}) ≤ old ({m_old:.4f}), archived.")
-    else:
-        # promote new weights
-        shutil.copy2(new_w, old_w)
-        print(f"📈 New model ({m_new:.4f}) > old ({m_old:.4f}), promoted.")
+        return False
 
+    # promote new weights; replace atomically so a concurrent load never
+    # sees a half-written file
+    tmp_w = old_w.with_name(old_w.name + ".part")
+    shutil.copy2(new_w, tmp_w)
+    os.replace(tmp_w, old_w)
+    print(f"📈 New model ({m_new:.4f}) > old ({m_old:.4f}), promoted.")
 
-def _delete_trained_images(cursor, image_ids):
-    """8) Delete these images + their Object rows and links from the DB."""
+    # export for the configured inference backend while the training
+    # images are still around to calibrate INT8 on
+    try:
+        _run_task({
+            "task": "export",
+            "model_type": model_type,
+            "weights": old_w.as_posix(),
+            "version": weights_version(old_w),
+            "data": data_yaml
+        })
+    except Exception as e:
+        print(f"⚠️ Export of promoted {model_type} weights failed: {e}")
+    return True
+
+
+def _mark_trained(cursor, image_ids):
+    """8) Clear ReadyForTraining; rows and files stay, the store keeps the image."""
     if not image_ids:
         return
-
     ph = ",".join("?" * len(image_ids))
-
-    # 8a) Find all Object IDs linked to those images
     cursor.execute(
-        f"SELECT Object FROM ImageObjectLink WHERE Image IN ({ph})",
+        f"UPDATE Image SET ReadyForTraining = 0 WHERE ID IN ({ph})",
         image_ids
     )
-    obj_ids = [r[0] for r in cursor.fetchall()]
 
-    # 8b) Delete the objects themselves
-    if obj_ids:
-        oph = ",".join("?" * len(obj_ids))
-        cursor.execute(
-            f"DELETE FROM Object WHERE ID IN ({oph})",
-            obj_ids
-        )
 
-    # 8c) Delete the links
-    cursor.execute(
-        f"DELETE FROM ImageObjectLink WHERE Image IN ({ph})",
-        image_ids
+def _inference_load():
+    """(deepest detect queue, worst p95 latency in ms) right now."""
+    return (
+        max(s.queue_depth() for s in schedulers.values()),
+        max(s.latency_p95(INFERENCE_LATENCY_WINDOW) for s in schedulers.values())
     )
 
-    # 8d) Finally delete the Image rows
-    cursor.execute(
-        f"DELETE FROM Image WHERE ID IN ({ph})",
-        image_ids
-    )
+
+def _subprocess_options(options):
+    """`options` plus the resource limits of the training subprocess."""
+    return {
+        **options,
+        "workers": TRAINING_WORKERS,
+        "torch_threads": TRAINING_TORCH_THREADS,
+        "cpus": TRAINING_CPUS,
+        "nice": TRAINING_NICE
+    }
+
+
+def _throttle():
+    if not TRAINING_THROTTLE:
+        return None
+    return Throttle(_inference_load, TRAINING_THROTTLE_QUEUE_DEPTH, TRAINING_THROTTLE_P95_MS)
 
 
-def _cleanup_training_dir(model_type):
-    """9) Wipe training_data/[type] entirely."""
-    base = Path(TRAINING_DATA_DIR) / model_type
-    if base.exists():
-        shutil.rmtree(base)
+def _run_task(options):
+    """Validation or export for promotion, isolated like training (see train_worker.py)."""
+    if not TRAINING_SUBPROCESS:
+        return train_worker.TASKS[options["task"]](options)
+    return run_in_subprocess(_subprocess_options(options), throttle=_throttle())
+
+
+def _train(job, weights, data_yaml, project, name):
+    """5) Train, by default in a resource-limited subprocess."""
+    if not TRAINING_SUBPROCESS:
+        model = YOLO(weights)
+        job.attach(model)
+        model.train(data=data_yaml, epochs=TRAINING_EPOCHS, project=project, name=name)
+        return
+
+    options = _subprocess_options({
+        "task": "train",
+        "weights": weights,
+        "data": data_yaml,
+        "epochs": TRAINING_EPOCHS,
+        "project": project,
+        "name": name
+    })
+    throttle = _throttle()
+    if not PROFILE_TRAINING:
+        run_in_subprocess(options, job, throttle)
+        return
+
+    # the child profiles its own main thread into the ring
+    profile_id = profiler.new_id("training_process")
+    profiler.directory.mkdir(parents=True, exist_ok=True)
+    options["profile"] = str(profiler.file(profile_id).resolve())
+    started = time.perf_counter()
+    try:
+        run_in_subprocess(options, job, throttle)
+    finally:
+        if profiler.file(profile_id).exists():
+            profiler.record(profile_id, {
+                "kind": "training_process", "model_type": job.model_type, "job": job.id,
+                "seconds": round(time.perf_counter() - started, 4)
+            })
 
 
 # ─── the master training function ────────────────────────────────────────────
 
-def _run_training(model_type: str):
+def _run_training(model_type, job):
+    """Run one training job end to end; returns True if new weights were promoted."""
     cfg = MODEL_CONFIG[model_type]
-    conn = _get_conn()
+    conn = get_conn()
     cursor = conn.cursor()
 
+    # one profile over all steps below; they run in this thread
+    profiling = ExitStack()
+    if PROFILE_TRAINING:
+        profiling.enter_context(profiler.capture("training", model_type=model_type, job=job.id))
+
     try:
-        # 1) move & gather → now returns [(id, dest_path), …]
-        image_info = _move_ready_images(cursor, model_type)
+        job.step("Preparing dataset")
+        store = DatasetStore(model_type)
+
+        # 1) link new images into the store → [(id, store_path), …]
+        image_info = _ingest_ready_images(cursor, store)
 
         image_ids = [img_id for img_id, _ in image_info]
         # 2) label creation takes (id, path) pairs
-        _create_labels_for_images(cursor, model_type, image_info)
+        _create_labels_for_images(cursor, store, image_info)
+        store.assign_splits(VAL_FRACTION)
+        store.save()
 
-        data_yaml = _make_dataset_yaml(model_type)
+        data_yaml, val_hash = _make_dataset_yaml(store)
 
         # 4) backup existing weights
-        backup = _backup_existing_model(model_type)
+        job.step("Backing up weights")
+        _backup_existing_model(model_type)
 
-        # 5) actual training
+        # 5) actual training; failures and cancellation end the job here,
+        #    before any post-training step
+        job.step("Training")
         run_name = f"{cfg['runs']}_{_timestamp()}"
-        training_ok = False
-        try:
-            YOLO(cfg["path"]).train(
-                data=data_yaml,
-                epochs=50,
-                project=os.path.join(RUNS_DIR, cfg["runs"]),
-                name=run_name,
-            )
-            training_ok = True
-            print(f"✅ {model_type} training completed: {run_name}")
-        except Exception as train_err:
-            print(f"❌ {model_type} training failed: {train_err}")
-
-        # only steps 6–9 if training actually ran
-        if training_ok:
-            _evaluate_and_promote(model_type, run_name)
-            cfg["reload"]()
-            _delete_trained_images(cursor, image_ids)
-            conn.commit()
-            _cleanup_training_dir(model_type)
-            print(f"✅ Post-training steps for {model_type} complete")
-        else:
-            print(f"⚠️ Skipping post-training steps for {model_type} because training failed")
+        _train(job, cfg["path"], data_yaml, os.path.join(RUNS_DIR, cfg["runs"]), run_name)
+        print(f"✅ {model_type} training completed: {run_name}")
+
+        job.step("Evaluating")
+        promoted = _evaluate_and_promote(model_type, run_name, data_yaml, val_hash)
+        if promoted:
+            # hot-swap: new weights are warmed before they take traffic
+            model_manager.swap(model_type)
+        _mark_trained(cursor, image_ids)
+        conn.commit()
+        print(f"✅ Post-training steps for {model_type} complete")
+        return promoted
 
     finally:
-        conn.close()
+        profiling.close()
+        release_conn()
 
 
 # ─── Flask routes ───────────────────────────────────────────────────────────
 
+training_queue = TrainingQueue(_run_training, TRAINING_MAX_CONCURRENT)
+
+
 def _start_training(kind):
     if kind not in MODEL_CONFIG:
         return jsonify({"error": "unknown model type"}), 400
-    Thread(target=lambda: _run_training(kind), daemon=True).start()
-    return jsonify({"message": f"{kind} training started", "running": True})
+    job, created = training_queue.submit(kind, TRAINING_EPOCHS)
+    message = f"{kind} training queued" if created else f"{kind} training already {job['state']}"
+    return jsonify({"message": message, "job": job}), 202
 
 
 @training_bp.route("/train-money", methods=["POST"])
@@ -308,3 +397,36 @@ def train_money():
 # @admin_required
 def train_object():
     return _start_training("Object")
+
+
+@training_bp.route("/train/jobs", methods=["GET"])
+# @admin_required
+def list_training_jobs():
+    """Newest first; filter with ?state=queued|running|succeeded|failed|cancelled and ?type=."""
+    try:
+        limit = int(request.args.get("limit", 50))
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    limit = min(limit, 500)
+    jobs = training_queue.list(request.args.get("state"), request.args.get("type"), limit)
+    return jsonify({"jobs": jobs})
+
+
+@training_bp.route("/train/jobs/<int:job_id>", methods=["GET"])
+# @admin_required
+def get_training_job(job_id):
+    job = training_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+
+@training_bp.route("/train/jobs/<int:job_id>/cancel", methods=["POST"])
+# @admin_required
+def cancel_training_job(job_id):
+    job = training_queue.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
@@ -0,0 +1,194 @@
+import time
+import queue
+import threading
+from collections import Counter, deque, namedtuple
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import metrics
+
+# Per-image output of a batch: the ultralytics Results plus the version of
+# the model that produced it
+Prediction = namedtuple("Prediction", ["results", "model_version"])
+
+
+class BatchScheduler:
+    """
+    Collects single-image inference requests for one model and runs them
+    as one batched forward pass.
+
+    `get_model` returns a ModelHandle and is called for every batch, so each
+    batch runs on whatever version the manager currently holds (loading it
+    if needed) and a hot swap takes effect from the next batch on.
+
+    A batch is dispatched as soon as `max_batch_size` requests are waiting
+    or `max_wait_ms` has passed since the first one arrived, whichever
+    comes first. At most `max_queue` requests may wait; beyond that
+    `submit` raises `queue.Full` so the caller can shed load.
+
+    Up to `concurrency` batches run at the same time; more than one only
+    helps when inference happens outside this process (the worker pool).
+    """
+
+    def __init__(self, name, get_model, max_batch_size=8, max_wait_ms=20, max_queue=64,
+                 concurrency=1):
+        self.name = name
+        self.get_model = get_model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self.max_queue = max_queue
+        self.concurrency = max(1, int(concurrency))
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._slots = threading.Semaphore(self.concurrency)
+        self._latencies = deque(maxlen=2048)  # (finished at, seconds in queue + inference)
+        self._wait_hist = metrics.queue_wait_seconds.labels(name)
+        self._inference_hist = metrics.inference_seconds.labels(name)
+        self._batch_hist = metrics.batch_size.labels(name)
+
+        # counters
+        self.batch_sizes = Counter()
+        self.requests_total = 0
+        self.batches_total = 0
+        self.rejected_total = 0
+        self.errors_total = 0
+
+    # ─── public API ─────────────────────────────────────────────────────────
+
+    def submit(self, source):
+        """Queue one image (path or ndarray); returns a Future of its Prediction."""
+        self._ensure_started()
+        future = Future()
+        try:
+            self._queue.put_nowait((source, future, time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self.rejected_total += 1
+            raise
+        return future
+
+    def predict(self, source, timeout=None):
+        """
+        Blocking helper: submit and wait for the per-image Prediction. On
+        timeout the request is cancelled, so a batch not yet started skips it.
+        """
+        future = self.submit(source)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def latency_p95(self, window=30.0):
+        """p95 of request latency (ms) over the last `window` seconds; 0 when idle."""
+        cutoff = time.monotonic() - window
+        with self._lock:
+            recent = sorted(lat for finished, lat in self._latencies if finished >= cutoff)
+        if not recent:
+            return 0.0
+        return recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000
+
+    def stats(self):
+        p95 = self.latency_p95()
+        with self._lock:
+            sizes = dict(sorted(self.batch_sizes.items()))
+            batches = self.batches_total
+            requests = self.requests_total
+            return {
+                "model": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "max_queue": self.max_queue,
+                "concurrency": self.concurrency,
+                "queue_depth": self._queue.qsize(),
+                "p95_ms": round(p95, 1),
+                "requests": requests,
+                "batches": batches,
+                "avg_batch_size": round(requests / batches, 3) if batches else 0.0,
+                "batch_sizes": sizes,
+                "rejected": self.rejected_total,
+                "errors": self.errors_total,
+            }
+
+    # ─── worker ─────────────────────────────────────────────────────────────
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name=f"batch-{self.name}", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self):
+        # block for the first request, then fill up until size or deadline
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            self._slots.acquire()
+            batch = self._collect()
+            # drop requests cancelled while queued (predict() timed out)
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                self._slots.release()
+                continue
+            if self.concurrency == 1:
+                self._run(batch)
+            else:
+                threading.Thread(
+                    target=self._run, args=(batch,), name=f"batch-{self.name}-run", daemon=True
+                ).start()
+
+    def _run(self, batch):
+        try:
+            sources = [src for src, _, _ in batch]
+            started = time.monotonic()
+            for _, _, submitted in batch:
+                self._wait_hist.observe(started - submitted)
+            try:
+                handle = self.get_model()
+                forward = time.perf_counter()
+                results = handle.model(sources, batch=len(sources), verbose=False)
+                self._inference_hist.since(forward)
+                self._batch_hist.observe(len(batch))
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"{self.name}: expected {len(batch)} results, got {len(results)}"
+                    )
+            except Exception as e:
+                with self._lock:
+                    self.errors_total += 1
+                for _, fut, _ in batch:
+                    fut.set_exception(e)
+                return
+
+            with self._lock:
+                self.batch_sizes[len(batch)] += 1
+                self.batches_total += 1
+                self.requests_total += len(batch)
+
+            for (_, fut, _), res in zip(batch, results):
+                fut.set_result(Prediction(res, handle.version))
+
+            now = time.monotonic()
+            with self._lock:
+                self._latencies.extend((now, now - submitted) for _, _, submitted in batch)
+        finally:
+            self._slots.release()
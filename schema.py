@@ -0,0 +1,98 @@
+import re
+from pathlib import Path
+
+from config import SCHEMA_FILE, MIGRATIONS_DIR
+
+# Queries on the request/training hot paths, checked at startup
+HOT_QUERIES = {
+    "objects_of_image": (
+        """
+        SELECT o.ID, o.Name FROM Object o
+        JOIN ImageObjectLink l ON l.Object = o.ID
+        WHERE l.Image = ?
+        """,
+        (0,)
+    ),
+    "links_of_images": (
+        "SELECT Object FROM ImageObjectLink WHERE Image IN (?, ?)",
+        (0, 0)
+    ),
+    "ready_images_of_type": (
+        "SELECT ID, Path FROM Image WHERE ReadyForTraining = 1 AND Type = ?",
+        (0,)
+    ),
+    "training_labels": (
+        """
+        SELECT i.ID, i.Width, i.Height, o.Name, o.x1, o.y1, o.x2, o.y2
+          FROM Image i
+          LEFT JOIN ImageObjectLink l ON l.Image = i.ID
+          LEFT JOIN Object o ON o.ID = l.Object
+         WHERE i.ReadyForTraining = 1 AND i.Type = ?
+         ORDER BY i.ID
+        """,
+        (0,)
+    ),
+    "data_page": (
+        "SELECT ID FROM Image i ORDER BY i.DateTime DESC, i.ID DESC LIMIT ?",
+        (50,)
+    ),
+    "data_page_by_type": (
+        "SELECT ID FROM Image i WHERE i.Type = ? ORDER BY i.DateTime DESC, i.ID DESC LIMIT ?",
+        (0, 50)
+    )
+}
+
+
+def _migrations():
+    """[(version, path)] in order; version 1 is the baseline schema file."""
+    found = [(1, Path(SCHEMA_FILE))]
+    for path in Path(MIGRATIONS_DIR).glob("*.sql"):
+        match = re.match(r"(\d+)_", path.name)
+        if match:
+            found.append((int(match.group(1)), path))
+    return sorted(found)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Bring the database up to the newest schema version.
+
+    The version lives in `PRAGMA user_version`. Each pending migration runs
+    in its own transaction together with the version bump, so a failed
+    upgrade leaves the database at the last good version.
+    """
+    current = schema_version(conn)
+    for version, path in _migrations():
+        if version <= current:
+            continue
+        script = path.read_text()
+        try:
+            conn.executescript(
+                f"BEGIN;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;"
+            )
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"🗄️ Applied migration {path.name} (schema v{version})")
+        current = version
+    return current
+
+
+def check_query_plans(conn):
+    """Print EXPLAIN QUERY PLAN for HOT_QUERIES; returns names that full-scan."""
+    slow = []
+    for name, (sql, params) in HOT_QUERIES.items():
+        plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        scans = [
+            step for step in plan
+            if (step.startswith("SCAN") and "USING" not in step) or "TEMP B-TREE" in step
+        ]
+        marker = "⚠️" if scans else "✅"
+        print(f"{marker} {name}: {' | '.join(plan)}")
+        if scans:
+            slow.append(name)
+    return slow
@@ -0,0 +1,123 @@
+import os
+import time
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+from config import IMAGE_WRITE_QUEUE, IMAGE_WRITE_RETRIES
+
+
+class ImageWriter:
+    """
+    Writes archived uploads to disk on a background thread so the request
+    never waits on disk latency.
+
+    Files are written to `<path>.part` and renamed into place, so the final
+    path either does not exist yet or holds the complete image. Readers that
+    need the file (download, training) call `wait(path)` first.
+
+    A failed write is retried `retries` times. Paths that still could not
+    be written are remembered (`failed(path)`), so the DB writer does not
+    record rows pointing at them.
+    """
+
+    def __init__(self, max_queue=256, retries=3, retry_delay=0.2, remember_failed=1024):
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = {}
+        self._failed = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.remember_failed = remember_failed
+        self.failed_total = 0
+
+    def submit(self, path, data):
+        """Schedule `data` to be written to `path`; returns a Future of the path."""
+        self._ensure_started()
+        future = Future()
+        with self._lock:
+            self._pending[path] = future
+        try:
+            self._queue.put_nowait((path, data, future))
+        except queue.Full:
+            # writer is backed up: fall back to writing inline
+            self._write(path, data, future)
+        return future
+
+    def wait(self, path, timeout=None):
+        """Block until a pending write of `path` has finished; False if it failed."""
+        with self._lock:
+            future = self._pending.get(path)
+            if future is None:
+                return path not in self._failed
+        try:
+            future.result(timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    def failed(self, path):
+        """Whether writing `path` failed for good."""
+        with self._lock:
+            return path in self._failed
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="image-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _write_file(self, path, data):
+        tmp = f"{path}.part"
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def _write(self, path, data, future):
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    self._write_file(path, data)
+                    break
+                except Exception as e:
+                    if attempt == self.retries:
+                        raise
+                    print(f"⚠️ Writing {path} failed ({e}), retrying")
+                    time.sleep(self.retry_delay * (attempt + 1))
+            future.set_result(path)
+        except Exception as e:
+            print(f"❌ Failed to write {path}: {e}")
+            with self._lock:
+                self.failed_total += 1
+                self._failed[path] = str(e)
+                while len(self._failed) > self.remember_failed:
+                    self._failed.popitem(last=False)
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                if self._pending.get(path) is future:
+                    del self._pending[path]
+
+    def _loop(self):
+        while True:
+            path, data, future = self._queue.get()
+            self._write(path, data, future)
+
+
+image_writer = ImageWriter(IMAGE_WRITE_QUEUE, IMAGE_WRITE_RETRIES)
@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import queue
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Empty working directory with the schema files linked in (config paths are relative)."""
+    for name in ("create.sql", "migrations"):
+        (tmp_path / name).symlink_to(ROOT / name, target_is_directory=(ROOT / name).is_dir())
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _drain_pool():
+    # pooled connections point at the previous test's database
+    import db
+    db.release_conn()
+    while True:
+        try:
+            db._pool.get_nowait().close()
+        except queue.Empty:
+            break
+
+
+@pytest.fixture
+def conn(workdir):
+    """Connection to a freshly migrated database in `workdir`, dimension cache loaded."""
+    from db import connect, dimensions
+    from schema import migrate
+
+    _drain_pool()
+    conn = connect(os.path.join(workdir, "database.db"))
+    migrate(conn)
+    dimensions.load(conn)
+    yield conn
+    conn.close()
+    _drain_pool()
+
+
+def wait_for(predicate, timeout=5):
+    """Poll `predicate` until it holds; False after `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def state(jobs, job_id):
+    """Current state of a job in a TrainingQueue or DetectionQueue."""
+    return jobs.get(job_id)["state"]
@@ -0,0 +1,137 @@
+import pytest
+
+# routes.data imports functions.py, which needs the model stack
+pytest.importorskip("ultralytics")
+
+from flask import Flask
+
+from db import release_conn, dimensions
+from routes.data import data_bp, _encode_cursor, _decode_cursor, _image_paths
+
+
+@pytest.fixture
+def client(conn):
+    _image_paths.clear()  # IDs repeat across test databases
+    app = Flask(__name__)
+    app.register_blueprint(data_bp)
+    app.teardown_appcontext(release_conn)
+    return app.test_client()
+
+
+def add_image(conn, dt, type_title="Object", objects=(), path="uploads/img.jpg"):
+    cursor = conn.execute(
+        "INSERT INTO Image (Title, Type, ReadyForTraining, DateTime, Path, Status) VALUES (?, ?, 0, ?, ?, ?)",
+        ("img", dimensions.get("Type", type_title, conn), dt, path, dimensions.get("Status", "Good", conn))
+    )
+    image_id = cursor.lastrowid
+    for name in objects:
+        obj = conn.execute(
+            "INSERT INTO Object (Name, Detection, x1, y1, x2, y2, Status) VALUES (?, 0.9, 0, 0, 1, 1, 1)", (name,)
+        )
+        conn.execute("INSERT INTO ImageObjectLink (Image, Object) VALUES (?, ?)", (image_id, obj.lastrowid))
+    conn.commit()
+    return image_id
+
+
+def walk(client, query=""):
+    """Image IDs of every page, and the number of pages."""
+    seen, pages, cursor = [], 0, None
+    while True:
+        url = f"/data?limit=2{query}" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url).get_json()
+        seen += [item["image_id"] for item in page["items"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if not cursor:
+            return seen, pages
+
+
+def test_cursor_round_trip():
+    assert _decode_cursor(_encode_cursor("2024-01-01 10:00:00", 42)) == ("2024-01-01 10:00:00", 42)
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/data?cursor=not-a-cursor").status_code == 400
+    assert client.get("/data?limit=0").status_code == 400
+
+
+def test_pages_cover_every_image_once_newest_first(conn, client):
+    # equal timestamps must be split by ID across page boundaries
+    times = ["2024-01-01 10:00:00"] * 3 + ["2024-01-02 09:00:00"] * 2 + ["2023-12-31 23:59:59"]
+    ids = {add_image(conn, dt): dt for dt in times}
+    expected = sorted(ids, key=lambda i: (ids[i], i), reverse=True)
+
+    seen, pages = walk(client)
+
+    assert seen == expected
+    assert pages == 3
+
+
+def test_cursor_keeps_filters(conn, client):
+    for i in range(5):
+        add_image(conn, f"2024-01-0{i + 1} 00:00:00", "Money", objects=["10"])
+        add_image(conn, f"2024-01-0{i + 1} 00:00:00", "Object", objects=["dog"] if i % 2 else [])
+
+    money, _ = walk(client, "&type=Money")
+    dogs, _ = walk(client, "&class=dog")
+
+    assert len(money) == 5 and len(set(money)) == 5
+    assert len(dogs) == 2
+
+
+def test_new_images_do_not_shift_later_pages(conn, client):
+    for day in range(1, 5):
+        add_image(conn, f"2024-01-0{day} 00:00:00")
+    first = client.get("/data?limit=2").get_json()
+    add_image(conn, "2024-02-01 00:00:00")  # newer than everything already listed
+
+    rest = client.get(f"/data?limit=2&cursor={first['next_cursor']}").get_json()
+
+    assert [item["image_id"] for item in first["items"]] == [4, 3]
+    assert [item["image_id"] for item in rest["items"]] == [2, 1]
+
+
+@pytest.fixture
+def stored_image(conn, workdir):
+    cv2 = pytest.importorskip("cv2")
+    import numpy as np
+
+    path = workdir / "photo.jpg"
+    ok, buf = cv2.imencode(".jpg", np.full((600, 800, 3), 127, np.uint8))
+    path.write_bytes(buf.tobytes())
+    return add_image(conn, "2024-01-01 00:00:00", path=str(path)), path.read_bytes()
+
+
+def test_image_etag_answers_304(client, stored_image):
+    image_id, data = stored_image
+
+    first = client.get(f"/data/image/{image_id}")
+    again = client.get(f"/data/image/{image_id}", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert first.status_code == 200 and first.data == data
+    assert "max-age" in first.headers["Cache-Control"]
+    assert again.status_code == 304 and again.data == b""
+
+
+def test_image_range_returns_partial_content(client, stored_image):
+    image_id, data = stored_image
+
+    response = client.get(f"/data/image/{image_id}", headers={"Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.data == data[10:20]
+    assert response.headers["Content-Range"] == f"bytes 10-19/{len(data)}"
+
+
+def test_thumbnail_sizes(client, stored_image):
+    from PIL import Image
+    import io
+
+    image_id, _ = stored_image
+
+    thumb = client.get(f"/data/image/{image_id}?size=128")
+
+    assert thumb.status_code == 200
+    assert max(Image.open(io.BytesIO(thumb.data)).size) == 128
+    assert client.get(f"/data/image/{image_id}?size=100").status_code == 400
+    assert client.get("/data/image/999999").status_code == 404
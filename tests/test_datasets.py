@@ -0,0 +1,64 @@
+from datasets import DatasetStore
+
+
+def make_store(tmp_path, labels):
+    """Store with one image per entry of `labels` (image ID → class indices)."""
+    src = tmp_path / "upload.jpg"
+    src.write_bytes(b"jpeg")
+    store = DatasetStore("Object", root=tmp_path / "training_data")
+    for img_id, classes in labels.items():
+        store.add_image(img_id, src)
+        store.set_label(img_id, "\n".join(f"{c} 0.5 0.5 0.1 0.1" for c in classes))
+    return store
+
+
+def splits(store):
+    return {int(i): e["split"] for i, e in store.manifest["images"].items()}
+
+
+def test_every_class_with_two_images_gets_a_val_image(tmp_path):
+    store = make_store(tmp_path, {1: [0], 2: [0], 3: [1], 4: [1], 5: [1], 6: [2], 7: [3]})
+    store.assign_splits(0.2)
+    assigned = splits(store)
+
+    for cls_images in ([1, 2], [3, 4, 5]):
+        assert [assigned[i] for i in cls_images].count("val") == 1
+    assert assigned[6] == assigned[7] == "train"  # one image each: nothing to spare
+
+    train, val, val_hash = store.write_split_lists()
+    assert val_hash is not None
+    assert set(val.read_text().splitlines()).isdisjoint(train.read_text().splitlines())
+
+
+def test_large_class_keeps_val_fraction(tmp_path):
+    store = make_store(tmp_path, {i: [0] for i in range(1, 101)})
+    store.assign_splits(0.2)
+
+    assert list(splits(store).values()).count("val") == 20
+
+
+def test_splits_are_stable_across_retrains(tmp_path):
+    store = make_store(tmp_path, {i: [i % 3] for i in range(1, 31)})
+    store.assign_splits(0.2)
+    store.save()
+    before = splits(store)
+
+    store = DatasetStore("Object", root=tmp_path / "training_data")
+    src = tmp_path / "upload.jpg"
+    for img_id in range(31, 41):
+        store.add_image(img_id, src)
+        store.set_label(img_id, f"{img_id % 3} 0.5 0.5 0.1 0.1")
+    store.assign_splits(0.2)
+    after = splits(store)
+
+    assert {i: after[i] for i in before} == before
+
+
+def test_no_held_out_images_means_no_val_hash(tmp_path):
+    store = make_store(tmp_path, {1: [0], 2: [1], 3: [2]})
+    store.assign_splits(0.2)
+
+    train, val, val_hash = store.write_split_lists()
+
+    assert val_hash is None
+    assert val.read_text() == train.read_text()  # YOLO still gets a val list
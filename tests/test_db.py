@@ -0,0 +1,29 @@
+from db import DimensionCache, connect
+
+
+def test_new_dimension_is_cached_only_after_commit(conn):
+    cache = DimensionCache()
+    cache.load(conn)
+    cursor = conn.cursor()
+
+    new_id = cache.get_or_create(cursor, "Extension", "webp")
+    assert cache.get_or_create(cursor, "Extension", "webp") == new_id
+    assert "webp" not in cache.ids("Extension")
+
+    conn.commit()
+    cache.committed(conn)
+    assert cache.ids("Extension")["webp"] == new_id
+
+
+def test_rolled_back_dimension_is_not_cached(conn, workdir):
+    cache = DimensionCache()
+    cache.load(conn)
+
+    cache.get_or_create(conn.cursor(), "Extension", "heic")
+    conn.rollback()
+    cache.rolled_back(conn)
+
+    assert "heic" not in cache.ids("Extension")
+    other = connect(str(workdir / "database.db"))
+    assert cache.get("Extension", "heic", other) is None
+    other.close()
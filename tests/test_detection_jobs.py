@@ -0,0 +1,159 @@
+import time
+import queue
+import threading
+
+import pytest
+
+from conftest import wait_for, state
+from detection_jobs import DetectionQueue, QueueFull
+
+PRIORITIES = {"Object": 2, "Money": 1, "Text": 0}
+LIMITS = {"Object": 3, "Money": 3, "Text": 2}
+
+
+class GatedRunner:
+    """Runs one job per `release()`; records the paths in the order they ran."""
+
+    def __init__(self):
+        self.gate = threading.Semaphore(0)
+        self.ran = []
+        self.full = set()  # paths that raise queue.Full on their first run
+
+    def release(self, n=1):
+        for _ in range(n):
+            self.gate.release()
+
+    def __call__(self, kind, path, options):
+        self.gate.acquire()
+        if path in self.full:
+            self.full.discard(path)
+            raise queue.Full
+        if path.startswith("bad"):
+            raise ValueError("Unsupported or corrupt image")
+        self.ran.append(path)
+        return {"path": path, "options": options}
+
+
+def make_queue(runner, **kwargs):
+    return DetectionQueue(runner, workers=1, priorities=PRIORITIES, limits=LIMITS, **kwargs)
+
+
+def test_priority_then_age(conn):
+    runner = GatedRunner()
+    jobs = make_queue(runner)
+    first = jobs.submit("Text", "t1")["job_id"]
+    assert wait_for(lambda: state(jobs, first) == "running")
+
+    jobs.submit("Text", "t2")
+    jobs.submit("Money", "m1")
+    last = jobs.submit("Object", "o1")
+    assert last["position"] == 0
+    assert jobs.get(first)["attempts"] == 1
+
+    runner.release(4)
+    assert wait_for(lambda: len(runner.ran) == 4)
+    assert runner.ran == ["t1", "o1", "m1", "t2"]
+    assert jobs.wait(last["job_id"], 5)["result"] == {"path": "o1", "options": {}}
+
+
+def test_low_priority_kinds_are_shed_first(conn):
+    runner = GatedRunner()
+    jobs = make_queue(runner)
+    running = jobs.submit("Object", "o0")["job_id"]
+    assert wait_for(lambda: state(jobs, running) == "running")
+
+    jobs.submit("Text", "t1")
+    jobs.submit("Text", "t2")
+    with pytest.raises(QueueFull):
+        jobs.submit("Text", "t3")
+    assert not jobs.accepts("Text") and jobs.accepts("Object")
+    jobs.submit("Object", "o1")
+    with pytest.raises(QueueFull):
+        jobs.submit("Money", "m1")
+
+    stats = jobs.stats()
+    assert stats["queued"] == {"Object": 1, "Money": 0, "Text": 2}
+    assert stats["running"] == 1
+    assert stats["rejected"] == 2
+    runner.release(4)
+
+
+def test_failures_and_queue_full(conn):
+    runner = GatedRunner()
+    runner.full.add("o1")
+    jobs = make_queue(runner)
+    retried = jobs.submit("Object", "o1")["job_id"]
+    failed = jobs.submit("Object", "bad")["job_id"]
+
+    runner.release(3)
+
+    job = jobs.wait(failed, 5)
+    assert job["state"] == "failed"
+    assert job["error"] == "Unsupported or corrupt image"
+    job = jobs.wait(retried, 5)
+    assert job["state"] == "done"
+    assert job["attempts"] == 1  # the queue.Full run is not counted
+    assert jobs.stats()["done"] == 1 and jobs.stats()["failed"] == 1
+
+
+def test_wait_times_out_with_the_current_state(conn):
+    runner = GatedRunner()
+    jobs = make_queue(runner)
+    running = jobs.submit("Object", "o1")["job_id"]
+    queued = jobs.submit("Object", "o2")["job_id"]
+    assert wait_for(lambda: state(jobs, running) == "running")
+
+    start = time.monotonic()
+    job = jobs.wait(queued, 0.2)
+    assert time.monotonic() - start >= 0.2
+    assert job["state"] == "queued" and job["position"] == 0
+    assert jobs.wait("missing", 0.1) is None
+
+    threading.Timer(0.1, runner.release, (2,)).start()
+    assert jobs.wait(queued, 5)["state"] == "done"
+
+
+def test_restart_requeues_running_jobs(conn):
+    rows = [
+        ("a", "running", 1),  # interrupted once: runs again
+        ("b", "running", 3),  # interrupted max_attempts times: given up
+        ("c", "queued", 0),
+    ]
+    conn.executemany(
+        "INSERT INTO DetectionJob (ID, Kind, Priority, State, Created, Path, Attempts) "
+        "VALUES (?, 'Object', 2, ?, '2024-01-01 00:00:00', ?, ?)",
+        [(job_id, job_state, job_id, attempts) for job_id, job_state, attempts in rows]
+    )
+    conn.commit()
+    runner = GatedRunner()
+    runner.release(2)
+    jobs = make_queue(runner, max_attempts=3)
+
+    jobs.start()
+
+    assert jobs.wait("c", 5)["state"] == "done"
+    assert runner.ran == ["a", "c"]
+    assert jobs.get("a")["attempts"] == 2
+    given_up = jobs.get("b")
+    assert given_up["state"] == "failed" and given_up["error"] == "Interrupted too often"
+
+
+def test_expired_jobs_are_swept_while_busy(conn):
+    conn.execute(
+        "INSERT INTO DetectionJob (ID, Kind, Priority, State, Created, Finished, Path) "
+        "VALUES ('old', 'Object', 2, 'done', '2024-01-01 00:00:00', '2024-01-01 00:00:01', 'old')"
+    )
+    conn.commit()
+    runner = GatedRunner()
+    jobs = make_queue(runner, retention=3600)
+    first = jobs.submit("Object", "o1")["job_id"]
+    jobs.submit("Object", "o2")
+    assert wait_for(lambda: state(jobs, first) == "running")
+    jobs._last_sweep = 0.0  # the worker never gets idle from here on
+
+    runner.release()
+
+    assert jobs.wait(first, 5)["state"] == "done"
+    assert jobs.get("old") is None
+    assert jobs.get(first) is not None
+    runner.release()
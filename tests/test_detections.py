@@ -0,0 +1,197 @@
+import io
+import queue
+
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("ultralytics")  # functions → model_manager → backends
+
+from flask import Flask
+
+import functions
+from functions import (
+    get_detections, run_detection_job, classify_confidence, classify_confidences, pack_boxes,
+    detection_response, response_format
+)
+from workers import LiteBoxes, LiteResults
+
+NAMES = {0: "bottle", 1: "cup", 2: "phone"}
+
+
+def per_box(results):
+    """The box-by-box loop get_detections replaced."""
+    detections = []
+    for box in results.boxes:
+        conf = float(box.conf)
+        cls_index = int(box.cls)
+        detections.append({
+            "class": results.names.get(int(box.cls), f"unknown_{cls_index}"),
+            "confidence": conf,
+            "bbox": list(map(int, box.xyxy[0].tolist())),
+            "status": classify_confidence(conf)
+        })
+    return detections
+
+
+def lite(conf, cls, xyxy, dtype=np.float32):
+    boxes = LiteBoxes(
+        np.array(conf, dtype), np.array(cls, dtype), np.array(xyxy, dtype).reshape(-1, 4)
+    )
+    return LiteResults(NAMES, boxes, (480, 640))
+
+
+def test_matches_per_box_loop():
+    rng = np.random.default_rng(0)
+    n = 200
+    results = lite(
+        rng.random(n),
+        rng.integers(0, 5, n),  # 3 and 4 are not in NAMES
+        rng.random((n, 4)) * 640,
+    )
+
+    detections = get_detections(results)
+
+    assert detections == per_box(results)
+    assert {d["class"] for d in detections} >= {"unknown_3", "unknown_4"}
+    assert all(type(d["confidence"]) is float for d in detections)
+    assert all(type(v) is int for d in detections for v in d["bbox"])
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_threshold_edges(dtype):
+    up = lambda x: np.nextafter(dtype(x), dtype(1))
+    conf = [0.0, 0.5, up(0.5), 0.8, up(0.8), 1.0]
+    results = lite(conf, [0] * len(conf), [[0, 0, 1, 1]] * len(conf), dtype)
+
+    detections = get_detections(results)
+
+    assert detections == per_box(results)
+    statuses = [d["status"] for d in detections]
+    assert statuses[:3] == ["Faulty", "Faulty", "Middle"]
+    assert statuses[-1] == "Good"
+    if dtype is np.float64:
+        assert statuses[3:5] == ["Middle", "Good"]
+
+
+def test_vectorized_classification_matches_scalar():
+    conf = np.linspace(0, 1, 1001)
+    assert classify_confidences(conf).tolist() == [classify_confidence(c) for c in conf]
+
+
+def test_no_boxes():
+    assert get_detections(lite([], [], [])) == []
+    assert get_detections(LiteResults(NAMES, None, (1, 1))) == []
+
+
+def test_pack_boxes_round_trip():
+    detections = get_detections(lite(
+        [0.9, 0.3, 0.7], [2, 0, 2], [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12]]
+    ))
+
+    packed = pack_boxes(detections)
+
+    assert packed["count"] == 3
+    names = np.array(packed["names"])[np.frombuffer(packed["cls"], "<u2")]
+    statuses = np.array(packed["statuses"])[np.frombuffer(packed["status"], "u1")]
+    assert names.tolist() == ["phone", "bottle", "phone"]
+    assert statuses.tolist() == ["Good", "Faulty", "Middle"]
+    assert np.frombuffer(packed["conf"], "<f4").tolist() == pytest.approx([0.9, 0.3, 0.7])
+    assert np.frombuffer(packed["xyxy"], "<i4").reshape(-1, 4).tolist() == [d["bbox"] for d in detections]
+
+
+def test_response_formats():
+    msgpack = pytest.importorskip("msgpack")
+    app = Flask(__name__)
+    boxes = get_detections(lite([0.9], [1], [[1, 2, 3, 4]]))
+
+    with app.test_request_context("/detect?format=boxes"):
+        from flask import request
+        assert response_format(request) == "boxes"
+        assert detection_response({"boxes": boxes}, "boxes").get_json()["boxes"] == boxes
+
+    with app.test_request_context("/detect", headers={"Accept": "application/msgpack"}):
+        assert response_format(request) == "msgpack"
+        response = detection_response({"results": [{"boxes": boxes}]}, "msgpack")
+        item = msgpack.unpackb(response.get_data())["results"][0]
+        assert item["boxes"]["names"] == ["cup"]
+        assert np.frombuffer(item["boxes"]["xyxy"], "<i4").tolist() == [1, 2, 3, 4]
+
+    with app.test_request_context("/detect?format=xml"):
+        with pytest.raises(ValueError):
+            response_format(request)
+
+
+class FakeScheduler:
+    def __init__(self, error=None):
+        self.error = error
+
+    def predict(self, img, timeout=None):
+        if self.error:
+            raise self.error
+        return lite([0.9], [0], [[1, 2, 3, 4]]), "v1"
+
+
+@pytest.fixture
+def job_upload(tmp_path, monkeypatch):
+    """A stored async upload, with the DB side of run_detection_job stubbed out."""
+    monkeypatch.setattr(functions, "_current_version", lambda *args: "v1")
+    monkeypatch.setattr(functions, "_cached_response", lambda *args, **kwargs: None)
+    monkeypatch.setattr(functions, "save_to_db", lambda **kwargs: 7)
+    path = tmp_path / "upload.jpg"
+    path.write_bytes(cv2.imencode(".jpg", np.zeros((8, 8, 3), np.uint8))[1].tobytes())
+    return path
+
+
+def test_job_keeps_its_upload_once_saved(job_upload):
+    response = run_detection_job("Object", str(job_upload), {}, FakeScheduler())
+
+    assert response["image_id"] == 7
+    assert response["boxes"][0]["class"] == "bottle"
+    assert job_upload.exists()
+
+
+def test_job_keeps_its_upload_when_requeued(job_upload):
+    with pytest.raises(queue.Full):
+        run_detection_job("Object", str(job_upload), {}, FakeScheduler(queue.Full()))
+    assert job_upload.exists()
+
+
+def test_failed_job_deletes_its_upload(job_upload):
+    with pytest.raises(RuntimeError):
+        run_detection_job("Object", str(job_upload), {}, FakeScheduler(RuntimeError("inference failed")))
+    assert not job_upload.exists()
+
+
+def test_corrupt_upload_is_deleted(job_upload):
+    job_upload.write_bytes(b"not an image")
+
+    with pytest.raises(ValueError):
+        run_detection_job("Object", str(job_upload), {}, FakeScheduler())
+    assert not job_upload.exists()
+
+
+def test_cache_hit_deletes_its_upload(job_upload, monkeypatch):
+    monkeypatch.setattr(functions, "_cached_response", lambda *args, **kwargs: {"image_id": 3})
+
+    assert run_detection_job("Object", str(job_upload), {}, FakeScheduler())["image_id"] == 3
+    assert not job_upload.exists()
+
+
+def test_rejected_upload_is_not_archived(job_upload, monkeypatch):
+    from flask import request
+    archived = []
+    monkeypatch.setattr(functions.image_writer, "submit", lambda path, data: archived.append(path))
+    app = Flask(__name__)
+
+    def post(scheduler):
+        upload = {"image": (io.BytesIO(job_upload.read_bytes()), "a.jpg")}
+        with app.test_request_context("/detect", method="POST", data=upload, content_type="multipart/form-data"):
+            return functions.object_detection(request, "Object", scheduler)
+
+    response, status = post(FakeScheduler(queue.Full()))
+    assert status == 503
+    assert archived == []
+
+    assert post(FakeScheduler()).get_json()["image_id"] == 7
+    assert len(archived) == 1
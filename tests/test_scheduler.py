@@ -0,0 +1,85 @@
+import time
+import queue
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import pytest
+
+from scheduler import BatchScheduler
+
+
+class FakeHandle:
+    """Stands in for a ModelHandle: records the batches it was called with."""
+
+    version = "v1"
+
+    def __init__(self, delay=0.0, gate=None):
+        self.delay = delay
+        self.gate = gate
+        self.calls = []
+
+    def model(self, sources, batch, verbose=False):
+        if self.gate is not None:
+            self.gate.wait()
+        time.sleep(self.delay)
+        self.calls.append(list(sources))
+        return [f"result-{src}" for src in sources]
+
+
+def test_requests_are_batched_up_to_max_batch_size():
+    handle = FakeHandle()
+    scheduler = BatchScheduler("test", lambda: handle, max_batch_size=4, max_wait_ms=200)
+
+    futures = [scheduler.submit(i) for i in range(6)]
+    predictions = [f.result(timeout=5) for f in futures]
+
+    assert [p.results for p in predictions] == [f"result-{i}" for i in range(6)]
+    assert all(p.model_version == "v1" for p in predictions)
+    assert [len(call) for call in handle.calls] == [4, 2]
+    assert scheduler.stats()["batch_sizes"] == {2: 1, 4: 1}
+
+
+def test_full_queue_rejects():
+    gate = threading.Event()
+    handle = FakeHandle(gate=gate)
+    scheduler = BatchScheduler("test", lambda: handle, max_batch_size=1, max_wait_ms=0, max_queue=2)
+
+    first = scheduler.submit("busy")  # taken by the worker, blocked on the gate
+    deadline = time.monotonic() + 5
+    while scheduler.queue_depth() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    queued = [scheduler.submit(i) for i in range(2)]
+    with pytest.raises(queue.Full):
+        scheduler.submit("overflow")
+
+    gate.set()
+    for f in [first, *queued]:
+        f.result(timeout=5)
+    assert scheduler.stats()["rejected"] == 1
+
+
+def test_timed_out_requests_are_not_inferred():
+    gate = threading.Event()
+    handle = FakeHandle(gate=gate)
+    scheduler = BatchScheduler("test", lambda: handle, max_batch_size=1, max_wait_ms=0)
+
+    first = scheduler.submit("busy")
+    with pytest.raises(FutureTimeout):
+        scheduler.predict("late", timeout=0.05)
+
+    gate.set()
+    first.result(timeout=5)
+    assert scheduler.predict("next", timeout=5).results == "result-next"
+    assert ["late"] not in handle.calls
+
+
+def test_model_errors_fail_the_whole_batch():
+    def broken():
+        raise RuntimeError("no weights")
+
+    scheduler = BatchScheduler("test", broken, max_batch_size=2, max_wait_ms=50)
+    futures = [scheduler.submit(i) for i in range(2)]
+    for f in futures:
+        with pytest.raises(RuntimeError, match="no weights"):
+            f.result(timeout=5)
+    assert scheduler.stats()["errors"] == 1
@@ -0,0 +1,60 @@
+import shutil
+import sqlite3
+
+import pytest
+
+import schema
+from schema import migrate, schema_version, check_query_plans, _migrations
+
+
+def latest():
+    return _migrations()[-1][0]
+
+
+def test_migration_versions_are_unique_and_contiguous(workdir):
+    versions = [version for version, _ in _migrations()]
+    assert versions == list(range(1, len(versions) + 1))
+
+
+def test_fresh_database_reaches_latest_version(conn):
+    assert schema_version(conn) == latest()
+    assert migrate(conn) == latest()  # nothing left to apply
+
+
+def test_pre_migration_database_is_upgraded_in_place(workdir):
+    # a database created by create.sql alone, as before versioned migrations
+    conn = sqlite3.connect(str(workdir / "database.db"))
+    conn.executescript((workdir / "create.sql").read_text())
+    conn.execute("INSERT INTO Image (Title, DateTime, Path) VALUES ('old', '2023-01-01 00:00:00', 'old.jpg')")
+    conn.commit()
+
+    migrate(conn)
+
+    assert schema_version(conn) == latest()
+    assert conn.execute("SELECT Title FROM Image").fetchall() == [("old",)]
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(Image)")}
+    assert {"ModelVersion", "Width", "Height"} <= columns
+    conn.close()
+
+
+def test_failed_migration_keeps_last_good_version(workdir, monkeypatch):
+    migrations = workdir / "migrations_copy"
+    shutil.copytree(workdir / "migrations", migrations)
+    broken = latest() + 1
+    (migrations / f"{broken:03d}_broken.sql").write_text(
+        "CREATE TABLE Half (ID INTEGER);\nINSERT INTO NoSuchTable VALUES (1);"
+    )
+    monkeypatch.setattr(schema, "MIGRATIONS_DIR", str(migrations))
+    conn = sqlite3.connect(str(workdir / "database.db"))
+
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(conn)
+
+    assert schema_version(conn) == broken - 1
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "Half" not in tables
+    conn.close()
+
+
+def test_hot_queries_use_indexes(conn):
+    assert check_query_plans(conn) == []
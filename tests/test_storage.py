@@ -0,0 +1,46 @@
+import os
+
+from storage import ImageWriter, image_writer
+from persistence import DBWriter, build_record
+from db import dimensions
+
+
+def test_write_lands_atomically(workdir):
+    writer = ImageWriter(retries=0)
+    path = os.path.join(workdir, "uploads", "a.jpg")
+    writer.submit(path, b"jpeg").result(timeout=5)
+
+    assert writer.wait(path)
+    assert open(path, "rb").read() == b"jpeg"
+    assert not os.path.exists(f"{path}.part")
+
+
+def test_failed_write_is_retried_then_remembered(workdir):
+    (workdir / "blocker").write_text("a file, not a directory")
+    writer = ImageWriter(retries=2, retry_delay=0)
+    path = os.path.join(workdir, "blocker", "a.jpg")
+
+    writer.submit(path, b"jpeg").exception(timeout=5)
+
+    assert writer.failed(path)
+    assert not writer.wait(path)
+    assert writer.failed_total == 1
+
+
+def test_db_writer_skips_uploads_that_were_not_stored(conn, workdir):
+    dimensions.load(conn)
+    (workdir / "blocker").write_text("")
+    stored = os.path.join(workdir, "uploads", "ok.jpg")
+    lost = os.path.join(workdir, "blocker", "lost.jpg")
+    image_writer.submit(stored, b"ok").result(timeout=5)
+    image_writer.submit(lost, b"lost").exception(timeout=30)
+
+    writer = DBWriter(os.path.join(workdir, "database.db"))
+    ids = writer.submit([
+        build_record(stored, "Object", status_title="Good"),
+        build_record(lost, "Object", status_title="Good"),
+    ]).result(timeout=30)
+
+    assert ids[0] is not None and ids[1] is None
+    paths = [row[0] for row in conn.execute("SELECT Path FROM Image")]
+    assert paths == [stored]
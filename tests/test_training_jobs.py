@@ -0,0 +1,130 @@
+import time
+import threading
+
+import pytest
+
+from conftest import wait_for, state
+from training_jobs import TrainingQueue, JobCancelled
+
+
+class GatedRunner:
+    """Runner that blocks each job until released; records the order jobs ran in."""
+
+    def __init__(self, result=True):
+        self.result = result
+        self.release = threading.Event()
+        self.started = []
+
+    def __call__(self, model_type, job):
+        self.started.append(model_type)
+        while not self.release.wait(0.02):
+            job.step("Training")  # where a cancel takes effect
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def test_one_job_per_model_type_in_flight(conn):
+    runner = GatedRunner()
+    queue = TrainingQueue(runner)
+
+    first, created = queue.submit("Object", 5)
+    again, created_again = queue.submit("Object", 5)
+
+    assert created and not created_again
+    assert again["id"] == first["id"]
+
+    runner.release.set()
+    assert wait_for(lambda: state(queue, first["id"]) == "succeeded")
+    assert queue.get(first["id"])["promoted"] is True
+    second, created = queue.submit("Object", 5)
+    assert created and second["id"] != first["id"]
+
+
+def test_max_concurrent_and_order(conn):
+    runner = GatedRunner(result=False)
+    queue = TrainingQueue(runner, max_concurrent=1)
+
+    ids = [queue.submit(kind)[0]["id"] for kind in ("Object", "Money")]
+    assert wait_for(lambda: state(queue, ids[0]) == "running")
+    time.sleep(0.1)
+    assert state(queue, ids[1]) == "queued"
+
+    runner.release.set()
+    assert wait_for(lambda: all(state(queue, i) == "succeeded" for i in ids))
+    assert runner.started == ["Object", "Money"]
+    assert queue.get(ids[0])["promoted"] is False
+
+
+def test_cancel_queued_and_running(conn):
+    runner = GatedRunner()
+    queue = TrainingQueue(runner, max_concurrent=1)
+    running = queue.submit("Object")[0]["id"]
+    queued = queue.submit("Money")[0]["id"]
+    assert wait_for(lambda: state(queue, running) == "running")
+
+    assert queue.cancel(queued)["state"] == "cancelled"
+    queue.cancel(running)
+
+    assert wait_for(lambda: state(queue, running) == "cancelled")
+    assert runner.started == ["Object"]
+    assert queue.cancel(12345) is None
+
+
+def test_failures_are_recorded(conn):
+    runner = GatedRunner(result=RuntimeError("out of memory"))
+    runner.release.set()
+    queue = TrainingQueue(runner)
+
+    job_id = queue.submit("Object")[0]["id"]
+
+    assert wait_for(lambda: state(queue, job_id) == "failed")
+    assert queue.get(job_id)["message"] == "out of memory"
+
+
+def test_restart_fails_running_jobs_and_resumes_queued_ones(conn):
+    conn.execute("INSERT INTO TrainingJob (ModelType, State, Created) VALUES ('Object', 'running', '2024-01-01')")
+    conn.execute("INSERT INTO TrainingJob (ModelType, State, Created) VALUES ('Money', 'queued', '2024-01-01')")
+    conn.commit()
+    runner = GatedRunner()
+    runner.release.set()
+    queue = TrainingQueue(runner)
+
+    queue.start()
+
+    assert wait_for(lambda: state(queue, 2) == "succeeded")
+    interrupted = queue.get(1)
+    assert interrupted["state"] == "failed"
+    assert interrupted["message"] == "Interrupted by server restart"
+    assert runner.started == ["Money"]
+
+
+def test_job_cancelled_is_raised_at_the_next_step(conn):
+    queue = TrainingQueue(GatedRunner())
+    job_id = queue.submit("Object")[0]["id"]
+    assert wait_for(lambda: job_id in queue._running)
+    job = queue._running[job_id]
+
+    job.cancelled.set()
+    try:
+        job.check()
+    except JobCancelled:
+        pass
+    else:
+        raise AssertionError("check() did not raise")
+    assert wait_for(lambda: state(queue, job_id) == "cancelled")
+
+
+def test_list_rejects_limits_below_one(conn):
+    pytest.importorskip("ultralytics")  # routes.train imports it
+    from flask import Flask
+    from routes.train import training_bp
+
+    app = Flask(__name__)
+    app.register_blueprint(training_bp)
+    client = app.test_client()
+
+    for limit in ("0", "-1", "ten"):
+        response = client.get(f"/train/jobs?limit={limit}")
+        assert response.status_code == 400, limit
+    assert client.get("/train/jobs?limit=1").get_json() == {"jobs": []}
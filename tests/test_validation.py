@@ -0,0 +1,29 @@
+import threading
+
+import pytest
+
+pytest.importorskip("ultralytics")  # validation → model_manager → backends
+
+import validation
+
+
+def test_cache_misses_are_validated_concurrently(conn, tmp_path):
+    old, new = tmp_path / "old.pt", tmp_path / "new.pt"
+    old.write_bytes(b"old weights")
+    new.write_bytes(b"new weights")
+    both_running = threading.Barrier(2, timeout=5)
+    runs = []
+
+    def run_task(options):
+        runs.append(options)
+        both_running.wait()  # breaks (and fails the test) if run one after the other
+        return {"map50": 0.5 if options["weights"] == str(old) else 0.7, "map50_95": 0.3}
+
+    scores = validation.map50([old, new], "data.yaml", "val1", run_task=run_task)
+
+    assert scores == {str(old): 0.5, str(new): 0.7}
+    assert len({options["name"] for options in runs}) == 2  # separate output folders
+
+    runs.clear()
+    assert validation.map50([old, new], "data.yaml", "val1", run_task=run_task) == scores
+    assert runs == []  # served from ValidationMetrics
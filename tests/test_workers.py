@@ -0,0 +1,61 @@
+from multiprocessing import resource_tracker
+
+import numpy as np
+
+from workers import _share, _attach, _ModelCache, LiteBoxes, LiteResults
+
+
+def test_attach_does_not_touch_the_resource_tracker(monkeypatch):
+    calls = []
+    shm, descriptor = _share(np.arange(12, dtype=np.uint8).reshape(3, 4))
+    try:
+        def register(*args):
+            calls.append(("register", args))
+
+        monkeypatch.setattr(resource_tracker, "register", register)
+        monkeypatch.setattr(resource_tracker, "unregister", lambda *args: calls.append(("unregister", args)))
+
+        attached, arr = _attach(descriptor)
+        assert arr.tolist() == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9, 10, 11]]
+        del arr
+        attached.close()
+
+        assert calls == []
+        assert resource_tracker.register is register  # restored after the attach
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_lite_boxes_mirror_ultralytics_boxes():
+    boxes = LiteBoxes(np.array([0.9, 0.4]), np.array([1, 2]), np.array([[0, 0, 5, 5], [1, 1, 2, 2]]))
+    results = LiteResults({1: "car", 2: "dog"}, boxes, (10, 10))
+
+    assert len(results.boxes) == 2
+    per_box = list(results.boxes)
+    assert per_box[1].conf == 0.4 and per_box[1].xyxy.shape == (1, 4)
+
+
+def test_model_cache_is_keyed_on_the_weights_version():
+    opened = []
+
+    def open_model(path):
+        opened.append(path)
+        return f"model {len(opened)}"
+
+    models = _ModelCache(open_model, keep=2)
+
+    assert models.get("Object", "model/object.pt", "v1") == "model 1"
+    assert models.get("Object", "model/object.pt", "v1") == "model 1"
+    # promotion overwrites the same file: a new version still reloads it
+    assert models.get("Object", "model/object.pt", "v2") == "model 2"
+    assert models.get("Object", "model/object.pt", "v1") == "model 1"  # in-flight old requests
+    models.get("Object", "model/object.pt", "v3")
+    assert list(models.models["Object"]) == ["v1", "v3"]  # v2 was used least recently
+    assert len(opened) == 3
+
+    models.drop("Object")
+    models.drop("Money")
+    assert models.models == {}
+    models.get("Object", "model/object.pt", "v3")
+    assert len(opened) == 4
@@ -0,0 +1,83 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import Image
+
+from config import THUMBNAIL_DIR, THUMBNAIL_CACHE_BYTES
+
+
+class ThumbnailCache:
+    """
+    On-disk cache of downsized images, evicted LRU by total bytes.
+
+    A thumbnail's name is derived from the source path, its mtime and the
+    requested size, so a changed source never serves a stale thumbnail.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # file name -> size, oldest first
+        self._total = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self):
+        # pick up thumbnails left by a previous run, least recently used first
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        files = sorted(
+            (f for f in self.cache_dir.iterdir() if f.suffix == ".jpg"),
+            key=lambda f: f.stat().st_atime
+        )
+        for f in files:
+            size = f.stat().st_size
+            self._entries[f.name] = size
+            self._total += size
+        self._loaded = True
+
+    def get(self, source, size):
+        """Path of the `size`px thumbnail of `source`, creating it if needed."""
+        stat = os.stat(source)
+        key = f"{os.path.abspath(source)}|{stat.st_mtime_ns}|{size}"
+        name = hashlib.sha1(key.encode()).hexdigest() + ".jpg"
+        target = self.cache_dir / name
+
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if name in self._entries and target.exists():
+                self._entries.move_to_end(name)
+                return target.as_posix()
+
+        self._render(source, size, target)
+
+        with self._lock:
+            new_size = target.stat().st_size
+            self._total += new_size - self._entries.pop(name, 0)
+            self._entries[name] = new_size
+            self._evict()
+        return target.as_posix()
+
+    def _render(self, source, size, target):
+        tmp = target.with_name(f"{target.name}.{threading.get_ident()}.part")
+        with Image.open(source) as im:
+            im.draft("RGB", (size, size))  # cheap JPEG downscale on decode
+            im = im.convert("RGB")
+            im.thumbnail((size, size))
+            im.save(tmp, "JPEG", quality=85)
+        os.replace(tmp, target)
+
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._total -= size
+            try:
+                (self.cache_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+
+
+thumbnail_cache = ThumbnailCache(THUMBNAIL_DIR, THUMBNAIL_CACHE_BYTES)
@@ -0,0 +1,218 @@
+"""
+YOLO training in its own process, so it cannot take the cores /detect needs.
+
+The server calls `run_in_subprocess()`; the child (`python train_worker.py
+'<json options>'`) pins itself to the configured CPUs, lowers its priority,
+limits torch threads and runs one task:
+
+- "train" (default): reports each epoch on stdout as a PROGRESS line. With
+  a "profile" option it also writes a cProfile dump of the training there.
+- "val": validates weights on a dataset YAML.
+- "export": builds the inference backend export (INT8 calibration included).
+
+"val" and "export" report their outcome as a RESULT line.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import threading
+import subprocess
+
+PROGRESS = "@@progress "
+RESULT = "@@result "
+
+
+# ─── child ──────────────────────────────────────────────────────────────────
+
+def _limit_resources(opts):
+    # before torch is imported, so its thread pools start small; dataloader
+    # workers inherit affinity and niceness from this process
+    threads = opts.get("torch_threads")
+    if threads:
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            os.environ[var] = str(threads)
+    if opts.get("cpus") and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, opts["cpus"])
+    if opts.get("nice"):
+        os.nice(opts["nice"])
+
+
+def _emit(prefix, event):
+    sys.stdout.write(prefix + json.dumps(event) + "\n")
+    sys.stdout.flush()
+
+
+def _train(opts):
+    from ultralytics import YOLO
+
+    model = YOLO(opts["weights"])
+
+    def on_fit_epoch_end(trainer):
+        metrics = {}
+        try:
+            metrics.update(trainer.label_loss_items(trainer.tloss, prefix="train"))
+        except Exception:
+            pass
+        metrics.update(trainer.metrics or {})
+        _emit(PROGRESS, {
+            "epoch": trainer.epoch + 1,
+            "epochs": trainer.epochs,
+            "metrics": {k: round(float(v), 5) for k, v in metrics.items()}
+        })
+
+    model.add_callback("on_fit_epoch_end", on_fit_epoch_end)
+
+    profiler = None
+    if opts.get("profile"):
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        model.train(
+            data=opts["data"],
+            epochs=opts["epochs"],
+            project=opts["project"],
+            name=opts["name"],
+            workers=opts["workers"],
+            exist_ok=True,
+        )
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(opts["profile"])
+
+
+def validate(opts):
+    """mAP50 and mAP50-95 of `weights` on `data`; output goes to project/name."""
+    from ultralytics import YOLO
+
+    metrics = YOLO(opts["weights"]).val(
+        data=opts["data"],
+        project=opts["project"],
+        name=opts["name"],
+        workers=opts.get("workers", 0),
+        exist_ok=True,
+        verbose=False,
+    )
+    return {"map50": float(metrics.box.map50), "map50_95": float(metrics.box.map)}
+
+
+def export(opts):
+    """Backend export of `weights` (see backends.export)."""
+    import backends
+
+    path, tag = backends.export(opts["model_type"], opts["weights"], opts["version"], opts.get("data"))
+    return {"path": str(path), "tag": tag}
+
+
+TASKS = {"train": _train, "val": validate, "export": export}
+
+
+def main(opts):
+    _limit_resources(opts)
+
+    import torch
+    if opts.get("torch_threads"):
+        torch.set_num_threads(opts["torch_threads"])
+
+    result = TASKS[opts.get("task", "train")](opts)
+    if result is not None:
+        _emit(RESULT, result)
+
+
+# ─── server side ────────────────────────────────────────────────────────────
+
+class Throttle:
+    """
+    Pause/resume decision from inference load, with hysteresis: pause when
+    any queue is deeper than `max_depth` or p95 latency exceeds `max_p95_ms`,
+    resume once both are below half of that.
+    """
+
+    def __init__(self, load, max_depth, max_p95_ms):
+        self.load = load  # () -> (max queue depth, max p95 ms)
+        self.max_depth = max_depth
+        self.max_p95_ms = max_p95_ms
+        self.paused = False
+
+    def update(self):
+        depth, p95 = self.load()
+        if self.paused:
+            if depth <= self.max_depth / 2 and p95 <= self.max_p95_ms / 2:
+                self.paused = False
+        elif depth > self.max_depth or p95 > self.max_p95_ms:
+            self.paused = True
+        return self.paused
+
+
+def _signal_group(proc, sig):
+    try:
+        os.killpg(proc.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+def run_in_subprocess(options, job=None, throttle=None, poll_seconds=1.0):
+    """
+    Run the task in `options` (see `main`) in a child process and wait for
+    it; returns the task's RESULT (None for training). Training epochs are
+    streamed into `job`. While `throttle` says so, the whole process group
+    (dataloader workers included) is stopped. With a `job`, cancelling it
+    terminates the child and raises JobCancelled.
+    """
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), json.dumps(options)],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+        start_new_session=True  # own process group, so signals reach the workers
+    )
+
+    result = []
+
+    def read_output():
+        for line in proc.stdout:
+            if line.startswith(PROGRESS):
+                event = json.loads(line[len(PROGRESS):])
+                if job is not None:
+                    job.report_epoch(event["epoch"], event["epochs"], event["metrics"])
+            elif line.startswith(RESULT):
+                result.append(json.loads(line[len(RESULT):]))
+            else:
+                sys.stdout.write(line)
+
+    task = options.get("task", "train")
+    reader = threading.Thread(target=read_output, name=f"{task}-subprocess-output", daemon=True)
+    reader.start()
+
+    paused = False
+    try:
+        while proc.poll() is None:
+            if job is not None and job.cancelled.is_set():
+                _signal_group(proc, signal.SIGTERM)
+                _signal_group(proc, signal.SIGCONT)  # a stopped process must run to exit
+                try:
+                    proc.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    _signal_group(proc, signal.SIGKILL)
+                job.check()
+
+            if throttle is not None and throttle.update() != paused:
+                paused = throttle.paused
+                _signal_group(proc, signal.SIGSTOP if paused else signal.SIGCONT)
+                if job is not None and task == "train":
+                    job.step("Training (paused for inference load)" if paused else "Training")
+            time.sleep(poll_seconds)
+    finally:
+        if proc.poll() is None:
+            _signal_group(proc, signal.SIGKILL)
+            proc.wait()
+        reader.join(timeout=5)
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"{task.capitalize()} process exited with code {proc.returncode}")
+    return result[-1] if result else None
+
+
+if __name__ == "__main__":
+    main(json.loads(sys.argv[1]))
@@ -0,0 +1,228 @@
+import json
+import datetime
+import threading
+
+from db import connect
+
+JOB_COLUMNS = (
+    "ID", "ModelType", "State", "Created", "Started", "Finished",
+    "Epoch", "Epochs", "Metrics", "Message", "Promoted", "CancelRequested"
+)
+ACTIVE_STATES = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once it has been cancelled."""
+
+
+def _now():
+    return datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
+
+
+def _job_dict(row):
+    job = dict(zip(
+        ("id", "model_type", "state", "created", "started", "finished",
+         "epoch", "epochs", "metrics", "message", "promoted", "cancel_requested"),
+        row
+    ))
+    job["metrics"] = json.loads(job["metrics"]) if job["metrics"] else []
+    job["promoted"] = None if job["promoted"] is None else bool(job["promoted"])
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+
+class Job:
+    """What the runner gets: progress reporting and cancellation checks."""
+
+    def __init__(self, queue, job_id, model_type):
+        self.queue = queue
+        self.id = job_id
+        self.model_type = model_type
+        self.cancelled = threading.Event()
+        self.metrics = []
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise JobCancelled(f"{self.model_type} training job {self.id} cancelled")
+
+    def step(self, message):
+        """Record the current step; also the point where a cancel takes effect."""
+        self.check()
+        self.queue._update(self.id, Message=message)
+        print(f"🏋️ Job {self.id} ({self.model_type}): {message}")
+
+    def report_epoch(self, epoch, epochs, metrics):
+        self.metrics.append({"epoch": epoch, **metrics})
+        self.queue._update(self.id, Epoch=epoch, Epochs=epochs, Metrics=json.dumps(self.metrics))
+
+    def attach(self, model):
+        """Stream per-epoch progress of an in-process `model.train()` into the job and stop it on cancel."""
+
+        def on_fit_epoch_end(trainer):
+            metrics = {}
+            try:
+                metrics.update(trainer.label_loss_items(trainer.tloss, prefix="train"))
+            except Exception:
+                pass
+            metrics.update(trainer.metrics or {})
+            self.report_epoch(
+                trainer.epoch + 1, trainer.epochs,
+                {k: round(float(v), 5) for k, v in metrics.items()}
+            )
+
+        def on_train_batch_end(trainer):
+            self.check()
+
+        model.add_callback("on_fit_epoch_end", on_fit_epoch_end)
+        model.add_callback("on_train_batch_end", on_train_batch_end)
+
+
+class TrainingQueue:
+    """
+    Persistent training jobs in the TrainingJob table.
+
+    At most one job per model type is queued or running: asking again
+    returns the job already in flight. At most `max_concurrent` jobs run at
+    once, each in its own thread calling `runner(model_type, job)`, which
+    returns whether new weights were promoted. Queued jobs survive a
+    restart; jobs that were running are marked failed.
+    """
+
+    def __init__(self, runner, max_concurrent=1):
+        self.runner = runner
+        self.max_concurrent = max(1, max_concurrent)
+        self._conn = None
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._running = {}  # job ID -> Job
+        self._thread = None
+
+    # ─── DB ─────────────────────────────────────────────────────────────────
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = connect(isolation_level=None)
+        return self._conn
+
+    def _select(self, where="", params=(), suffix=""):
+        sql = f"SELECT {', '.join(JOB_COLUMNS)} FROM TrainingJob {where} {suffix}"
+        return [_job_dict(row) for row in self._db().execute(sql, params)]
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._db().execute(
+                f"UPDATE TrainingJob SET {', '.join(f'{k} = ?' for k in fields)} WHERE ID = ?",
+                (*fields.values(), job_id)
+            )
+
+    # ─── public API ─────────────────────────────────────────────────────────
+
+    def start(self):
+        """Start dispatching (idempotent); resumes jobs queued before a restart."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._db().execute(
+                "UPDATE TrainingJob SET State = 'failed', Finished = ?, "
+                "Message = 'Interrupted by server restart' WHERE State = 'running'",
+                (_now(),)
+            )
+            self._thread = threading.Thread(target=self._loop, name="training-queue", daemon=True)
+            self._thread.start()
+
+    def submit(self, model_type, epochs=None):
+        """Queue a job unless one is in flight; returns (job, created)."""
+        self.start()
+        with self._lock:
+            active = self._select(
+                "WHERE ModelType = ? AND State IN (?, ?)", (model_type, *ACTIVE_STATES)
+            )
+            if active:
+                return active[0], False
+            job_id = self._db().execute(
+                "INSERT INTO TrainingJob (ModelType, State, Created, Epochs) VALUES (?, 'queued', ?, ?)",
+                (model_type, _now(), epochs)
+            ).lastrowid
+            self._wake.notify()
+            return self._select("WHERE ID = ?", (job_id,))[0], True
+
+    def get(self, job_id):
+        with self._lock:
+            jobs = self._select("WHERE ID = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    def list(self, state=None, model_type=None, limit=50):
+        where, params = [], []
+        if state:
+            where.append("State = ?")
+            params.append(state)
+        if model_type:
+            where.append("ModelType = ?")
+            params.append(model_type)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        with self._lock:
+            return self._select(clause, params, f"ORDER BY ID DESC LIMIT {int(limit)}")
+
+    def cancel(self, job_id):
+        """
+        Cancel a job: a queued one at once, a running one at its next batch
+        or step. Returns the job (None if unknown).
+        """
+        with self._lock:
+            jobs = self._select("WHERE ID = ?", (job_id,))
+            if not jobs:
+                return None
+            job = jobs[0]
+            if job["state"] == "queued":
+                self._db().execute(
+                    "UPDATE TrainingJob SET State = 'cancelled', Finished = ?, CancelRequested = 1 WHERE ID = ?",
+                    (_now(), job_id)
+                )
+            elif job["state"] == "running":
+                self._db().execute("UPDATE TrainingJob SET CancelRequested = 1 WHERE ID = ?", (job_id,))
+                if job_id in self._running:
+                    self._running[job_id].cancelled.set()
+            return self._select("WHERE ID = ?", (job_id,))[0]
+
+    # ─── dispatcher ─────────────────────────────────────────────────────────
+
+    def _loop(self):
+        while True:
+            with self._wake:
+                busy = {job.model_type for job in self._running.values()}
+                free = self.max_concurrent - len(self._running)
+                for queued in self._select("WHERE State = 'queued'", suffix="ORDER BY ID"):
+                    if free <= 0:
+                        break
+                    if queued["model_type"] in busy:
+                        continue
+                    job = Job(self, queued["id"], queued["model_type"])
+                    self._db().execute(
+                        "UPDATE TrainingJob SET State = 'running', Started = ? WHERE ID = ?",
+                        (_now(), job.id)
+                    )
+                    self._running[job.id] = job
+                    busy.add(job.model_type)
+                    free -= 1
+                    threading.Thread(
+                        target=self._run, args=(job,), name=f"training-{job.id}", daemon=True
+                    ).start()
+                self._wake.wait(timeout=30)
+
+    def _run(self, job):
+        fields = {}
+        try:
+            fields["Promoted"] = int(bool(self.runner(job.model_type, job)))
+            fields.update(State="succeeded", Message="Done")
+        except JobCancelled:
+            fields.update(State="cancelled", Message="Cancelled")
+            print(f"🛑 Job {job.id} ({job.model_type}) cancelled")
+        except Exception as e:
+            fields.update(State="failed", Message=str(e))
+            print(f"❌ Job {job.id} ({job.model_type}) failed: {e}")
+        finally:
+            fields["Finished"] = _now()
+            self._update(job.id, **fields)
+            with self._wake:
+                self._running.pop(job.id, None)
+                self._wake.notify()
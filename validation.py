@@ -0,0 +1,60 @@
+import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from config import RUNS_DIR
+from db import get_conn
+from model_manager import weights_version
+import train_worker
+
+
+def map50(weights_files, data_yaml, val_hash, run_task=train_worker.validate):
+    """
+    mAP50 of each weights file on the validation set identified by
+    `val_hash` → {weights: map50}.
+
+    Results are cached in ValidationMetrics by (weights hash, val-set hash),
+    so unchanged weights on an unchanged val set are never re-evaluated.
+    Cache misses are validated at the same time, each by its own
+    `run_task(options)` (see train_worker.validate; routes/train.py runs it
+    in a training subprocess) into its own runs/val/<weights>_<val set>
+    folder.
+    """
+    conn = get_conn()
+    hashes = {str(w): weights_version(w) for w in weights_files}
+
+    scores, missing = {}, []
+    for weights, digest in hashes.items():
+        row = conn.execute(
+            "SELECT Map50 FROM ValidationMetrics WHERE WeightsHash = ? AND ValSetHash = ?",
+            (digest, val_hash)
+        ).fetchone()
+        if row:
+            scores[weights] = row[0]
+            print(f"📋 Cached mAP50 {row[0]:.4f} for {digest} on val set {val_hash}")
+        else:
+            missing.append(weights)
+
+    if missing:
+        def validate(weights):
+            outcome = run_task({
+                "task": "val",
+                "weights": weights,
+                "data": data_yaml,
+                "project": os.path.join(RUNS_DIR, "val"),
+                "name": f"{hashes[weights]}_{val_hash}"
+            })
+            return outcome["map50"], outcome["map50_95"]
+
+        with ThreadPoolExecutor(max_workers=len(missing), thread_name_prefix="validate") as pool:
+            results = dict(zip(missing, pool.map(validate, missing)))
+
+        now = datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
+        conn.executemany("""
+            INSERT OR REPLACE INTO ValidationMetrics (WeightsHash, ValSetHash, Map50, Map50_95, Evaluated)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(hashes[w], val_hash, m50, m5095, now) for w, (m50, m5095) in results.items()])
+        conn.commit()
+        scores.update({w: m50 for w, (m50, _) in results.items()})
+
+    return scores
@@ -0,0 +1,352 @@
+import os
+import time
+import itertools
+from collections import OrderedDict
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import Future
+
+import numpy as np
+
+from config import INFERENCE_WORKERS, INFERENCE_WORKER_THREADS, MODEL_WARMUP_SIZE
+
+
+# ─── lightweight results ────────────────────────────────────────────────────
+
+class _LiteBox:
+    __slots__ = ("conf", "cls", "xyxy")
+
+    def __init__(self, conf, cls, xyxy):
+        self.conf = conf
+        self.cls = cls
+        self.xyxy = xyxy
+
+
+class LiteBoxes:
+    """
+    Detections of one image as plain arrays, sent back from a worker.
+    Mirrors the parts of ultralytics' Boxes the API uses: whole-array
+    `conf`/`cls`/`xyxy` and per-box iteration.
+    """
+
+    def __init__(self, conf, cls, xyxy):
+        self.conf = conf
+        self.cls = cls
+        self.xyxy = xyxy
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __iter__(self):
+        for i in range(len(self.conf)):
+            yield _LiteBox(self.conf[i], self.cls[i], self.xyxy[i:i + 1])
+
+
+class LiteResults:
+    def __init__(self, names, boxes, orig_shape):
+        self.names = names
+        self.boxes = boxes
+        self.orig_shape = orig_shape
+
+
+# ─── shared-memory image transport ──────────────────────────────────────────
+
+def _share(img):
+    """Copy `img` into a new shared-memory block; returns (shm, descriptor)."""
+    img = np.ascontiguousarray(img)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, img.nbytes))
+    np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf)[...] = img
+    return shm, (shm.name, img.shape, img.dtype.str)
+
+
+def _open_untracked(name):
+    """Open an existing block without registering it with the resource tracker."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers. Unregistering afterwards is not an
+        # option: a worker often shares the parent's tracker (spawn, or fork
+        # once the tracker runs), so it would drop the parent's registration
+        # and the parent's unlink() would then fail in the tracker.
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _attach(descriptor):
+    # the parent owns the block and unlinks it once the task is done
+    name, shape, dtype = descriptor
+    shm = _open_untracked(name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+# ─── worker process ─────────────────────────────────────────────────────────
+
+class _ModelCache:
+    """
+    A worker's models by kind and weights version. Weights are replaced
+    in place on promotion, so the path alone does not identify a version.
+    The last `keep` versions of a kind stay loaded, so requests that began
+    before a swap finish on the weights they started with.
+    """
+
+    def __init__(self, open_model, keep=2):
+        self.open_model = open_model
+        self.keep = keep
+        self.models = {}  # kind -> OrderedDict(version -> model), oldest first
+
+    def get(self, kind, path, version):
+        versions = self.models.setdefault(kind, OrderedDict())
+        if version not in versions:
+            versions[version] = self.open_model(path)
+            while len(versions) > self.keep:
+                versions.popitem(last=False)
+        versions.move_to_end(version)
+        return versions[version]
+
+    def drop(self, kind):
+        self.models.pop(kind, None)
+
+
+def _worker_main(index, tasks, results, threads):
+    # pin math libraries before torch is imported
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+
+    import gc
+    import backends
+    from ocr_pool import ocr_readers
+
+    models = _ModelCache(backends.open_model)
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, op, payload = task
+        try:
+            if op == "detect":
+                kind, path, version, descriptors = payload
+                attached = [_attach(d) for d in descriptors]
+                try:
+                    arrays = [arr for _, arr in attached]
+                    res = models.get(kind, path, version)(arrays, batch=len(arrays), verbose=False)
+                    out = [
+                        (
+                            r.names,
+                            r.boxes.conf.cpu().numpy(),
+                            r.boxes.cls.cpu().numpy().astype(np.int64),
+                            r.boxes.xyxy.cpu().numpy(),
+                            tuple(r.orig_shape)
+                        )
+                        for r in res
+                    ]
+                finally:
+                    del arrays
+                    for shm, _ in attached:
+                        shm.close()
+            elif op == "ocr":
+                langs, descriptor = payload
+                shm, img = _attach(descriptor)
+                try:
+                    out = [text for _, text, _ in ocr_readers.get(langs).readtext(img)]
+                finally:
+                    del img
+                    shm.close()
+            elif op == "warmup":
+                kind, path, version = payload
+                dummy = np.zeros((MODEL_WARMUP_SIZE, MODEL_WARMUP_SIZE, 3), dtype=np.uint8)
+                model = models.get(kind, path, version)
+                model(dummy, verbose=False)
+                out = dict(model.names)
+            elif op == "unload":
+                models.drop(payload)
+                gc.collect()
+                out = None
+            else:
+                raise ValueError(f"Unknown task {op}")
+            results.put((task_id, index, True, out))
+        except Exception as e:
+            results.put((task_id, index, False, f"{type(e).__name__}: {e}"))
+
+
+# ─── parent side ────────────────────────────────────────────────────────────
+
+class InferencePool:
+    """
+    Pool of worker processes, each holding its own models with a pinned
+    torch thread count. Images travel through shared memory; only small
+    descriptors and compact detection arrays are pickled.
+
+    Tasks go to the worker with the fewest tasks in flight. A worker that
+    dies fails its in-flight tasks and is restarted.
+    """
+
+    def __init__(self, size, threads):
+        self.size = size
+        self.threads = threads
+        self.restarts = 0
+
+        self._ctx = None
+        self._procs = []
+        self._task_queues = []
+        self._results = None
+        self._inflight = []  # per-worker count
+        self._pending = {}  # task_id -> (future, worker, shms)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._started = False
+
+    @property
+    def enabled(self):
+        return self.size > 0
+
+    def start(self):
+        """
+        Start the workers. Call this at startup, before other threads exist,
+        so the cheap 'fork' start method is safe; later starts use 'spawn'.
+        """
+        with self._lock:
+            if self._started or not self.enabled:
+                return
+            method = "fork" if threading.active_count() == 1 and "fork" in mp.get_all_start_methods() else "spawn"
+            self._ctx = mp.get_context(method)
+            self._results = self._ctx.Queue()
+            for index in range(self.size):
+                self._task_queues.append(self._ctx.Queue())
+                self._procs.append(None)
+                self._inflight.append(0)
+                self._spawn(index)
+            self._started = True
+
+        threading.Thread(target=self._collect, name="pool-results", daemon=True).start()
+        threading.Thread(target=self._monitor, name="pool-monitor", daemon=True).start()
+        print(f"🧵 Started {self.size} inference workers ({self.threads} threads each, {method})")
+
+    def _spawn(self, index):
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self._task_queues[index], self._results, self.threads),
+            name=f"inference-worker-{index}",
+            daemon=True
+        )
+        proc.start()
+        self._procs[index] = proc
+
+    def _submit(self, op, payload, shms=(), worker=None):
+        self.start()
+        future = Future()
+        task_id = next(self._ids)
+        with self._lock:
+            if worker is None:
+                worker = min(range(self.size), key=lambda i: self._inflight[i])
+            self._inflight[worker] += 1
+            self._pending[task_id] = (future, worker, list(shms))
+        self._task_queues[worker].put((task_id, op, payload))
+        return future
+
+    def _finish(self, task_id):
+        with self._lock:
+            entry = self._pending.pop(task_id, None)
+            if entry is None:
+                return None
+            self._inflight[entry[1]] -= 1
+        for shm in entry[2]:
+            shm.close()
+            shm.unlink()
+        return entry[0]
+
+    def _collect(self):
+        while True:
+            task_id, _, ok, out = self._results.get()
+            future = self._finish(task_id)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(out)
+            else:
+                future.set_exception(RuntimeError(out))
+
+    def _monitor(self):
+        while True:
+            time.sleep(1)
+            for index, proc in enumerate(self._procs):
+                if proc.is_alive():
+                    continue
+                print(f"❌ Inference worker {index} died (exit {proc.exitcode}), restarting")
+                with self._lock:
+                    lost = [tid for tid, (_, w, _) in self._pending.items() if w == index]
+                for task_id in lost:
+                    future = self._finish(task_id)
+                    if future is not None:
+                        future.set_exception(RuntimeError(f"Inference worker {index} died"))
+                self._spawn(index)
+                self.restarts += 1
+
+    # ─── operations ─────────────────────────────────────────────────────────
+
+    def detect(self, kind, path, version, images):
+        """Batched detection of ndarray `images` on one worker → [LiteResults]."""
+        shared = [_share(img) for img in images]
+        future = self._submit(
+            "detect", (kind, path, version, [d for _, d in shared]), shms=[s for s, _ in shared]
+        )
+        return [
+            LiteResults(names, LiteBoxes(conf, cls, xyxy), shape)
+            for names, conf, cls, xyxy, shape in future.result()
+        ]
+
+    def ocr(self, langs, img):
+        """OCR lines of `img` read on a worker."""
+        shm, descriptor = _share(img)
+        return self._submit("ocr", (langs, descriptor), shms=[shm]).result()
+
+    def warmup(self, kind, path, version):
+        """Load + warm `version` (at `path`) on every worker; returns the model's class names."""
+        futures = [self._submit("warmup", (kind, path, version), worker=i) for i in range(self.size)]
+        return [future.result() for future in futures][0]
+
+    def unload(self, kind):
+        """Drop every loaded version of `kind` from the workers (does not wait)."""
+        if self._started:
+            for i in range(self.size):
+                self._submit("unload", kind, worker=i)
+
+    def model(self, kind, path, version):
+        return PoolModel(self, kind, path, version)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.size,
+                "threads_per_worker": self.threads,
+                "inflight": list(self._inflight),
+                "restarts": self.restarts
+            }
+
+
+class PoolModel:
+    """Callable stand-in for a YOLO model whose inference runs in the pool."""
+
+    def __init__(self, pool, kind, path, version):
+        self.pool = pool
+        self.kind = kind
+        self.path = path
+        self.version = version
+
+    def __call__(self, sources, batch=None, verbose=False):
+        if not isinstance(sources, list):
+            sources = [sources]
+        return self.pool.detect(self.kind, self.path, self.version, sources)
+
+    def warmup(self):
+        return self.pool.warmup(self.kind, self.path, self.version)
+
+
+inference_pool = InferencePool(INFERENCE_WORKERS, INFERENCE_WORKER_THREADS)